@@ -0,0 +1,474 @@
+"""Benchmarks of the compute job functions on synthetic systems and data.
+
+Jobs are run by compute.run_job, as they are by workers, against an in
+memory stand-in for the StorageInterface and the redis connection status
+changes are published to, so only the time spent fetching, computing,
+decoding and encoding data is measured. The uploaded data is fetched in
+batches, the timing result is saved, and the running and final statuses
+are published. Each case runs in a new process so that the peak resident
+memory reported belongs to that case alone. For example, to benchmark
+performance jobs of 10 inverters with 1 minute data for a year:
+
+    python benchmarks/compute_benchmarks.py --jobs performance \\
+        --inverters 10 --step 1 --days 365
+
+The stages of the job are measured by the instrumentation of the compute
+module, as they are for jobs run by workers, so the wall time, number of
+calls, rows, bytes, and growth of the peak RSS are reported for each stage
+(fetch data, decode data, run model, serialize results, etc.) along with
+the total for the job.
+
+The inverters of the synthetic systems have arrays of different
+orientations and sizes, so each inverter is modeled. Use
+--identical-inverters to instead measure systems of identical inverters,
+which are only modeled once.
+"""
+import argparse
+import calendar
+from contextlib import contextmanager
+import datetime as dt
+import itertools
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from unittest.mock import patch
+import uuid
+
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa  # type: ignore
+
+
+from solarperformanceinsight_api import (
+    compute,
+    instrumentation,
+    models,
+    queuing,
+    settings,
+    utils,
+)
+
+
+JOB_TYPES = (
+    "performance",
+    "modeled_actual",
+    "reference_actual",
+    "monthly_reference_actual",
+    "reference_modeled",
+)
+# ModelChain irradiance and temperature inputs used for all jobs
+WEATHER_PARAMS = dict(irradiance_type="standard", temperature_type="air")
+
+
+def _maxrss_mib() -> float:
+    # ru_maxrss is in KiB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class InMemoryStorage:
+    """Provides the parts of StorageInterface and its transactions that are
+    used by run_job and the compute functions, keeping data and results in
+    memory. Also stands in for the redis connection job statuses are
+    published to."""
+
+    def __init__(self, job: models.StoredJob, data: Dict[uuid.UUID, bytes]):
+        self.job = job
+        self.data = data
+        self.results: List[Tuple[str, str, str, bytes]] = []
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.data_calls = 0
+        self.status: Optional[str] = None
+        self.published: List[str] = []
+
+    @contextmanager
+    def start_transaction(self) -> Iterator["InMemoryStorage"]:
+        yield self
+
+    def get_job(self, job_id: uuid.UUID) -> models.StoredJob:
+        return self.job
+
+    def get_job_status(self, job_id: uuid.UUID) -> models.JobStatus:
+        return models.JobStatus(
+            status=self.status or "queued",
+            last_change=dt.datetime.now(dt.timezone.utc),
+        )
+
+    def _get_data(
+        self, data_id: uuid.UUID
+    ) -> Tuple[models.StoredJobDataMetadata, bytes]:
+        meta = next(do for do in self.job.data_objects if do.object_id == data_id)
+        data = self.data[data_id]
+        self.bytes_read += len(data)
+        return meta, data
+
+    def get_job_data(
+        self, job_id: uuid.UUID, data_id: uuid.UUID
+    ) -> Tuple[models.StoredJobDataMetadata, bytes]:
+        self.data_calls += 1
+        return self._get_data(data_id)
+
+    def get_job_data_bulk(
+        self, job_id: uuid.UUID, data_ids: List[uuid.UUID]
+    ) -> Dict[uuid.UUID, Tuple[models.StoredJobDataMetadata, bytes]]:
+        self.data_calls += 1
+        return {data_id: self._get_data(data_id) for data_id in data_ids}
+
+    def get_job_data_sizes(self, job_id: uuid.UUID) -> Dict[uuid.UUID, int]:
+        return {data_id: len(data) for data_id, data in self.data.items()}
+
+    def add_job_result(
+        self,
+        job_id: uuid.UUID,
+        schema_path: str,
+        type_: str,
+        data_format: str,
+        data: Any,
+    ):
+        self.bytes_written += len(data)
+        self.results.append((schema_path, type_, data_format, data))
+
+    def add_job_results(
+        self, job_id: uuid.UUID, results: Iterable[Tuple[str, str, str, bytes]]
+    ):
+        for result in results:
+            self.add_job_result(job_id, *result)
+
+    def set_job_complete(self, job_id: uuid.UUID):
+        self.status = "complete"
+
+    def set_job_error(self, job_id: uuid.UUID):
+        self.status = "error"
+
+    def publish(self, channel: str, message: str):
+        self.published.append(models.JobStatus.parse_raw(message).status)
+
+
+def make_system(
+    inverters: int, arrays: int, identical_inverters: bool = False
+) -> models.PVSystem:
+    """System of inverters like the example inverter. Unless
+    identical_inverters, the arrays of each inverter have a different tilt,
+    azimuth, and number of strings so that every inverter must be modeled."""
+    system = models.PVSystem(**models.SYSTEM_EXAMPLE)
+    inverter = system.inverters[0].dict()
+    array = inverter["arrays"][0]
+    system.inverters = []
+    for i in range(inverters):
+        frac = 0.0 if identical_inverters else i / inverters
+        system.inverters.append(
+            models.Inverter(
+                **{
+                    **inverter,
+                    "name": f"Inverter {i}",
+                    "arrays": [
+                        {
+                            **array,
+                            "name": f"Array {j}",
+                            "strings": array["strings"] + round(4 * frac) + j,
+                            "tracking": {
+                                **array["tracking"],
+                                "tilt": array["tracking"]["tilt"] + 20 * frac,
+                                "azimuth": array["tracking"]["azimuth"]
+                                - 45
+                                + 90 * frac,
+                            },
+                        }
+                        for j in range(arrays)
+                    ],
+                }
+            )
+        )
+    return system
+
+
+def make_parameters(
+    job_type: str, granularity: str, step: int, days: int
+) -> Dict[str, Any]:
+    time_parameters = dict(
+        start="2020-01-01T00:00:00-07:00",
+        end=(
+            dt.datetime(2020, 1, 1, tzinfo=dt.timezone(dt.timedelta(hours=-7)))
+            + dt.timedelta(days=days)
+        ).isoformat(),
+        step=dt.timedelta(minutes=step),
+        timezone="America/Phoenix",
+    )
+    common = dict(system_id=models.SYSTEM_ID, time_parameters=time_parameters)
+    data_params = dict(weather_granularity=granularity, **WEATHER_PARAMS)
+    reference = dict(
+        data_available="weather and AC performance",
+        performance_granularity="inverter",
+        **data_params,
+    )
+    if job_type == "performance":
+        return dict(calculate="modeled performance", **data_params, **common)
+    elif job_type == "modeled_actual":
+        return dict(
+            compare="modeled and actual performance",
+            performance_granularity="inverter",
+            **data_params,
+            **common,
+        )
+    elif job_type == "reference_actual":
+        return dict(
+            compare="reference and actual performance",
+            reference_data_parameters=reference,
+            actual_data_parameters=dict(
+                performance_granularity="inverter", **data_params
+            ),
+            **common,
+        )
+    elif job_type == "monthly_reference_actual":
+        return dict(
+            compare="monthly reference and actual performance",
+            system_id=models.SYSTEM_ID,
+        )
+    elif job_type == "reference_modeled":
+        return dict(
+            compare="reference and modeled performance",
+            reference_data_parameters=reference,
+            modeled_data_parameters=data_params,
+            **common,
+        )
+    raise ValueError(f"Unknown job type {job_type}")
+
+
+def make_data(
+    item: models.JobDataItem, time_range: Optional[pd.DatetimeIndex], seed: int
+) -> pd.DataFrame:
+    """Synthetic data with the columns expected for item"""
+    rng = np.random.default_rng(seed)
+    if item._data_cols[0] == "month":
+        scale = np.cos((np.arange(12) - 5) / 24 * np.pi)
+        values = {
+            "total_poa_insolation": 120000 * scale,
+            "average_daytime_cell_temperature": 25 * scale,
+            "total_energy": 60000 * scale,
+        }
+        out = pd.DataFrame({col: values[col] for col in item._data_cols[1:]})
+        out.insert(0, "month", calendar.month_name[1:])
+        return out
+
+    assert time_range is not None
+    hour = np.asarray(time_range.hour + time_range.minute / 60)
+    clear = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None)
+    cloud = rng.uniform(0.6, 1.0, len(time_range))
+    values = {
+        "ghi": 1000 * clear * cloud,
+        "dni": 850 * clear * cloud,
+        "dhi": 100 * clear,
+        "poa_global": 1000 * clear * cloud,
+        "poa_direct": 850 * clear * cloud,
+        "poa_diffuse": 150 * clear,
+        "effective_irradiance": 950 * clear * cloud,
+        "temp_air": 20 + 10 * clear,
+        "wind_speed": rng.uniform(0, 5, len(time_range)),
+        "module_temperature": 25 + 25 * clear,
+        "cell_temperature": 27 + 25 * clear,
+        "performance": 200000 * clear * cloud,
+    }
+    out = pd.DataFrame({col: values[col] for col in item._data_cols[1:]})
+    out.insert(0, "time", time_range)
+    return out
+
+
+def make_job(
+    job_type: str,
+    inverters: int,
+    arrays: int,
+    granularity: str,
+    step: int,
+    days: int,
+    identical_inverters: bool = False,
+) -> Tuple[models.StoredJob, InMemoryStorage]:
+    job = models.Job(
+        system_definition=make_system(inverters, arrays, identical_inverters),
+        parameters=make_parameters(job_type, granularity, step, days),
+    )
+    time_params = getattr(job.parameters, "time_parameters", None)
+    time_range = time_params._time_range if time_params is not None else None
+    now = dt.datetime.now(dt.timezone.utc)
+    data_objects = []
+    data = {}
+    for i, item in enumerate(job._data_items.values()):
+        data_id = uuid.uuid1()
+        df = make_data(item, time_range, i)
+        if "time" in df.columns:
+            table = utils.convert_to_arrow(df)
+        else:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        data[data_id] = utils.dump_arrow_bytes(table)
+        data_objects.append(
+            models.StoredJobDataMetadata(
+                object_id=data_id,
+                object_type="job_data",
+                created_at=now,
+                modified_at=now,
+                definition=models.JobDataMetadata(
+                    schema_path=item.schema_path,
+                    type=item.type,
+                    filename=f"{i}.arrow",
+                    data_format="application/vnd.apache.arrow.file",
+                    present=True,
+                    data_columns=item._data_cols,
+                ),
+            )
+        )
+    stored = models.StoredJob(
+        object_id=uuid.uuid1(),
+        object_type="job",
+        created_at=now,
+        modified_at=now,
+        definition=job,
+        status=models.JobStatus(status="queued", last_change=now),
+        data_objects=data_objects,
+    )
+    return stored, InMemoryStorage(stored, data)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Make and run the job described by case returning the timing of
+    each stage"""
+    job, si = make_job(**case)
+    timers = []
+    time_job = instrumentation.time_job
+
+    @contextmanager
+    def keep_timer(job_id: uuid.UUID) -> Iterator[instrumentation.JobTimer]:
+        with time_job(job_id) as timer:
+            timers.append(timer)
+            yield timer
+
+    rss = _maxrss_mib()
+    with patch.object(
+        compute.storage, "StorageInterface", lambda user: si
+    ), patch.object(queuing, "_get_redis_conn", lambda: si), patch.object(
+        instrumentation, "time_job", keep_timer
+    ), patch.object(
+        settings, "job_timing_result", True
+    ):
+        start = time.perf_counter()
+        compute.run_job(job.object_id, "benchmark")
+        total = time.perf_counter() - start
+    if si.status != "complete":
+        raise RuntimeError(f"Job failed: {si.results[-1][-1]!r}")
+    (timer,) = timers
+    return {
+        **case,
+        "seconds": total,
+        "peak_rss_mib": _maxrss_mib(),
+        "peak_rss_growth_mib": _maxrss_mib() - rss,
+        "bytes_read": si.bytes_read,
+        "bytes_written": si.bytes_written,
+        "results": len(si.results),
+        "data_calls": si.data_calls,
+        "published": si.published,
+        "stages": timer.stages,
+    }
+
+
+def _run_isolated(case: Dict[str, Any]) -> Dict[str, Any]:
+    with multiprocessing.Pool(1) as pool:
+        return pool.apply(run_case, (case,))
+
+
+def cases(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    for job_type in args.jobs:
+        if job_type == "monthly_reference_actual":
+            # monthly data is always at the system level
+            params = itertools.product(
+                args.inverters, args.arrays, ["system"], [60], [365]
+            )
+        else:
+            params = itertools.product(
+                args.inverters, args.arrays, args.granularity, args.step, args.days
+            )
+        for inverters, arrays, granularity, step, days in params:
+            yield dict(
+                job_type=job_type,
+                inverters=inverters,
+                arrays=arrays,
+                granularity=granularity,
+                step=step,
+                days=days,
+                identical_inverters=args.identical_inverters,
+            )
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    lines = [
+        (
+            f"{result['job_type']} inverters={result['inverters']} "
+            f"arrays={result['arrays']} granularity={result['granularity']} "
+            f"step={result['step']}min days={result['days']}"
+            + (" identical inverters" if result["identical_inverters"] else "")
+        ),
+        (
+            f"  total: {result['seconds']:.3f} s, peak RSS "
+            f"{result['peak_rss_mib']:.1f} MiB (+{result['peak_rss_growth_mib']:.1f}"
+            f" MiB), read {result['bytes_read'] / 2**20:.1f} MiB, wrote "
+            f"{result['bytes_written'] / 2**20:.1f} MiB in {result['results']} "
+            f"results, {result['data_calls']} data fetches, published "
+            + ", ".join(result["published"])
+        ),
+    ]
+    for stage, stats in result["stages"].items():
+        lines.append(
+            f"  {stage}: {stats['seconds']:.3f} s in {stats['calls']} calls, "
+            f"{stats['rows']} rows, read {stats['bytes_read'] / 2**20:.1f} MiB, "
+            f"wrote {stats['bytes_written'] / 2**20:.1f} MiB, "
+            f"peak RSS +{stats['peak_rss_growth_mib']:.1f} MiB"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the compute job functions with synthetic data"
+    )
+    parser.add_argument("--jobs", nargs="+", choices=JOB_TYPES, default=JOB_TYPES)
+    parser.add_argument("--inverters", nargs="+", type=int, default=[1, 10])
+    parser.add_argument("--arrays", nargs="+", type=int, default=[1, 2])
+    parser.add_argument(
+        "--granularity",
+        nargs="+",
+        choices=[g.value for g in models.WeatherGranularityEnum],
+        default=["system", "array"],
+    )
+    parser.add_argument(
+        "--step", nargs="+", type=int, default=[60], help="Time step in minutes"
+    )
+    parser.add_argument(
+        "--days", nargs="+", type=int, default=[365], help="Length of the jobs"
+    )
+    parser.add_argument(
+        "--identical-inverters",
+        action="store_true",
+        help="Make every inverter of a system the same, so they are modeled once",
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run all cases in this process instead of a new process for each",
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    run = run_case if args.in_process else _run_isolated
+    results = []
+    for case in cases(args):
+        result = run(case)
+        print(format_result(result), flush=True)
+        results.append(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
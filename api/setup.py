@@ -10,6 +10,7 @@ if __name__ == "__main__":
             "fastapi",
             "httpx",
             "pandas",
+            "prometheus_client",
             "prometheus_fastapi_instrumentator",
             "pvlib",
             "pydantic",
@@ -21,6 +21,10 @@ class Settings(BaseSettings):
     mysql_password: str = "terriblepasswordtochange"
     mysql_database: str = "spi_data"
     mysql_use_ssl: bool = True
+    # most route handlers run at once in the API thread pool. each may hold a
+    # database connection, so keep this near the connection pool size
+    # (5 connections + 10 overflow)
+    api_max_threads: int = 15
 
     redis_host: str = "127.0.0.1"
     redis_port: int = 6379
@@ -30,6 +34,44 @@ class Settings(BaseSettings):
     redis_health_check_interval: int = 10
 
     sync_jobs_period: int = 15
+    # seconds between the sync_jobs cycles that compare every job in the
+    # database with the queue. the cycles in between only check the jobs
+    # modified since the last cycle and the jobs in the failed job registry
+    sync_jobs_full_period: int = 600
+    # seconds between comments sent on an idle job status stream to keep
+    # proxies from closing the connection
+    job_status_stream_keepalive: int = 15
+    # most seconds a job status stream is kept open, after which clients
+    # must reconnect
+    job_status_stream_max_seconds: int = 3600
+
+    # how the ModelChain for each inverter in a job is run, one after another
+    # in the worker ("serial") or spread over a thread or process pool with
+    # at most compute_max_workers workers (default number of CPUs)
+    compute_executor: str = "serial"
+    compute_max_workers: Optional[int] = None
+    # model performance jobs in windows of this many calendar months to limit
+    # memory use for long jobs. None models the whole job at once. Jobs
+    # compared to reference data are always modeled at once
+    compute_window_months: Optional[int] = None
+    # most parsed job definitions to keep in memory for reuse by later requests
+    # and job stages. 0 parses the definition every time
+    job_cache_size: int = 128
+    # most job data objects to read from the database in one call
+    job_data_batch_size: int = 50
+    # most bytes of job data to read from the database in one call, unless a
+    # single object is larger
+    job_data_batch_bytes: int = 64 * 2 ** 20
+    # compress the buffers of stored Arrow data and results with this codec,
+    # "lz4" or "zstd". None stores uncompressed data
+    arrow_compression: Optional[str] = None
+    # Prometheus Pushgateway address to push the job stage metrics to
+    metrics_pushgateway: Optional[str] = None
+    # instance label the metrics of this worker are pushed with, defaults
+    # to the hostname. Should be unique to each worker
+    metrics_instance: Optional[str] = None
+    # save the measurements of each stage as a "timing" result of every job
+    job_timing_result: bool = False
 
     class Config:
         env_prefix = "spi_"
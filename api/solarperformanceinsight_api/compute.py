@@ -1,16 +1,41 @@
 import calendar
-from copy import deepcopy
+from collections import Counter, deque
+import contextlib
+import contextvars
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 import datetime as dt
 from functools import partial
-from itertools import zip_longest
+import hashlib
+import itertools
 import json
 import logging
+import os
 from statistics import mean
-from typing import Callable, Generator, Union, List, Tuple, Optional, Set
+import tempfile
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Union,
+    List,
+    Tuple,
+    Optional,
+    Set,
+)
 from uuid import UUID
 
 
 from fastapi import HTTPException
+import numpy as np
 import pandas as pd
 from pvlib.modelchain import (  # type: ignore
     ModelChainResult,
@@ -19,25 +44,56 @@ from pvlib.modelchain import (  # type: ignore
 )
 
 
-from . import storage, models, utils
-from .pvmodeling import construct_modelchains
+from . import instrumentation, settings, storage, models, utils
+from .pvmodeling import (
+    construct_modelchains,
+    IrradianceTemperatureModelChain,
+    run_modelchain,
+)
 
 
 logger = logging.getLogger(__name__)
 
 
+def _publish_job_status(job_id: UUID, status: models.JobStatus):
+    # queuing imports this module to find run_job
+    from .queuing import _get_redis_conn, publish_job_status
+
+    publish_job_status(_get_redis_conn(), job_id, status)
+
+
 def run_job(job_id: UUID, user: str):
     si = storage.StorageInterface(user=user)
-    try:
+    with instrumentation.time_job(job_id):
+        try:
+            with instrumentation.stage("fetch job"), si.start_transaction() as st:
+                job = st.get_job(job_id)
+        except HTTPException as err:
+            if err.status_code == 404:
+                # job doesn't exist or can't be fetched, so no point continuing
+                return
+            else:  # pragma: no cover
+                raise
+        _publish_job_status(
+            job_id,
+            models.JobStatus(
+                status=models.JobStatusEnum.running,
+                last_change=dt.datetime.now(dt.timezone.utc),
+            ),
+        )
+        # read the uploaded data with as few calls to the database as possible
+        with _prefetch_data(
+            job.object_id,
+            [do.object_id for do in job.data_objects if do.definition.present],
+            si,
+        ):
+            _run_job_func(job_id, job, si)
         with si.start_transaction() as st:
-            job = st.get_job(job_id)
-    except HTTPException as err:
-        if err.status_code == 404:
-            # job doesn't exist or can't be fetched, so no point continuing
-            return
-        else:  # pragma: no cover
-            raise
+            status = st.get_job_status(job_id)
+        _publish_job_status(job_id, status)
 
+
+def _run_job_func(job_id: UUID, job: models.StoredJob, si: storage.StorageInterface):
     job_func = lookup_job_compute_function(job)
     try:
         job_func(job, si)
@@ -81,21 +137,109 @@ def dummy_func(job, storage):  # pragma: no cover
     raise NotImplementedError("Job computation not implemented")
 
 
-def _get_data(
-    job_id: UUID, data_id: UUID, si: storage.StorageInterface
-) -> pd.DataFrame:
-    """Get the data from the database."""
-    with si.start_transaction() as st:
-        meta, data = st.get_job_data(job_id, data_id)
+class _DataPrefetch:
+    """Job data that _get_data will read while a job is run. The first time
+    one of them is read, it is fetched along with the other data that has
+    not been read, up to settings.job_data_batch_size objects and
+    settings.job_data_batch_bytes at once, in a single call to the database."""
+
+    def __init__(
+        self, job_id: UUID, data_ids: List[UUID], si: storage.StorageInterface
+    ):
+        self.job_id = job_id
+        self.si = si
+        # (metadata, data) from get_job_data_bulk, or None until fetched
+        self._data: Dict[
+            UUID, Optional[Tuple[models.StoredJobDataMetadata, bytes]]
+        ] = dict.fromkeys(data_ids)
+        self._sizes: Optional[Dict[UUID, int]] = None
+
+    def __contains__(self, data_id: UUID) -> bool:
+        return data_id in self._data
+
+    def pop(self, data_id: UUID) -> Tuple[models.StoredJobDataMetadata, bytes]:
+        """Fetch the data if needed, and stop keeping it"""
+        if self._data[data_id] is None:
+            others = [
+                did
+                for did, fetched in self._data.items()
+                if fetched is None and did != data_id
+            ]
+            with self.si.start_transaction() as st:
+                if self._sizes is None:
+                    self._sizes = st.get_job_data_sizes(self.job_id)
+                batch = _data_batch(data_id, others, self._sizes)
+                self._data.update(st.get_job_data_bulk(self.job_id, batch))
+        return self._data.pop(data_id)  # type: ignore
+
+
+_current_prefetch: contextvars.ContextVar[
+    Optional[_DataPrefetch]
+] = contextvars.ContextVar("_current_prefetch", default=None)
+
+
+@contextlib.contextmanager
+def _prefetch_data(
+    job_id: UUID, data_ids: List[UUID], si: storage.StorageInterface
+) -> Iterator[_DataPrefetch]:
+    """Read data_ids with a _DataPrefetch when they are read by _get_data in
+    the context. The prefetched data is dropped when the context exits."""
+    prefetch = _DataPrefetch(job_id, data_ids, si)
+    token = _current_prefetch.set(prefetch)
+    try:
+        yield prefetch
+    finally:
+        _current_prefetch.reset(token)
+
+
+def _fetch_data(
+    job_id: UUID,
+    data_id: UUID,
+    si: storage.StorageInterface,
+    prefetch: Optional[_DataPrefetch],
+) -> Tuple[models.StoredJobDataMetadata, bytes]:
+    if prefetch is None or prefetch.job_id != job_id or data_id not in prefetch:
+        with si.start_transaction() as st:
+            return st.get_job_data(job_id, data_id)
+    return prefetch.pop(data_id)
+
+
+def _data_batch(
+    data_id: UUID, others: List[UUID], sizes: Dict[UUID, int]
+) -> List[UUID]:
+    """data_id followed by as many of others as fit in the batch limits"""
+    batch = [data_id]
+    size = sizes.get(data_id, 0)
+    for did in others:
+        if len(batch) >= settings.job_data_batch_size:
+            break
+        if size + sizes.get(did, 0) > settings.job_data_batch_bytes:
+            continue
+        batch.append(did)
+        size += sizes.get(did, 0)
+    return batch
+
+
+def _get_data_bytes(job_id: UUID, data_id: UUID, si: storage.StorageInterface) -> bytes:
+    """Get the Arrow File bytes of the data from the database."""
+    with instrumentation.stage("fetch data") as measurement:
+        meta, data = _fetch_data(job_id, data_id, si, _current_prefetch.get())
+        measurement.bytes_read += len(data)
     if meta.definition.data_format != "application/vnd.apache.arrow.file":
         raise TypeError(
             f"Data for /jobs/{job_id}/data/{data_id} not in Apache Arrow format"
         )
-    out = utils.read_arrow(data)
-    if "time" in out.columns:
-        out = out.set_index("time")  # type: ignore
-    elif "month" in out.columns:
-        out = out.set_index("month")  # type: ignore
+    return data
+
+
+def _get_data(
+    job_id: UUID, data_id: UUID, si: storage.StorageInterface
+) -> pd.DataFrame:
+    """Get the data from the database."""
+    data = _get_data_bytes(job_id, data_id, si)
+    with instrumentation.stage("decode data") as measurement:
+        out = utils.read_arrow_bytes(data)
+        measurement.rows += len(out)
     return out
 
 
@@ -111,38 +255,85 @@ def generate_job_weather_data(
     """Generator to fetch job data at the inverter level to run a
     ModelChain.  Iterates over each inverter in the system and returns a
     list of weather dataframes for the arrays associated with that
-    inverter.
+    inverter. The same dataframe is returned for every array (and for
+    every inverter with system weather) that uses the same data, so the
+    dataframes must not be modified.
     """
+    job_id = job.object_id
+    # only the frames of the previous inverter are kept to share
+    last: Dict[UUID, pd.DataFrame] = {}
+    for data_ids in _job_weather_data_ids(job, types, weather_granularity):
+        current: Dict[UUID, pd.DataFrame] = {}
+        for data_id in data_ids:
+            if data_id not in current:
+                current[data_id] = (
+                    last[data_id] if data_id in last else _get_data(job_id, data_id, si)
+                )
+        yield [current[data_id] for data_id in data_ids]
+        last = current
+
+
+def _spool_job_weather(
+    job: models.StoredJob,
+    si: storage.StorageInterface,
+    directory: str,
+    types=(
+        models.JobDataTypeEnum.reference_weather,
+        models.JobDataTypeEnum.actual_weather,
+    ),
+    weather_granularity=None,
+) -> List[List[utils.ArrowTimeFile]]:
+    """Fetch the weather data of each array of each inverter, like
+    generate_job_weather_data, but save the Arrow File bytes to files in
+    directory instead of decoding them, so the weather of a long job is not
+    held in memory. Data used by more than one array or inverter is fetched
+    and saved once and the same ArrowTimeFile is returned for each."""
+    job_id = job.object_id
+    files: Dict[UUID, utils.ArrowTimeFile] = {}
+    out = []
+    for data_ids in _job_weather_data_ids(job, types, weather_granularity):
+        for data_id in data_ids:
+            if data_id not in files:
+                data = _get_data_bytes(job_id, data_id, si)
+                with instrumentation.stage("spool data") as measurement:
+                    files[data_id] = utils.ArrowTimeFile(
+                        data, os.path.join(directory, str(data_id))
+                    )
+                    measurement.bytes_written += len(data)
+                del data
+        out.append([files[data_id] for data_id in data_ids])
+    return out
+
+
+def _job_weather_data_ids(
+    job: models.StoredJob, types, weather_granularity
+) -> Generator[List[UUID], None, None]:
+    """The id of the weather data of each array of each inverter"""
     data_id_by_schema_path = {
         do.definition.schema_path: do.object_id
         for do in job.data_objects
         if do.definition.type in types
     }
-    job_id = job.object_id
     num_inverters = len(job.definition.system_definition.inverters)
     if weather_granularity is None:
         weather_granularity = getattr(job.definition.parameters, "weather_granularity")
 
     if weather_granularity == models.WeatherGranularityEnum.system:
         data_id = data_id_by_schema_path["/"]
-        df = _get_data(job_id, data_id, si)
         for i in range(num_inverters):
             num_arrays = len(job.definition.system_definition.inverters[i].arrays)
-            yield [df.copy()] * num_arrays
+            yield [data_id] * num_arrays
     elif weather_granularity == models.WeatherGranularityEnum.inverter:
         for i in range(num_inverters):
             num_arrays = len(job.definition.system_definition.inverters[i].arrays)
-            data_id = data_id_by_schema_path[f"/inverters/{i}"]
-            df = _get_data(job_id, data_id, si)
-            yield [df] * num_arrays
+            yield [data_id_by_schema_path[f"/inverters/{i}"]] * num_arrays
     elif weather_granularity == models.WeatherGranularityEnum.array:
         for i in range(num_inverters):
             num_arrays = len(job.definition.system_definition.inverters[i].arrays)
-            data_ids = [
+            yield [
                 data_id_by_schema_path[f"/inverters/{i}/arrays/{j}"]
                 for j in range(num_arrays)
             ]
-            yield [_get_data(job_id, data_id, si) for data_id in data_ids]
     else:
         raise ValueError(f"Unknown weather granularity {weather_granularity}")
 
@@ -184,9 +375,15 @@ class DBResult(models.JobResultMetadata):
     data: bytes  # feather format
 
     def __init__(self, **kwargs):
-        kwargs["data"] = utils.dump_arrow_bytes(
-            utils.convert_to_arrow(kwargs.pop("data").reset_index())
-        )
+        # data may already be converted to Arrow bytes
+        if not isinstance(kwargs["data"], bytes):
+            with instrumentation.stage("serialize results") as measurement:
+                df = kwargs.pop("data")
+                kwargs["data"] = utils.dump_arrow_bytes(
+                    utils.convert_to_arrow(df.reset_index())
+                )
+                measurement.rows += len(df)
+                measurement.bytes_written += len(kwargs["data"])
         super().__init__(**kwargs)
 
     def __repr__(self):  # pragma: no cover
@@ -194,14 +391,29 @@ class DBResult(models.JobResultMetadata):
 
 
 def save_results_to_db(
-    job_id: UUID, result_list: List[DBResult], si: storage.StorageInterface
+    job_id: UUID, result_list: Iterable[DBResult], si: storage.StorageInterface
 ):
-    with si.start_transaction() as st:
-        for result in result_list:
-            st.add_job_result(
-                job_id, result.schema_path, result.type, result.data_format, result.data
-            )
-        st.set_job_complete(job_id)
+    timer = instrumentation.current_timer()
+    if settings.job_timing_result and timer is not None:
+        # timing up to this point, saving the results is only logged
+        result_list = itertools.chain(
+            result_list,
+            [DBResult(schema_path="/", type="timing", data=timer.to_frame())],
+        )
+    with instrumentation.stage("save results") as measurement:
+        with si.start_transaction() as st:
+            st.add_job_results(job_id, _result_rows(result_list, measurement))
+            st.set_job_complete(job_id)
+
+
+def _result_rows(
+    result_list: Iterable[DBResult], measurement: instrumentation.Measurement
+) -> Generator[Tuple[str, str, str, bytes], None, None]:
+    """The arguments to add_job_result of each result, counting the bytes
+    written"""
+    for result in result_list:
+        measurement.bytes_written += len(result.data)
+        yield result.schema_path, result.type, result.data_format, result.data
 
 
 def _adjust_frame(
@@ -223,12 +435,51 @@ def _adjust_frame(
     return out
 
 
+def _shift_frame(df: pd.DataFrame, tshift: dt.timedelta) -> pd.DataFrame:
+    """Shift the index of df by tshift. Unlike DataFrame.shift, the data is
+    not copied, so the output shares data with df."""
+    out = df.copy(deep=False)
+    out.index = df.index + tshift
+    return out
+
+
+class _WeatherShifter:
+    """Shift the weather data of each inverter by tshift before running a
+    ModelChain. A frame that was also in the previous weather data, like
+    system level weather that is the same frame for every inverter, is only
+    shifted once and the same shifted frame is returned again. Only the
+    frames of the previous call are kept, so inverter and array level
+    weather is not held in memory for the whole job."""
+
+    def __init__(self, tshift: dt.timedelta):
+        self.tshift = tshift
+        self._last: Dict[int, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+
+    def __call__(self, weather_data: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        if not isinstance(weather_data, (list, tuple)):
+            return weather_data
+        current: Dict[int, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+        out = []
+        for df in weather_data:
+            key = id(df)
+            if key not in current:
+                # keep df with the shifted frame so its id isn't reused
+                current[key] = self._last.get(key) or (
+                    df,
+                    _shift_frame(df, self.tshift),
+                )
+            out.append(current[key][1])
+        self._last = current
+        return out
+
+
 def process_single_modelchain(
     chain: ModelChain,
     weather_data: List[pd.DataFrame],
     run_model_method: str,
     tshift: dt.timedelta,
     inverter_num: int,
+    shift_weather: bool = True,
 ) -> Tuple[List[DBResult], pd.DataFrame]:
     """Run and process a single ModelChain
 
@@ -246,6 +497,8 @@ def process_single_modelchain(
         Typically half the interval length.
     inverter_num : int
         Which inverter in the full system this chain is for
+    shift_weather : bool
+        If False, weather_data has already been shifted by tshift
 
     Returns
     -------
@@ -257,11 +510,21 @@ def process_single_modelchain(
         A frame with the AC performance result, zenith angle, and average of
         poa_global, effective_irradiance, and cell_temperature over all arrays
     """
-    # run chain
-    mc = getattr(chain, run_model_method)(
-        [d.shift(freq=tshift) for d in weather_data]  # type: ignore
-    )
-    results = mc.results
+    if shift_weather:
+        weather_data = [_shift_frame(d, tshift) for d in weather_data]
+    results = run_modelchain(chain, run_model_method, weather_data)
+    return _process_modelchain_results(chain, results, tshift, inverter_num)
+
+
+@instrumentation.stage("assemble results")
+def _process_modelchain_results(
+    chain: ModelChain,
+    results: ModelChainResult,
+    tshift: dt.timedelta,
+    inverter_num: int,
+) -> Tuple[List[DBResult], pd.DataFrame]:
+    """Make the DBResults and summary frame returned by
+    process_single_modelchain from the results of running chain"""
     adjust = partial(_adjust_frame, tshift=tshift)
     performance: pd.DataFrame = adjust(
         results.ac, name="performance"
@@ -276,7 +539,7 @@ def process_single_modelchain(
     )
 
     # make nice result output
-    num_arrays = len(mc.system.arrays)
+    num_arrays = len(chain.system.arrays)
     out = []
     for i in range(num_arrays):
         array_weather: pd.DataFrame = (results.effective_irradiance[i]).to_frame(
@@ -311,7 +574,7 @@ def process_single_modelchain(
         # modelchain passes through air temperature and pressure, but that only
         # affects apparent_zenith
         adjusted_zenith = adjust(
-            mc.location.get_solarposition(
+            chain.location.get_solarposition(
                 weather_avg.index.shift(freq=tshift)  # type: ignore
             )[["zenith"]]
         )  # type: ignore
@@ -334,6 +597,497 @@ def process_single_modelchain(
     return out, summary_frame
 
 
+class _SerialExecutor(Executor):
+    """Executor that runs each call as soon as it is submitted"""
+
+    def submit(self, fn, *args, **kwargs):
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as err:
+            future.set_exception(err)
+        return future
+
+
+class _ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs calls in a copy of the submitter's
+    context, so stages of the job are measured in the threads too"""
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _get_max_workers() -> int:
+    return settings.compute_max_workers or os.cpu_count() or 1
+
+
+def _get_executor() -> Executor:
+    """Get the executor to run ModelChains with according to
+    settings.compute_executor"""
+    if settings.compute_executor == "serial":
+        return _SerialExecutor()
+    elif settings.compute_executor == "thread":
+        return _ContextThreadPoolExecutor(max_workers=_get_max_workers())
+    elif settings.compute_executor == "process":
+        return ProcessPoolExecutor(max_workers=_get_max_workers())
+    else:
+        raise ValueError(f"Unknown compute executor {settings.compute_executor}")
+
+
+def _inverter_key(inverter: models.Inverter) -> str:
+    """Key of everything about an inverter and its arrays that affects the
+    modeling, i.e. all parameters except for names"""
+    return json.dumps(
+        inverter.dict(
+            exclude={
+                "name": ...,
+                "make_model": ...,
+                "arrays": {"__all__": {"name", "make_model"}},
+            }
+        ),
+        sort_keys=True,
+    )
+
+
+def _hash_frame(df: pd.DataFrame) -> str:
+    """Hash the contents, index, and columns of df"""
+    return hashlib.sha256(
+        pd.util.hash_pandas_object(df, index=True).values.tobytes()
+        + ",".join(map(str, df.columns)).encode()
+    ).hexdigest()
+
+
+class _WeatherKey:
+    """Hash the contents of the weather data of each array, or None if the
+    data can't be hashed. Like _WeatherShifter, a frame that was also in the
+    previous weather data, like system level weather that is the same frame
+    for every inverter, is only hashed once."""
+
+    def __init__(self):
+        self._last: Dict[int, Tuple[pd.DataFrame, str]] = {}
+
+    def __call__(self, weather_data: List[pd.DataFrame]) -> Optional[Tuple[str, ...]]:
+        if not isinstance(weather_data, (list, tuple)):
+            return None
+        current: Dict[int, Tuple[pd.DataFrame, str]] = {}
+        out = []
+        for df in weather_data:
+            if not isinstance(df, pd.DataFrame):
+                return None
+            key = id(df)
+            if key not in current:
+                # keep df with the hash so its id isn't reused
+                current[key] = self._last.get(key) or (df, _hash_frame(df))
+            out.append(current[key][1])
+        self._last = current
+        return tuple(out)
+
+
+def _relabel_results(
+    results: List[DBResult], from_inverter: int, to_inverter: int
+) -> List[DBResult]:
+    """Copy the DBResults of one inverter to use for another inverter"""
+    prefix = f"/inverters/{from_inverter}"
+    return [
+        res.copy(
+            update={
+                "schema_path": f"/inverters/{to_inverter}"
+                + res.schema_path[len(prefix) :]
+            }
+        )
+        for res in results
+    ]
+
+
+def _run_modelchains(
+    inverters: List[models.Inverter],
+    chains: List[ModelChain],
+    weather_gen: Iterable[List[pd.DataFrame]],
+    run_model_method: str,
+    tshift: dt.timedelta,
+    executor: Optional[Executor] = None,
+    process: Optional[Callable[..., Tuple[Any, ...]]] = None,
+) -> Generator[Tuple[Any, ...], None, None]:
+    """Run process_single_modelchain, or process if given, for each inverter
+    with the configured executor, or with executor if given (it is then left
+    open). process is called like process_single_modelchain and must return
+    the DBResults of the inverter first. Outputs are yielded in inverter
+    order regardless of when each chain finishes, so anything reduced from
+    them matches a serial run exactly. Only a few chains per worker are in
+    flight at once to keep memory bounded when there are many inverters.
+
+    Inverters with the same parameters and the same weather data are only
+    run once, and the results of the first such inverter are copied for
+    the others. Weather data shared by inverters is only shifted once.
+    """
+    max_pending = 2 * _get_max_workers()
+    pending: Deque[Tuple[int, int, Future]] = deque()
+    inverter_keys = [_inverter_key(inv) for inv in inverters]
+    counts = Counter(inverter_keys)
+    remaining = counts.copy()
+    # first inverter and its future for each key that may be duplicated later
+    computed: Dict[Tuple[str, Tuple[str, ...]], Tuple[int, Future]] = {}
+    shift = _WeatherShifter(tshift)
+    weather_key_of = _WeatherKey()
+
+    if process is None:
+        process = process_single_modelchain
+
+    def _output(i: int, first: int, future: Future):
+        db_results, *outputs = future.result()
+        if i != first:
+            db_results = _relabel_results(db_results, first, i)
+        return (db_results, *outputs)
+
+    executor_context = (
+        _get_executor() if executor is None else contextlib.nullcontext(executor)
+    )
+    with executor_context as executor:
+        for i, weather_data in enumerate(weather_gen):
+            inv_key = inverter_keys[i]
+            remaining[inv_key] -= 1
+            weather_key = None
+            if counts[inv_key] > 1:
+                weather_key = weather_key_of(weather_data)
+
+            if weather_key is not None and (inv_key, weather_key) in computed:
+                first, future = computed[(inv_key, weather_key)]
+            else:
+                first = i
+                future = executor.submit(
+                    process,
+                    chains[i],
+                    shift(weather_data),
+                    run_model_method,
+                    tshift,
+                    i,
+                    shift_weather=False,
+                )
+                if weather_key is not None and remaining[inv_key] > 0:
+                    computed[(inv_key, weather_key)] = (i, future)
+            pending.append((i, first, future))
+            if remaining[inv_key] == 0:
+                # no more inverters can reuse these results
+                for key in [k for k in computed if k[0] == inv_key]:
+                    del computed[key]
+
+            while pending and (len(pending) >= max_pending or pending[0][2].done()):
+                yield _output(*pending.popleft())
+        while pending:
+            yield _output(*pending.popleft())
+
+
+class _PerformanceSummary:
+    """Add up the summary frames from process_single_modelchain for each
+    inverter and make the system level results from them"""
+
+    def __init__(self, job_time_range: pd.DatetimeIndex):
+        self.job_time_range = job_time_range
+        self.summary = pd.DataFrame(
+            {
+                "performance": 0,  # type: ignore
+                "poa_global": 0,  # type: ignore
+                "effective_irradiance": 0,  # type: ignore
+                "cell_temperature": 0,  # type: ignore
+                "zenith": 0,  # type: ignore
+            },
+            index=job_time_range,
+        )
+        self.summary.index.name = "time"  # type: ignore
+        self.weather_count = 0
+
+    def add(self, summary_frame: pd.DataFrame):
+        self.summary += summary_frame  # type: ignore
+        self.weather_count += 1
+
+    def _reduce(
+        self, missing_leap_days: List[dt.datetime]
+    ) -> Tuple[pd.Series, pd.Series, pd.Series, pd.DataFrame, pd.Series]:
+        summary = self.summary
+        # keep performance as sum, but make everything else average over inverters
+        total_performance = summary.pop("performance")  # type: ignore
+        # summary up to now is sum of array-averaged weather for each inverter
+        summary /= self.weather_count  # type: ignore
+        # summary is now average over inverters
+        # average zenith
+        daytime = summary.pop("zenith") < 87.0  # type: ignore
+        daytime.name = "daytime_flag"  # type: ignore
+        # index of data actually uploaded - any leap days that shouldn't be in
+        # the summaries
+        input_data_range = daytime.dropna().index.difference(
+            pd.DatetimeIndex(missing_leap_days)  # type: ignore
+        )
+        # cell temp will be averaged over a month
+        daytime_cell_temp = summary.pop("cell_temperature").loc[daytime]  # type: ignore
+        # resample rest of summary for insolation
+        # only use data from input range
+        insolation = summary.loc[input_data_range].resample("1h").mean()
+        ac_energy = total_performance.loc[input_data_range].resample("1h").mean()
+        return total_performance, daytime, daytime_cell_temp, insolation, ac_energy
+
+    @instrumentation.stage("assemble results")
+    def results(
+        self, missing_leap_days: List[dt.datetime] = []
+    ) -> Tuple[pd.Series, List[DBResult]]:
+        """Monthly energy and the monthly summary, daytime flag, and total
+        system performance DBResults. Consumes the summary, so only call once
+        after all inverters have been added."""
+        (
+            total_performance,
+            daytime,
+            daytime_cell_temp,
+            insolation,
+            ac_energy,
+        ) = self._reduce(missing_leap_days)
+        # months in output according to job time range
+        months = self.job_time_range.month.unique().sort_values()  # type: ignore
+        avg_cell_temp = (
+            daytime_cell_temp.groupby(daytime_cell_temp.index.month)
+            .mean()
+            .reindex(months)
+        )
+        insolation_sum = (
+            insolation.groupby(insolation.index.month).sum().reindex(months)
+        )  # Wh/m^2
+        monthly_energy = (
+            ac_energy.groupby(ac_energy.index.month).sum().reindex(months)
+        )  # Wh
+        return monthly_energy, _summary_results(
+            months,
+            monthly_energy,
+            insolation_sum,
+            avg_cell_temp,
+            daytime.to_frame(),
+            total_performance.to_frame(),
+        )
+
+    @instrumentation.stage("assemble results")
+    def monthly_totals(
+        self, missing_leap_days: List[dt.datetime] = []
+    ) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+        """Sums over each month of performance, insolation, and daytime cell
+        temperature (with counts) that can be added to the totals of other
+        time windows, and the daytime flag and total performance. Consumes the
+        summary like results."""
+        (
+            total_performance,
+            daytime,
+            daytime_cell_temp,
+            insolation,
+            ac_energy,
+        ) = self._reduce(missing_leap_days)
+        cell_temp_by_month = daytime_cell_temp.groupby(daytime_cell_temp.index.month)
+        totals = pd.concat(
+            [
+                ac_energy.groupby(ac_energy.index.month).sum(),
+                insolation.groupby(insolation.index.month).sum(),
+                cell_temp_by_month.sum().rename("cell_temperature_sum"),
+                cell_temp_by_month.count().rename("cell_temperature_count"),
+            ],
+            axis=1,
+        )
+        return totals, daytime, total_performance
+
+
+def _summary_results(
+    months: pd.Index,
+    monthly_energy: pd.Series,
+    insolation_sum: pd.DataFrame,
+    avg_cell_temp: pd.Series,
+    daytime: Union[pd.DataFrame, bytes],
+    total_performance: Union[pd.DataFrame, bytes],
+) -> List[DBResult]:
+    """Monthly summary, daytime flag, and total performance DBResults"""
+    month_summary = insolation_sum.rename(
+        columns={
+            "poa_global": "plane_of_array_insolation",
+            "effective_irradiance": "effective_insolation",
+        }
+    )
+    month_summary.insert(0, "total_energy", monthly_energy)
+    month_summary.insert(
+        len(month_summary.columns),
+        "average_daytime_cell_temperature",
+        avg_cell_temp,
+    )
+    month_name_index = pd.Index([calendar.month_name[i] for i in months], name="month")
+    month_summary.index = month_name_index
+    return [
+        DBResult(schema_path="/", type="monthly summary", data=month_summary),
+        DBResult(
+            schema_path="/",
+            type="daytime flag",
+            data=daytime,
+        ),
+        DBResult(
+            schema_path="/",
+            type="performance data",
+            data=total_performance,
+        ),
+    ]
+
+
+def _time_windows(time_range: pd.DatetimeIndex, months: int) -> List[pd.DatetimeIndex]:
+    """Split time_range into windows of `months` whole calendar months"""
+    month_number = np.asarray(time_range.year * 12 + time_range.month)
+    window_number = (month_number - month_number[0]) // months
+    breaks = list(np.flatnonzero(np.diff(window_number)) + 1)
+    return [
+        time_range[start:end]
+        for start, end in zip([0] + breaks, breaks + [len(time_range)])
+    ]
+
+
+def _window_weather(
+    weather_data: List[List[utils.ArrowTimeFile]], window: pd.DatetimeIndex
+) -> Generator[List[pd.DataFrame], None, None]:
+    """Read the rows of the spooled weather data of each inverter that are
+    in window. Data shared by arrays or inverters is only read once, so the
+    frames are also shared and only shifted once by _run_modelchains."""
+    frames: Dict[int, pd.DataFrame] = {}
+    for inv_weather in weather_data:
+        out = []
+        for data in inv_weather:
+            if id(data) not in frames:
+                with instrumentation.stage("decode data") as measurement:
+                    df = data.read_between(window[0], window[-1])
+                    measurement.rows += len(df)
+                frames[id(data)] = df
+            out.append(frames[id(data)])
+        yield out
+
+
+class _ResultSpool:
+    """Save the Arrow data of the parts of each result to files in directory,
+    so the results of every time window are not held in memory. The parts of
+    a result are only joined when it is read."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._parts: Dict[Tuple[str, str], List[str]] = {}
+        self._count = 0
+
+    def add(self, schema_path: str, type_: str, data: bytes):
+        path = os.path.join(self.directory, f"part{self._count}")
+        self._count += 1
+        with open(path, "wb") as f:
+            f.write(data)
+        self._parts.setdefault((schema_path, type_), []).append(path)
+
+    def pop(self, schema_path: str, type_: str) -> bytes:
+        """The joined data of the result, which is removed from the spool"""
+        paths = self._parts.pop((schema_path, type_))
+        out = utils.concat_arrow_files(paths)
+        for path in paths:
+            os.remove(path)
+        return out
+
+    def results(self) -> Generator[DBResult, None, None]:
+        """Pop each result in the order it was first added as a DBResult"""
+        for schema_path, type_ in list(self._parts):
+            yield DBResult(
+                schema_path=schema_path,
+                type=type_,
+                data=self.pop(schema_path, type_),
+            )
+
+
+def _spooled_results(
+    spool_dir: tempfile.TemporaryDirectory,
+    spool: _ResultSpool,
+    months: pd.Index,
+    monthly_energy: pd.Series,
+    insolation_sum: pd.DataFrame,
+    avg_cell_temp: pd.Series,
+) -> Generator[DBResult, None, None]:
+    """The inverter and array results in spool followed by the summary
+    results. spool_dir is removed once they have all been generated."""
+    with spool_dir:
+        daytime = spool.pop("/", "daytime flag")
+        total_performance = spool.pop("/", "performance data")
+        yield from spool.results()
+        yield from _summary_results(
+            months,
+            monthly_energy,
+            insolation_sum,
+            avg_cell_temp,
+            daytime,
+            total_performance,
+        )
+
+
+def _calculate_performance_by_window(
+    inverters: List[models.Inverter],
+    chains: List[ModelChain],
+    weather_data: List[List[utils.ArrowTimeFile]],
+    run_model_method: str,
+    tshift: dt.timedelta,
+    job_time_range: pd.DatetimeIndex,
+    windows: List[pd.DatetimeIndex],
+    missing_leap_days: List[dt.datetime],
+) -> Tuple[pd.Series, Iterable[DBResult]]:
+    """Run the chains for one time window at a time so that only the pvlib
+    results and weather of a single window are in memory. The weather data
+    is read from files one window at a time. The results of each window are
+    saved to temporary files as Arrow data and only joined into a single
+    result per inverter (or array) and type as the returned results are
+    iterated. The monthly sums of each window are added up to make the
+    monthly summary, which is possible since windows contain whole months."""
+    spool_dir = tempfile.TemporaryDirectory(prefix="spi-results-")
+    spool = _ResultSpool(spool_dir.name)
+    totals = []
+    try:
+        with _get_executor() as executor:
+            for window in windows:
+                window_summary = _PerformanceSummary(window)
+                for db_results, array_summary in _run_modelchains(
+                    inverters,
+                    chains,
+                    _window_weather(weather_data, window),
+                    run_model_method,
+                    tshift,
+                    executor=executor,
+                ):
+                    for res in db_results:
+                        spool.add(res.schema_path, res.type, res.data)
+                    window_summary.add(array_summary)
+                (
+                    window_totals,
+                    daytime,
+                    total_performance,
+                ) = window_summary.monthly_totals(missing_leap_days)
+                totals.append(window_totals)
+                spool.add(
+                    "/",
+                    "daytime flag",
+                    utils.dump_arrow_bytes(
+                        utils.convert_to_arrow(daytime.reset_index())
+                    ),
+                )
+                spool.add(
+                    "/",
+                    "performance data",
+                    utils.dump_arrow_bytes(
+                        utils.convert_to_arrow(
+                            total_performance.to_frame().reset_index()
+                        )
+                    ),
+                )
+    except BaseException:
+        spool_dir.cleanup()
+        raise
+
+    months = job_time_range.month.unique().sort_values()  # type: ignore
+    total = pd.concat(totals).groupby(level=0).sum(min_count=1).reindex(months)
+    monthly_energy = total.pop("performance")
+    avg_cell_temp = total.pop("cell_temperature_sum") / total.pop(
+        "cell_temperature_count"
+    )
+    return monthly_energy, _spooled_results(
+        spool_dir, spool, months, monthly_energy, total, avg_cell_temp
+    )
+
+
 def _calculate_performance(
     job: models.StoredJob,
     si: storage.StorageInterface,
@@ -344,112 +1098,69 @@ def _calculate_performance(
     weather_granularity: Optional[models.WeatherGranularityEnum] = None,
     run_model_method: Optional[str] = None,
     missing_leap_days: List[dt.datetime] = [],
-) -> Tuple[pd.Series, List[DBResult]]:
+) -> Tuple[pd.Series, Iterable[DBResult]]:
     """Compute the performance, and other modeling variables, for the Job and
     store the inverter level performance, total system performance, array level weather,
-    and a monthly summary to the database for retrieval
+    and a monthly summary to the database for retrieval. When modeled in time
+    windows, the results are generated as they are iterated, so only iterate
+    them once.
     """
     time_params: models.JobTimeindex = (
         job.definition.parameters.time_parameters  # type: ignore
     )
     job_time_range = time_params._time_range
-    summary = pd.DataFrame(
-        {
-            "performance": 0,  # type: ignore
-            "poa_global": 0,  # type: ignore
-            "effective_irradiance": 0,  # type: ignore
-            "cell_temperature": 0,  # type: ignore
-            "zenith": 0,  # type: ignore
-        },
-        index=job_time_range,
-    )
-    summary.index.name = "time"  # type: ignore
     if run_model_method is None:
         run_model_method = job.definition._model_chain_method
     # compute solar position at the middle of the interval
     # positive value assumes left (beginning) label convention
     tshift = time_params.step / 2
+    inverters = job.definition.system_definition.inverters
     chains = construct_modelchains(job.definition.system_definition)
-
-    weather_count = 0
-    # result from each inverter...
-    result_list = []
     # get weather data for each inverter as List[pd.DataFrame] to pass
     # directly to the appropriate ModelChain run function for multiple arrays
     # Weather data is shifted right by half the interval length and
     # process_single_modelchain shifts the results back to original labels
     # so that solar position used for modeling is midpoint of interval
-    for i, weather_data in enumerate(
-        generate_job_weather_data(
-            job, si, types=weather_types, weather_granularity=weather_granularity
-        )
+    if settings.compute_window_months is not None:
+        windows = _time_windows(job_time_range, settings.compute_window_months)
+        if len(windows) > 1:
+            with tempfile.TemporaryDirectory(prefix="spi-weather-") as weather_dir:
+                return _calculate_performance_by_window(
+                    inverters,
+                    chains,
+                    _spool_job_weather(
+                        job,
+                        si,
+                        weather_dir,
+                        types=weather_types,
+                        weather_granularity=weather_granularity,
+                    ),
+                    run_model_method,  # type: ignore
+                    tshift,
+                    job_time_range,
+                    windows,
+                    missing_leap_days,
+                )
+
+    weather_gen = generate_job_weather_data(
+        job, si, types=weather_types, weather_granularity=weather_granularity
+    )
+    summary = _PerformanceSummary(job_time_range)
+    # result from each inverter...
+    result_list = []
+    # Inverters may be run in parallel, but summaries are always added up in
+    # inverter order
+    for db_results, array_summary in _run_modelchains(
+        inverters,
+        chains,
+        weather_gen,
+        run_model_method,  # type: ignore
+        tshift,
     ):
-        db_results, array_summary = process_single_modelchain(
-            chains[i], weather_data, run_model_method, tshift, i  # type: ignore
-        )
         result_list += db_results
-        summary += array_summary  # type: ignore
-        weather_count += 1
-    # keep performance as sum, but make everything else average over inverters
-    total_performance = summary.pop("performance")  # type: ignore
-    # summary up to now is sum of array-averaged weather for each inverter
-    summary /= weather_count  # type: ignore
-    # summary is now average over inverters
-    # average zenith
-    daytime = summary.pop("zenith") < 87.0  # type: ignore
-    daytime.name = "daytime_flag"  # type: ignore
-    # index of data actually uploaded - any leap days that shouldn't be in the summaries
-    input_data_range = daytime.dropna().index.difference(
-        pd.DatetimeIndex(missing_leap_days)  # type: ignore
-    )
-    # months in output according to job time range
-    months = job_time_range.month.unique().sort_values()  # type: ignore
-
-    # cell temp will be averaged over a month
-    daytime_cell_temp = summary.pop("cell_temperature").loc[daytime]  # type: ignore
-    avg_cell_temp = (
-        daytime_cell_temp.groupby(daytime_cell_temp.index.month).mean().reindex(months)
-    )
-    # resample rest of summary for insolation
-    # only use data from input range
-    insolation = summary.loc[input_data_range].resample("1h").mean()
-    month_summary = (
-        insolation.groupby(insolation.index.month)
-        .sum()
-        .reindex(months)
-        .rename(
-            columns={
-                "poa_global": "plane_of_array_insolation",
-                "effective_irradiance": "effective_insolation",
-            }
-        )
-    )  # Wh/m^2
-    ac_energy = total_performance.loc[input_data_range].resample("1h").mean()
-    monthly_energy = (
-        ac_energy.groupby(ac_energy.index.month).sum().reindex(months)
-    )  # Wh
-    month_summary.insert(0, "total_energy", monthly_energy)
-    month_summary.insert(
-        len(month_summary.columns), "average_daytime_cell_temperature", avg_cell_temp
-    )
-    month_name_index = pd.Index([calendar.month_name[i] for i in months], name="month")
-    month_summary.index = month_name_index
-
-    result_list.extend(
-        [
-            DBResult(schema_path="/", type="monthly summary", data=month_summary),
-            DBResult(
-                schema_path="/",
-                type="daytime flag",
-                data=daytime.to_frame(),
-            ),
-            DBResult(
-                schema_path="/",
-                type="performance data",
-                data=total_performance.to_frame(),
-            ),
-        ]
-    )
+        summary.add(array_summary)
+    monthly_energy, summary_results = summary.results(missing_leap_days)
+    result_list.extend(summary_results)
     return monthly_energy, result_list
 
 
@@ -508,23 +1219,29 @@ def compare_modeled_and_actual(job: models.StoredJob, si: storage.StorageInterfa
     )
     month_name_index = pd.Index([calendar.month_name[i] for i in months], name="month")
     comparison_summary.index = month_name_index
-    result_list.append(
-        DBResult(
-            schema_path="/", type="actual vs modeled energy", data=comparison_summary
-        )
+    result_list = itertools.chain(
+        result_list,
+        [
+            DBResult(
+                schema_path="/",
+                type="actual vs modeled energy",
+                data=comparison_summary,
+            )
+        ],
     )
     save_results_to_db(job.object_id, result_list, si)
 
 
-def _zero_nans(out: pd.Series, a: pd.Series) -> pd.Series:
-    a_almost_zero = a.abs() < 1e-16  # type: ignore
-    nans = pd.isnull(out)  # nan when 0 / 0,  a > 0 /0 => inf
-    out[a_almost_zero & nans] = 0.0  # type: ignore
+def _zero_nans(out: np.ndarray, a: np.ndarray) -> np.ndarray:
+    a_almost_zero = np.abs(a) < 1e-16
+    nans = np.isnan(out)  # nan when 0 / 0,  a > 0 /0 => inf
+    out[a_almost_zero & nans] = 0.0
     return out
 
 
-def _zero_div(a: pd.Series, b: pd.Series) -> pd.Series:
-    out = a / b
+def _zero_div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = a / b
     return _zero_nans(out, a)
 
 
@@ -533,12 +1250,44 @@ def _temp_factor(gamma, t_ref, t_actual):
     return _zero_div(1 + gamma * (t_actual - t0), 1 + gamma * (t_ref - t0))
 
 
-def _inf_mul(a: pd.Series, b: pd.Series) -> pd.Series:
+def _inf_mul(a: np.ndarray, b: np.ndarray) -> np.ndarray:
     """set 0 * inf = 0"""
-    out = a * b
+    with np.errstate(invalid="ignore"):
+        out = a * b
     return _zero_nans(out, a)
 
 
+def _stack(series: Tuple[pd.Series, ...]) -> np.ndarray:
+    """Array level series as an (arrays, time) float array"""
+    return np.stack([np.asarray(ser, dtype=float) for ser in series])
+
+
+def _weather_adjustment(
+    poa_ref: np.ndarray,
+    poa_actual: np.ndarray,
+    t_ref: np.ndarray,
+    t_actual: np.ndarray,
+    gammas: np.ndarray,
+    ref_performance: np.ndarray,
+    pac0: float,
+    dc: bool,
+) -> np.ndarray:
+    """Adjust the inverter reference performance by the mean over the arrays
+    of the ratio of actual to reference POA irradiance times the
+    temperature factor. Irradiance and temperature are (arrays, time) and
+    gammas is (arrays, 1). DC reference performance is converted to AC
+    before clipping to pac0."""
+    poa_rat_x_temp_factor = _zero_div(poa_actual, poa_ref)
+    poa_rat_x_temp_factor *= _temp_factor(gammas, t_ref, t_actual)
+    # mean of array POArat * TempFactor for this inverter
+    # adding one array at a time matches the previous sum over arrays
+    ratio = poa_rat_x_temp_factor.sum(axis=0) / poa_rat_x_temp_factor.shape[0]
+    pac_ref_adj = _inf_mul(ref_performance, ratio)
+    if dc:
+        pac_ref_adj *= 0.985
+    return np.minimum(pac_ref_adj, pac0, out=pac_ref_adj)
+
+
 def _get_mc_dc(mcresult: ModelChainResult, num_arrays: int) -> pd.DataFrame:
     test = mcresult.dc[0]
     if isinstance(test, pd.DataFrame):
@@ -549,11 +1298,12 @@ def _get_mc_dc(mcresult: ModelChainResult, num_arrays: int) -> pd.DataFrame:
 
 
 def _get_temp(
-    weather_df: Tuple[pd.DataFrame, ...],
+    weather_df: List[pd.DataFrame],
     cell_temp: Tuple[pd.Series, ...],
     arrays: List[models.PVArray],
-    tshift: dt.timedelta,
 ) -> Tuple[pd.Series, ...]:
+    """Cell temperature, or module temperature from the (already shifted)
+    weather data when the temperature model can't use it"""
     out = []
     for df, ct, arr in zip(weather_df, cell_temp, arrays):
         if (
@@ -562,7 +1312,7 @@ def _get_temp(
             )
             and "module_temperature" in df.columns
         ):
-            out.append(df["module_temperature"].shift(freq=tshift))  # type: ignore
+            out.append(df["module_temperature"])
         else:
             out.append(ct)
     return tuple(out)
@@ -594,13 +1344,48 @@ def _get_missing_leap_days(dfs: List[pd.DataFrame]) -> Set[dt.datetime]:
     return out
 
 
+def _process_modeled_performance(
+    inverters: List[models.Inverter],
+    chain: ModelChain,
+    weather_data: List[pd.DataFrame],
+    run_model_method: str,
+    tshift: dt.timedelta,
+    inverter_num: int,
+    shift_weather: bool = True,
+) -> Tuple[List[DBResult], pd.DataFrame, Tuple[pd.Series, ...], Tuple[pd.Series, ...]]:
+    """Run and process a single ModelChain like process_single_modelchain,
+    also returning the (shifted) plane of array irradiance and temperature of
+    each array used to weather adjust the reference performance"""
+    if shift_weather:
+        weather_data = [_shift_frame(d, tshift) for d in weather_data]
+    results = run_modelchain(chain, run_model_method, weather_data)
+    db_results, summary_frame = _process_modelchain_results(
+        chain, results, tshift, inverter_num
+    )
+    # use pvlib.modelchain._irrad_for_celltemp that returns POA global if available
+    # otherwise uses effective irradiance
+    poa = _irrad_for_celltemp(results.total_irrad, results.effective_irradiance)
+    temp = _get_temp(
+        weather_data, results.cell_temperature, inverters[inverter_num].arrays
+    )
+    return db_results, summary_frame, poa, temp
+
+
 def _calculate_weather_adjusted_reference_performance(
     job: models.StoredJob,
     si: storage.StorageInterface,
     actual_data_parameters: Union[
         None, models.ActualDataParams, models.ModeledDataParams
     ] = None,
+    performance_summary: Optional[_PerformanceSummary] = None,
 ) -> Tuple[List[DBResult], pd.Series, List[dt.datetime]]:
+    """Compute the weather adjusted reference performance for each inverter.
+
+    If performance_summary is provided, the actual data is modeled, and the
+    performance and weather DBResults of each inverter from that model run
+    are also returned, and the summary of each inverter is added to
+    performance_summary.
+    """
     missing_leap_days = set()
     job_params: models.CompareReferenceActualJobParameters = (
         job.definition.parameters  # type: ignore
@@ -622,6 +1407,13 @@ def _calculate_weather_adjusted_reference_performance(
     actual_model_method = actual_data_parameters._model_chain_method
     # model chain for each inverter
     chains = construct_modelchains(job.definition.system_definition)
+    # and chains that only calculate the irradiance and cell temperature needed
+    # for the weather adjustment
+    weather_chains = construct_modelchains(
+        job.definition.system_definition,
+        modelchain_class=IrradianceTemperatureModelChain,
+        location=chains[0].location,
+    )
     # generators at inverter level that return tuples of data at the array level
     ref_weather_gen = generate_job_weather_data(
         job,
@@ -635,6 +1427,23 @@ def _calculate_weather_adjusted_reference_performance(
         types=(models.JobDataTypeEnum.actual_weather,),
         weather_granularity=actual_data_parameters.weather_granularity,
     )
+    actual_gen: Iterable[Any] = actual_weather_gen
+    if performance_summary is not None:
+        # model the actual data with the executor, running inverters with the
+        # same parameters and weather once, while the reference data of each
+        # inverter is processed here. the chains are only used by
+        # _run_modelchains, so they aren't run by two threads at once
+        inverters = job.definition.system_definition.inverters
+        actual_gen = _run_modelchains(
+            inverters,
+            construct_modelchains(
+                job.definition.system_definition, location=chains[0].location
+            ),
+            actual_weather_gen,
+            actual_model_method,  # type: ignore
+            tshift,
+            process=partial(_process_modeled_performance, inverters),
+        )
     ref_pac_gen = generate_job_performance_data(
         job,
         si,
@@ -652,51 +1461,55 @@ def _calculate_weather_adjusted_reference_performance(
         ),
     )
     results_list = []
+    # weather data is shifted right by half the interval length, and system
+    # level weather only once for all inverters
+    shift_ref = _WeatherShifter(tshift)
+    shift_actual = _WeatherShifter(tshift)
     # Loop through at the inverter level
-    for i, (chain, ref_weather, actual_weather, ref_pac, ref_pdc,) in enumerate(
-        zip_longest(
+    for (
+        i,
+        (
+            chain,
+            weather_chain,
+            ref_weather,
+            actual,
+            ref_pac,
+            ref_pdc,
+        ),
+    ) in enumerate(
+        itertools.zip_longest(
             chains,
+            weather_chains,
             ref_weather_gen,
-            actual_weather_gen,
+            actual_gen,
             ref_pac_gen,
             ref_pdc_gen,
         )
     ):
         # use the ModelChain for converting any temperature to cell temperature and
-        # converting irradiance to POA. In the future, could only run these conversions
-        # instead of full modelchain calculation.
-        # since it sets class properties, copy for the actuals calculations
-        chain_actual = deepcopy(chain)
+        # converting irradiance to POA. The full chain is only needed for the DC
+        # output when only reference weather is available.
         inv = job.definition.system_definition.inverters[i]
         pac0 = inv.inverter_parameters._pac0
         num_arrays = len(chain.system.arrays)
+        shifted_ref = shift_ref(ref_weather)
         gammas: List[float] = [
             arr.module_parameters._gamma
             for arr in job.definition.system_definition.inverters[i].arrays
         ]
         if data_available == models.ReferenceDataEnum.weather_only:  # 2A-4
-            db_results, _ = process_single_modelchain(
-                chain, ref_weather, ref_model_method, tshift, i
-            )
+            ref_results = run_modelchain(chain, ref_model_method, shifted_ref)
+            db_results, _ = _process_modelchain_results(chain, ref_results, tshift, i)
             results_list += db_results
-            ref_pdc = adjust(_get_mc_dc(chain.results, num_arrays))  # type: ignore
+            ref_pdc = adjust(_get_mc_dc(ref_results, num_arrays))  # type: ignore
         else:
             # run chain on ref weather
-            getattr(chain, ref_model_method)(
-                [d.shift(freq=tshift) for d in ref_weather]  # type: ignore
-            )
+            ref_results = run_modelchain(weather_chain, ref_model_method, shifted_ref)
 
-        # run chain on actual weather
-        getattr(chain_actual, actual_model_method)(
-            [d.shift(freq=tshift) for d in actual_weather]  # type: ignore
-        )
         # use pvlib.modelchain._irrad_for_celltemp that returns POA global if available
         # otherwise uses effective irradiance
         poa_ref = _irrad_for_celltemp(
-            chain.results.total_irrad, chain.results.effective_irradiance
-        )
-        poa_actual = _irrad_for_celltemp(
-            chain_actual.results.total_irrad, chain_actual.results.effective_irradiance
+            ref_results.total_irrad, ref_results.effective_irradiance
         )
         # use cell temperature from the pvlib modelchain
         # If air temp + wind speed were supplied, they are converted
@@ -704,32 +1517,52 @@ def _calculate_weather_adjusted_reference_performance(
         # module_temperature was supplied and the temperature model is
         # sapm, it is converted to cell_temperature, otherwise module
         # temperature is used in place of cell_temperature
-        t_ref = _get_temp(
-            ref_weather, chain.results.cell_temperature, inv.arrays, tshift
-        )
-        t_actual = _get_temp(
-            actual_weather, chain_actual.results.cell_temperature, inv.arrays, tshift
-        )
+        t_ref = _get_temp(shifted_ref, ref_results.cell_temperature, inv.arrays)
+        if performance_summary is not None:
+            # the modeled performance, from the same run of the chain
+            db_results, summary_frame, poa_actual, t_actual = actual
+            results_list += db_results
+            performance_summary.add(summary_frame)
+        else:
+            # run chain on actual weather. run_modelchain leaves the chains
+            # without results, so they can be run again without copies
+            shifted_actual = shift_actual(actual)
+            actual_results = run_modelchain(
+                weather_chain, actual_model_method, shifted_actual
+            )
+            poa_actual = _irrad_for_celltemp(
+                actual_results.total_irrad, actual_results.effective_irradiance
+            )
+            t_actual = _get_temp(
+                shifted_actual, actual_results.cell_temperature, inv.arrays
+            )
 
         # mean of array POArat * TempFactor for this inverter
         # could make more sense to use weighted mean with weights set
         # by array power percentage
         # another alternative, calculate average POArat and TempFactor separately
-        poa_rat = list(map(_zero_div, poa_actual, poa_ref))
-        tempfactor = list(map(_temp_factor, gammas, t_ref, t_actual))
         # modelchain outputs are all shifted
-        poa_rat_x_temp_factor: pd.Series = adjust(  # type: ignore
-            sum([p * t for p, t in zip(poa_rat, tempfactor)]) / num_arrays
-        )
-
+        index = adjust(poa_ref[0]).index  # type: ignore
         if ref_pdc is not None:  # 2A-1 and 2A-4
-            pdc_ref_adj = _inf_mul(ref_pdc["performance"], poa_rat_x_temp_factor)
-            pac_ref_adj = pdc_ref_adj * 0.985
+            ref_performance = ref_pdc["performance"]
         else:  # 2A-2
-            pac_ref_adj = _inf_mul(ref_pac["performance"], poa_rat_x_temp_factor)
-        pac_adj = pac_ref_adj.clip(upper=pac0)  # type: ignore
-        pac_adj.index.name = "time"
-        pac_adj.name = "performance"
+            ref_performance = ref_pac["performance"]
+        with instrumentation.stage("weather adjustment") as measurement:
+            pac_adj = pd.Series(
+                _weather_adjustment(
+                    _stack(poa_ref),
+                    _stack(poa_actual),
+                    _stack(t_ref),
+                    _stack(t_actual),
+                    np.array(gammas, dtype=float)[:, np.newaxis],
+                    ref_performance.reindex(index).to_numpy(dtype=float),
+                    pac0,
+                    dc=ref_pdc is not None,
+                ),
+                index=index,
+                name="performance",
+            )
+            measurement.rows += len(pac_adj)
         total_ref_pac += pac_adj
         results_list.append(
             DBResult(
@@ -847,30 +1680,32 @@ def compare_monthly_reference_and_actual(
 
 
 def compare_reference_and_modeled(job: models.StoredJob, si: storage.StorageInterface):
+    """Compare the modeled performance to the weather adjusted reference
+    performance. Like the other comparisons to reference data, the whole
+    job is modeled at once even if settings.compute_window_months is set,
+    since the reference and weather adjusted performance of each inverter
+    are not split into windows."""
     job_params: models.CompareReferenceModeledJobParameters = (
         job.definition.parameters  # type: ignore
     )
     job_time_range = job_params.time_parameters._time_range
+    modeled_summary = _PerformanceSummary(job_time_range)
 
+    # the modeled performance is calculated along with the weather adjusted
+    # reference performance using the same run of the chain for each inverter
     (
-        ref_results,
+        results_list,
         total_ref_pac,
         missing_leap_days,
     ) = _calculate_weather_adjusted_reference_performance(
-        job, si, actual_data_parameters=job_params.modeled_data_parameters
-    )
-    # inefficient as it runs the model chain for each inverter
-    # twice for modeled. once above and once below
-    modeled_monthly_energy, results_list = _calculate_performance(
         job,
         si,
-        weather_types=(models.JobDataTypeEnum.actual_weather,),
-        weather_granularity=job_params.modeled_data_parameters.weather_granularity,
-        run_model_method=job_params.modeled_data_parameters._model_chain_method,
-        missing_leap_days=missing_leap_days,
+        actual_data_parameters=job_params.modeled_data_parameters,
+        performance_summary=modeled_summary,
     )
-    results_list += ref_results
-    months = job_time_range.month.unique().sort_values()  # type: ignore
+    modeled_monthly_energy, summary_results = modeled_summary.results(missing_leap_days)
+    results_list += summary_results
+    months = job_params.time_parameters._months
     ref_energy = total_ref_pac.resample("1h").mean()  # type: ignore
     ref_monthly_energy = (
         ref_energy.groupby(ref_energy.index.month).sum().reindex(months)
@@ -0,0 +1,208 @@
+"""Measure the time, amount of data, and memory used by each stage of a
+compute job. Measurements are logged when the job finishes, recorded as
+Prometheus metrics (pushed to a Pushgateway if configured, since jobs run
+in worker processes), and can be saved as a job result.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import resource
+import socket
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from uuid import UUID
+
+
+import pandas as pd
+from prometheus_client import (  # type: ignore
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    push_to_gateway,
+)
+
+
+from . import settings
+
+
+logger = logging.getLogger(__name__)
+
+registry = CollectorRegistry()
+STAGE_SECONDS = Histogram(
+    "spi_job_stage_seconds",
+    "Time spent in each stage of compute jobs, excluding nested stages",
+    ["stage"],
+    registry=registry,
+)
+STAGE_ROWS = Counter(
+    "spi_job_stage_rows",
+    "Rows of data processed in each stage of compute jobs",
+    ["stage"],
+    registry=registry,
+)
+STAGE_BYTES_READ = Counter(
+    "spi_job_stage_read_bytes",
+    "Bytes read in each stage of compute jobs",
+    ["stage"],
+    registry=registry,
+)
+STAGE_BYTES_WRITTEN = Counter(
+    "spi_job_stage_written_bytes",
+    "Bytes written in each stage of compute jobs",
+    ["stage"],
+    registry=registry,
+)
+STAGE_PEAK_RSS = Gauge(
+    "spi_job_stage_peak_rss_bytes",
+    "Peak resident memory of the worker at the end of each stage",
+    ["stage"],
+    registry=registry,
+)
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is in KiB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Measurement:
+    """Data counts of a running stage, updated by the code in the stage"""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.nested_seconds = 0.0
+
+
+class JobTimer:
+    """Totals of the measurements of each stage of a job"""
+
+    columns = (
+        "calls",
+        "seconds",
+        "rows",
+        "bytes_read",
+        "bytes_written",
+        "peak_rss_mib",
+        "peak_rss_growth_mib",
+    )
+
+    def __init__(self, job_id: UUID):
+        self.job_id = job_id
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        measurement: Measurement,
+        rss_before: float,
+        rss_after: float,
+    ):
+        with self._lock:
+            stats = self.stages.setdefault(stage, dict.fromkeys(self.columns, 0))
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["rows"] += measurement.rows
+            stats["bytes_read"] += measurement.bytes_read
+            stats["bytes_written"] += measurement.bytes_written
+            stats["peak_rss_mib"] = max(stats["peak_rss_mib"], rss_after)
+            stats["peak_rss_growth_mib"] += rss_after - rss_before
+
+    def to_frame(self) -> pd.DataFrame:
+        with self._lock:
+            out = pd.DataFrame.from_dict(
+                self.stages, orient="index", columns=self.columns
+            )
+        out.index.name = "stage"
+        return out.astype(float)
+
+    def log(self):
+        with self._lock:
+            stages = json.dumps(self.stages)
+        logger.info("Stages of job %s: %s", self.job_id, stages)
+
+
+_current_timer: ContextVar[Optional[JobTimer]] = ContextVar(
+    "current_timer", default=None
+)
+_current_measurement: ContextVar[Optional[Measurement]] = ContextVar(
+    "current_measurement", default=None
+)
+
+
+def current_timer() -> Optional[JobTimer]:
+    """The JobTimer of the running job, if any"""
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Measurement]:
+    """Measure the code in the context as the stage `name` of the current job.
+    The time of any nested stages is not included in the time of this stage.
+    """
+    measurement = Measurement()
+    parent = _current_measurement.get()
+    token = _current_measurement.set(measurement)
+    rss_before = _peak_rss_mib()
+    start = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        elapsed = time.perf_counter() - start
+        rss_after = _peak_rss_mib()
+        _current_measurement.reset(token)
+        if parent is not None:
+            parent.nested_seconds += elapsed
+        seconds = max(elapsed - measurement.nested_seconds, 0.0)
+        STAGE_SECONDS.labels(name).observe(seconds)
+        STAGE_ROWS.labels(name).inc(measurement.rows)
+        STAGE_BYTES_READ.labels(name).inc(measurement.bytes_read)
+        STAGE_BYTES_WRITTEN.labels(name).inc(measurement.bytes_written)
+        STAGE_PEAK_RSS.labels(name).set(rss_after * 2 ** 20)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(name, seconds, measurement, rss_before, rss_after)
+
+
+def _grouping_key() -> Dict[str, str]:
+    """Pushgateway grouping key of this worker, settings.metrics_instance
+    or the hostname. rq runs each job in a new fork of the worker, so the
+    key must not depend on the process. Each push then replaces the metrics
+    of the previous job run by the worker instead of leaving a group behind
+    for every job."""
+    return {"instance": settings.metrics_instance or socket.gethostname()}
+
+
+def push_metrics():
+    """Push the job metrics to the Pushgateway, if one is configured"""
+    if settings.metrics_pushgateway is None:
+        return
+    try:
+        push_to_gateway(
+            settings.metrics_pushgateway,
+            job="spi_compute",
+            registry=registry,
+            grouping_key=_grouping_key(),
+        )
+    except Exception:
+        logger.exception("Failed to push job metrics")
+
+
+@contextmanager
+def time_job(job_id: UUID) -> Iterator[JobTimer]:
+    """Collect the stages run in the context for the job. The measurements
+    are logged and the metrics pushed when the context exits."""
+    timer = JobTimer(job_id)
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+        timer.log()
+        push_metrics()
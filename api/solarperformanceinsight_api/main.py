@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 
@@ -45,8 +47,20 @@ class LogFilter(logging.Filter):
         return 1
 
 
+def set_threadpool(loop: asyncio.AbstractEventLoop):
+    """Run the (sync) route handlers, which make blocking database and redis
+    calls and process data with pandas, in a thread pool sized to the
+    database connection pool instead of on the event loop"""
+    loop.set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=settings.api_max_threads, thread_name_prefix="spi_api"
+        )
+    )
+
+
 @app.on_event("startup")
 async def startup_event():  # pragma: no cover
+    set_threadpool(asyncio.get_event_loop())
     storage.engine.connect()
     queuing.verify_redis_conn()
     await auth.get_auth_key()
@@ -54,6 +68,11 @@ async def startup_event():  # pragma: no cover
         handler.addFilter(LogFilter)
 
 
+@app.on_event("shutdown")
+def shutdown_event():  # pragma: no cover
+    queuing.job_status_listener.stop()
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_execption_handler(request: Request, exc: RequestValidationError):
     """Adjust validation error output to conform to schema"""
@@ -1,5 +1,6 @@
 import datetime as dt
 from enum import Enum
+from functools import lru_cache
 from typing import Union, List, Optional, Any, Tuple, Dict
 
 
@@ -206,9 +207,14 @@ class PVsystModuleParameters(PVLibBase):
     _modelchain_dc_model: str = PrivateAttr("pvsyst")
     _gamma: float = PrivateAttr()
 
+    def __init__(self, **data):
+        super().__init__(**data)
+        # calculated by validate_diode_params, but not a field
+        self._gamma = self.__dict__.pop("_gamma")
+
     @root_validator(skip_on_failure=True)
     def validate_diode_params(cls, values):
-        # and set _gamma here since it could raise an error with bad params
+        # and calculate _gamma here since it could raise an error with bad params
         err = ValueError(
             "Unable to calculate single diode parameters from parameters supplied."
         )
@@ -219,7 +225,7 @@ class PVsystModuleParameters(PVLibBase):
         except Exception:
             raise err
         try:
-            cls._gamma = pvsyst_temperature_coeff(**values)
+            values["_gamma"] = pvsyst_temperature_coeff(**values)
         except Exception:
             raise err
         return values
@@ -783,6 +789,43 @@ class UserInfo(StoredObject):
     auth0_id: str = Field(..., description="User ID from Auth 0")
 
 
+# the time range parameters and the timezone of start, since times in
+# different timezones compare equal
+_RangeKey = Tuple[dt.datetime, dt.datetime, dt.timedelta, Optional[str], Any]
+
+
+# only a few since each range of a long job is large and only the jobs being
+# validated or computed at the moment need them
+@lru_cache(maxsize=4)
+def _make_time_range(
+    start: dt.datetime,
+    end: dt.datetime,
+    step: dt.timedelta,
+    timezone: Optional[str],
+    start_tz: Any,
+) -> pd.DatetimeIndex:
+    """Time range from start to end (exclusive) converted to, or localized
+    in, timezone if given. Shared by all JobTimeindex with the same parameters
+    since a long job at a short step is millions of times"""
+    tr = pd.date_range(start=start, end=end, freq=step)
+    if len(tr) and tr[-1] == end:
+        tr = tr[:-1]
+    if tr.tzinfo is None:
+        tr = tr.tz_localize(timezone, ambiguous=True, nonexistent="NaT")
+        return tr[~(tr.duplicated() | tr.isna())]
+    elif timezone is not None:
+        return tr.tz_convert(timezone)
+    else:
+        return tr
+
+
+# at most 12 months each, so more can be kept than time ranges
+@lru_cache(maxsize=16)
+def _time_range_months(*key) -> pd.Index:
+    tr = _make_time_range(*key)
+    return tr.month.unique().sort_values()  # type: ignore
+
+
 class JobTimeindex(SPIBase):
     """Parameters for a time index that all data uploads must conform to.
     Data is assumed to time-averaged and closed and labeled at the left endpoint, i.e.
@@ -817,26 +860,37 @@ class JobTimeindex(SPIBase):
         "Unlocalized data will be localized to this timezone. If timezone is "
         "null, the timezone will be inferred from start/end.",
     )
-    _time_range: List[dt.datetime] = PrivateAttr()
+    # with the timezone as given instead of as inferred from start/end
+    _range_key: _RangeKey = PrivateAttr()
 
     def __init__(self, **data):
         super().__init__(**data)
-        tr = pd.date_range(start=self.start, end=self.end, freq=self.step)
-        if tr[-1] == self.end:
-            tr = tr[:-1]
-        if tr.tzinfo is None:
-            self._time_range = tr.tz_localize(
-                self.timezone, ambiguous=True, nonexistent="NaT"
+        self._range_key = (
+            self.start,
+            self.end,
+            self.step,
+            self.timezone,
+            self.start.tzinfo,
+        )
+        if self.timezone is None:
+            self.timezone = str(
+                pd.date_range(start=self.start, periods=1, freq=self.step).tzinfo
             )
-            self._time_range = self._time_range[
-                ~(self._time_range.duplicated() | self._time_range.isna())
-            ]
-        else:
-            if self.timezone is not None:
-                self._time_range = tr.tz_convert(self.timezone)
-            else:
-                self.timezone = str(tr.tzinfo)
-                self._time_range = tr
+
+    @property
+    def _time_range(self) -> pd.DatetimeIndex:
+        """The times of the job, only made when first needed"""
+        return _make_time_range(*self._range_key)
+
+    @property
+    def _months(self) -> pd.Index:
+        """The sorted months in the time range"""
+        return _time_range_months(*self._range_key)
+
+    @property
+    def _freq(self) -> pd.DateOffset:
+        """The step as a pandas frequency"""
+        return pd.tseries.frequencies.to_offset(self.step)  # type: ignore
 
     @root_validator(pre=True)
     def restrict_timedelta_number(cls, values):
@@ -1371,6 +1425,54 @@ class StoredJob(StoredObject):
         }
 
 
+class JobSummary(SPIBase):
+    system_id: UUID
+    system_name: str = Field(..., description="Name of the system of the job")
+    calculate: Optional[str] = Field(
+        None, description="What the job calculates, if a calculation job"
+    )
+    compare: Optional[str] = Field(
+        None, description="What the job compares, if a comparison job"
+    )
+    time_parameters: JobTimeindex
+    number_of_data_objects: int = Field(
+        ..., description="Number of data objects the job requires"
+    )
+    number_of_data_objects_present: int = Field(
+        ..., description="Number of required data objects that have been uploaded"
+    )
+
+
+class StoredJobSummary(StoredObject):
+    """A job without the system, parameters, and data objects needed to run it,
+    for listing many jobs"""
+
+    definition: JobSummary
+    status: JobStatus
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "object_id": "e1772e64-43ac-11eb-92c2-f4939feddd82",
+                "object_type": "job",
+                "created_at": "2020-12-11T19:52:00+00:00",
+                "modified_at": "2020-12-11T19:52:00+00:00",
+                "definition": {
+                    "system_id": SYSTEM_ID,
+                    "system_name": SYSTEM_EXAMPLE["name"],
+                    "compare": JOB_PARAMS_EXAMPLE["compare"],
+                    "time_parameters": JOB_PARAMS_EXAMPLE["time_parameters"],
+                    "number_of_data_objects": 2,
+                    "number_of_data_objects_present": 1,
+                },
+                "status": {
+                    "status": "incomplete",
+                    "last_change": "2020-12-11T20:00:00+00:00",
+                },
+            }
+        }
+
+
 class DataPeriods(SPIBase):
     expected: str = Field(..., description="Expected period of the data")
     uploaded: str = Field(..., description="Most common period of the uploaded data")
@@ -1421,6 +1523,7 @@ class JobResultTypeEnum(str, Enum):
     weather_adjusted_performance = "weather adjusted performance"
     actual_vs_adjusted_reference = "actual vs weather adjusted reference"
     modeled_vs_adjusted_reference = "modeled vs weather adjusted reference"
+    timing = "timing"
     # will need other types for performance ratio etc.
 
 
@@ -1450,6 +1553,8 @@ class JobResultMetadata(SPIBase):
   solar zenith for the midpoint of the interval is < 87.0 degrees.
 - error message: The result could not be computed. The result for this object will
   be a JSON object describing the error.
+- timing: Number of calls, time (s), rows, bytes read and written, and peak memory
+  (MiB) of each stage of the computation. Only present if enabled for the API.
 """,
     )
     schema_path: str = Field(
@@ -1,20 +1,97 @@
 """Module to translate models.py into pvlib objects and to run the
 pvlib models.
 """
-from typing import Union, List
+from collections import OrderedDict
+import hashlib
+import threading
+from typing import Any, Hashable, Optional, Type, Union, List, Tuple
 
 
+import numpy as np
+import pandas as pd
 from pvlib.location import Location  # type: ignore
-from pvlib.modelchain import ModelChain  # type: ignore
+from pvlib.modelchain import ModelChain, ModelChainResult  # type: ignore
 from pvlib.pvsystem import PVSystem, Array  # type: ignore
 from pvlib.tracking import SingleAxisTracker  # type: ignore
 
-from . import models
+from . import instrumentation, models
 
 
-def construct_location(system: models.PVSystem) -> Location:
-    """Construct a pvlib Location object from a PVSystem"""
-    return Location(
+def _hash_arg(arg: Any) -> Hashable:
+    if isinstance(arg, pd.DatetimeIndex):
+        return (str(arg.tz), hashlib.sha256(arg.asi8.tobytes()).hexdigest())
+    elif isinstance(arg, (pd.Series, pd.DataFrame, np.ndarray)):
+        return hashlib.sha256(np.ascontiguousarray(arg).tobytes()).hexdigest()
+    return repr(arg)
+
+
+class CachedLocation(Location):
+    """A pvlib Location that keeps the solar position it calculates so that
+    ModelChains for every inverter of a system can share a single calculation
+    for the same times. Returned solar position frames are shared and must
+    not be modified. Only the most recent calculations are kept, which is
+    enough since the chains of a job (or time window) are run for the same
+    times. The cache is shared by threads, which wait for a calculation in
+    progress instead of repeating it. It is not pickled, so each worker of
+    a process executor calculates the solar position itself.
+    """
+
+    _solar_position_cache_size = 2
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._solar_position_cache: "OrderedDict[Tuple[Hashable, ...], pd.DataFrame]"
+        self._solar_position_cache = OrderedDict()
+        self._solar_position_lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # solar position only depends on the parameters of the location
+        # and the arguments, so copies can share the cache
+        out = object.__new__(type(self))
+        out.__dict__.update(self.__dict__)
+        memo[id(self)] = out
+        return out
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_solar_position_cache"]
+        del state["_solar_position_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._solar_position_cache = OrderedDict()
+        self._solar_position_lock = threading.Lock()
+
+    def get_solarposition(self, times, pressure=None, temperature=12, **kwargs):
+        key = (
+            self.latitude,
+            self.longitude,
+            self.altitude,
+            _hash_arg(times),
+            _hash_arg(pressure),
+            _hash_arg(temperature),
+            tuple((k, _hash_arg(v)) for k, v in sorted(kwargs.items())),
+        )
+        cache = self._solar_position_cache
+        with self._solar_position_lock:
+            out = cache.get(key)
+            if out is not None:
+                cache.move_to_end(key)
+            else:
+                out = super().get_solarposition(
+                    times, pressure=pressure, temperature=temperature, **kwargs
+                )
+                cache[key] = out
+                while len(cache) > self._solar_position_cache_size:
+                    cache.popitem(last=False)
+        return out
+
+
+def construct_location(system: models.PVSystem) -> CachedLocation:
+    """Construct a pvlib Location object from a PVSystem that caches
+    solar position calculations"""
+    return CachedLocation(
         latitude=system.latitude,
         longitude=system.longitude,
         altitude=system.elevation,
@@ -86,14 +163,50 @@ def construct_pvsystem(inverter: models.Inverter) -> Union[PVSystem, SingleAxisT
         return PVSystem(**system_kwargs)
 
 
-def construct_modelchains(system: models.PVSystem) -> List[ModelChain]:
-    """Construct a pvlib.modelchain.ModelChain object for each Inverter
-    in system"""
-    location = construct_location(system=system)
+class IrradianceTemperatureModelChain(ModelChain):
+    """A ModelChain that only calculates plane-of-array and effective
+    irradiance and cell temperature. The DC, losses, and AC models are
+    skipped, so ``results.dc``, ``results.losses``, and ``results.ac``
+    are not set.
+    """
+
+    def _run_from_effective_irrad(self, data=None):
+        self._prepare_temperature(data)
+        return self
+
+
+def run_modelchain(
+    chain: ModelChain,
+    run_model_method: str,
+    weather: Union[pd.DataFrame, List[pd.DataFrame]],
+) -> ModelChainResult:
+    """Run chain with run_model_method and return the results instead of
+    keeping them on the chain. The chain can then be run again, e.g. with
+    other weather data, without a copy and without changing these results.
+    """
+    with instrumentation.stage("run model") as measurement:
+        chain.results = ModelChainResult()
+        getattr(chain, run_model_method)(weather)
+        results = chain.results
+        chain.results = ModelChainResult()
+        measurement.rows += len(weather[0] if isinstance(weather, list) else weather)
+    return results
+
+
+def construct_modelchains(
+    system: models.PVSystem,
+    modelchain_class: Type[ModelChain] = ModelChain,
+    location: Optional[Location] = None,
+) -> List[ModelChain]:
+    """Construct a pvlib.modelchain.ModelChain object (or modelchain_class)
+    for each Inverter in system. All chains share the same location, and
+    thus solar position calculations"""
+    if location is None:
+        location = construct_location(system=system)
     out = []
     for inverter in system.inverters:
         pvsystem = construct_pvsystem(inverter=inverter)
-        mc = ModelChain(
+        mc = modelchain_class(
             system=pvsystem, location=location, **dict(inverter._modelchain_models)
         )
         out.append(mc)
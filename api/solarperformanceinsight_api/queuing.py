@@ -1,12 +1,16 @@
+import asyncio
+from collections import defaultdict
 import datetime as dt
 import json
 import logging
+import threading
 import time
-from typing import Union, Type, Dict, Tuple, List
+from typing import Union, Type, Dict, Optional, Set, Tuple, List
 from uuid import UUID
 
 
 from redis import Redis, ConnectionPool
+from redis.exceptions import RedisError
 from rq import Queue  # type: ignore
 from rq.command import send_stop_job_command  # type: ignore
 from rq.exceptions import NoSuchJobError  # type: ignore
@@ -41,6 +45,120 @@ def _get_queue(name, redis_conn):
     return Queue(name, connection=redis_conn)
 
 
+JOB_STATUS_CHANNEL = "spi:job_status:"
+
+
+def publish_job_status(
+    redis_conn: Redis, job_id: Union[UUID, str], status: models.JobStatus
+):
+    """Tell any open status streams that the status of a job changed.
+    Failures are only logged as the status is still in the database."""
+    try:
+        redis_conn.publish(f"{JOB_STATUS_CHANNEL}{job_id}", status.json())
+    except RedisError:
+        logger.warning("Failed to publish the status of job %s", job_id, exc_info=True)
+
+
+class JobStatusListener:
+    """Pass the job status messages published to redis to the asyncio
+    queues of the status streams of each job. A single pattern
+    subscription, read in a background thread, serves every stream in
+    the process."""
+
+    def __init__(self):
+        self._queues: Dict[
+            str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]
+        ] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, job_id: Union[UUID, str]) -> asyncio.Queue:
+        """Get a queue of the status messages of the job. Must be called
+        from the event loop that reads the queue."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._queues[str(job_id)].add((loop, queue))
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._listen,
+                    args=(self._stop,),
+                    name="spi_job_status",
+                    daemon=True,
+                )
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, job_id: Union[UUID, str], queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._queues[str(job_id)]
+            subscribers.difference_update(
+                {sub for sub in subscribers if sub[1] is queue}
+            )
+            if not subscribers:
+                del self._queues[str(job_id)]
+
+    def stop(self):
+        """Stop the background thread, which is restarted by the next
+        subscription"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def _dispatch(self, message: dict):
+        job_id = message["channel"].decode()[len(JOB_STATUS_CHANNEL) :]
+        with self._lock:
+            subscribers = list(self._queues.get(job_id, ()))
+        for sub in subscribers:
+            loop, queue = sub
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message["data"])
+            except Exception:
+                # e.g. the loop of the stream is closed, so the stream
+                # will never unsubscribe itself
+                logger.exception("Dropping job status subscriber of %s", job_id)
+                with self._lock:
+                    subscribers_now = self._queues.get(job_id)
+                    if subscribers_now is not None:
+                        subscribers_now.discard(sub)
+                        if not subscribers_now:
+                            del self._queues[job_id]
+
+    def _listen(self, stop: threading.Event):
+        try:
+            while not stop.is_set():
+                try:
+                    pubsub = _get_redis_conn().pubsub(ignore_subscribe_messages=True)
+                    pubsub.psubscribe(f"{JOB_STATUS_CHANNEL}*")
+                    try:
+                        while not stop.is_set():
+                            message = pubsub.get_message(timeout=1)
+                            if message is not None:
+                                self._dispatch(message)
+                    finally:
+                        pubsub.close()
+                except RedisError:
+                    # streams keep their last status and get new ones once
+                    # the connection is back
+                    logger.exception("Lost the job status subscription")
+                    stop.wait(1)
+        except Exception:
+            logger.exception("Job status listener failed")
+        finally:
+            # let the next subscription start a new thread
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+
+job_status_listener = JobStatusListener()
+
+
 class QueueManager:
     def __init__(
         self,
@@ -63,23 +181,39 @@ class QueueManager:
             )
         ]
 
+    def _create_job(self, job_id: Union[UUID, str], user: str) -> Job:
+        return Job.create(
+            self.job_func,
+            args=(job_id, user),
+            id=str(job_id),
+            result_ttl=0,
+            timeout="10m",
+            failure_ttl=3600 * 24 * 14,
+            connection=self.redis_conn,
+        )
+
     def enqueue_job(self, job_id: Union[UUID, str], user: str) -> Type[Job]:
         # check if job already exists
         try:
             job = Job.fetch(str(job_id), connection=self.redis_conn)
         except NoSuchJobError:
-            job = Job.create(
-                self.job_func,
-                args=(job_id, user),
-                id=str(job_id),
-                result_ttl=0,
-                timeout="10m",
-                failure_ttl=3600 * 24 * 14,
-                connection=self.redis_conn,
-            )
+            job = self._create_job(job_id, user)
             self.q.enqueue_job(job)
         return job
 
+    def enqueue_jobs(self, jobs: Dict[str, str]) -> int:
+        """Enqueue many jobs, a map of job id to user, in two round trips
+        to redis. Like enqueue_job, jobs that already exist are left alone.
+        Returns the number of jobs enqueued."""
+        job_ids = list(jobs.keys())
+        existing = Job.fetch_many(job_ids, connection=self.redis_conn)
+        new = [id_ for id_, job in zip(job_ids, existing) if job is None]
+        with self.redis_conn.pipeline() as pipe:
+            for id_ in new:
+                self.q.enqueue_job(self._create_job(id_, jobs[id_]), pipeline=pipe)
+            pipe.execute()
+        return len(new)
+
     def job_status(self, job_id: UUID) -> Union[models.JobStatus, None]:
         """Return a "running" status and the start time of a job. Even a
         failed job will report "running" as the failure may need to be added
@@ -95,32 +229,45 @@ class QueueManager:
                 return models.JobStatus(status="running", last_change=change_time)
         return None
 
+    def publish_job_status(self, job_id: UUID, status: models.JobStatus):
+        publish_job_status(self.redis_conn, job_id, status)
+
     def delete_job(self, job_id: UUID):
         """Try removing the job if present in any registries"""
-        try:
-            send_stop_job_command(self.redis_conn, str(job_id))
-        except Exception:
-            pass
-        for registry in self.registries:
+        self.delete_jobs([str(job_id)])
+
+    def delete_jobs(self, job_ids: List[str]):
+        """Stop the jobs that are running, remove the jobs from the queue
+        and every registry, and delete them, in a few round trips to redis
+        however many jobs there are"""
+        if not job_ids:
+            return
+        started = set(self.q.started_job_registry.get_job_ids())
+        for job_id in started.intersection(job_ids):
             try:
-                registry.remove(str(job_id), delete_job=True)
+                send_stop_job_command(self.redis_conn, job_id)
             except Exception:
                 pass
+        with self.redis_conn.pipeline() as pipe:
+            for job_id in job_ids:
+                self.q.remove(job_id, pipeline=pipe)
+                for registry in self.registries:
+                    registry.remove(job_id, pipeline=pipe)
+                job = Job(job_id, connection=self.redis_conn)
+                pipe.delete(job.key, job.dependents_key, job.dependencies_key)
+            pipe.execute()
 
     def remove_invalid_jobs(self, current_job_status: Dict[str, str]):
         """Remove jobs from any queue that are complete or have been
         deleted from the database"""
-        all_jobs = current_job_status.keys()
-        jobs_to_remove_if_present = [
-            k for k, v in current_job_status.items() if v != "queued"
+        invalid = [
+            job_id
+            for job_id in self.q.job_ids
+            if current_job_status.get(job_id, "deleted") != "queued"
         ]
-        i = 0
-        for job_id in self.q.job_ids:
-            if job_id not in all_jobs or job_id in jobs_to_remove_if_present:
-                self.delete_job(job_id)
-                i += 1
-        if i:
-            logger.info("Removed %s invalid jobs from the queues", i)
+        self.delete_jobs(invalid)
+        if invalid:
+            logger.info("Removed %s invalid jobs from the queues", len(invalid))
 
     def add_missing_jobs(self, queued_jobs: Dict[str, str]):
         """Add jobs to the queue that are missing but present in the database
@@ -128,8 +275,30 @@ class QueueManager:
         missing = set(queued_jobs.keys()) - set(self.q.job_ids)
         if len(missing):
             logger.info("Enqueuing %s missing jobs", len(missing))
-        for id_ in missing:
-            self.enqueue_job(id_, queued_jobs[id_])
+            self.enqueue_jobs({id_: queued_jobs[id_] for id_ in missing})
+
+    def sync_job_changes(self, changed_jobs: Dict[str, Tuple[str, str]]):
+        """Enqueue the changed jobs, a map of job id to user and status,
+        that are queued in the database and remove the rest from the queue
+        without listing every job in the queue"""
+        queued = {
+            job_id: user
+            for job_id, (user, status) in changed_jobs.items()
+            if status == "queued"
+        }
+        if queued:
+            self.enqueue_jobs(queued)
+        others = [job_id for job_id in changed_jobs.keys() if job_id not in queued]
+        if not others:
+            return
+        with self.redis_conn.pipeline() as pipe:
+            for job_id in others:
+                self.q.remove(job_id, pipeline=pipe)
+            in_queue = pipe.execute()
+        removed = [job_id for job_id, count in zip(others, in_queue) if count]
+        self.delete_jobs(removed)
+        if removed:
+            logger.info("Removed %s invalid jobs from the queues", len(removed))
 
     def evaluate_failed_jobs(
         self, current_job_status: Dict[str, str]
@@ -138,11 +307,12 @@ class QueueManager:
         happened.
         of job ids and failure messages"""
         out = []
+        finished = []
         for failed_job in self.q.failed_job_registry.get_job_ids():
             if failed_job not in current_job_status or current_job_status[
                 failed_job
             ] in ("complete", "error"):
-                self.q.failed_job_registry.remove(failed_job, delete_job=True)
+                finished.append(failed_job)
             else:
                 msg = json.dumps(
                     {
@@ -155,6 +325,7 @@ class QueueManager:
                     }
                 )
                 out.append((failed_job, msg))
+        self.delete_jobs(finished)
         if len(out):
             logger.info("%s jobs processed from failed job registry", len(out))
         return out
@@ -166,32 +337,78 @@ def _get_job_management_interface():  # pragma: no cover
     return JobManagementInterface()
 
 
+def _sync_all_jobs(jmi, qm: QueueManager) -> List[Tuple[str, str]]:
+    logger.info(
+        "Adding missing jobs, removing invalid jobs, and cleaning up failed jobs"
+    )
+    # add missing jobs
+    with jmi.start_transaction() as jst:
+        queued_jobs = jst.list_queued_jobs()
+    qm.add_missing_jobs(queued_jobs)
+    # remove invalid
+    with jmi.start_transaction() as jst:
+        current_job_status = jst.list_status_of_jobs()
+    qm.remove_invalid_jobs(current_job_status)
+    # cleanup failed job registry
+    with jmi.start_transaction() as jst:
+        most_current_job_status = jst.list_status_of_jobs()
+        failed_jobs = qm.evaluate_failed_jobs(most_current_job_status)
+        for job_id, msg in failed_jobs:
+            jst.report_job_failure(job_id, msg)
+    return failed_jobs
+
+
+def _sync_changed_jobs(
+    jmi, qm: QueueManager, since: dt.datetime
+) -> List[Tuple[str, str]]:
+    with jmi.start_transaction() as jst:
+        changed_jobs = jst.list_job_changes(since)
+    qm.sync_job_changes(changed_jobs)
+    # jobs leave the failed job registry once reported or finished, so it
+    # only holds failures since the last cycle
+    failed_job_ids = qm.q.failed_job_registry.get_job_ids()
+    if not failed_job_ids:
+        return []
+    with jmi.start_transaction() as jst:
+        failed_job_status = jst.get_status_of_jobs(failed_job_ids)
+        failed_jobs = qm.evaluate_failed_jobs(failed_job_status)
+        for job_id, msg in failed_jobs:
+            jst.report_job_failure(job_id, msg)
+    return failed_jobs
+
+
 def sync_jobs():
-    """Keep jobs between the RQ queue and database in sync"""
+    """Keep jobs between the RQ queue and database in sync. Every job is
+    compared every sync_jobs_full_period seconds, and only the jobs that
+    changed or failed are checked in the cycles in between."""
     jmi = _get_job_management_interface()
     qm = QueueManager()
 
     logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s", level="INFO")
+    since: Optional[dt.datetime] = None
+    last_full_sync = 0.0
     while True:
         try:
-            logger.info(
-                "Adding missing jobs, removing invalid jobs, and "
-                "cleaning up failed jobs"
-            )
-            # add missing jobs
-            with jmi.start_transaction() as jst:
-                queued_jobs = jst.list_queued_jobs()
-            qm.add_missing_jobs(queued_jobs)
-            # remove invalid
-            with jmi.start_transaction() as jst:
-                current_job_status = jst.list_status_of_jobs()
-            qm.remove_invalid_jobs(current_job_status)
-            # cleanup failed job registry
-            with jmi.start_transaction() as jst:
-                most_current_job_status = jst.list_status_of_jobs()
-                failed_jobs = qm.evaluate_failed_jobs(most_current_job_status)
-                for job_id, msg in failed_jobs:
-                    jst.report_job_failure(job_id, msg)
+            cycle_start = dt.datetime.now(dt.timezone.utc)
+            if (
+                since is None
+                or time.monotonic() - last_full_sync >= settings.sync_jobs_full_period
+            ):
+                failed_jobs = _sync_all_jobs(jmi, qm)
+                last_full_sync = time.monotonic()
+            else:
+                failed_jobs = _sync_changed_jobs(jmi, qm, since)
+            # look back a period to catch changes committed after they
+            # were read in this cycle
+            since = cycle_start - dt.timedelta(seconds=settings.sync_jobs_period)
+            for job_id, _ in failed_jobs:
+                qm.publish_job_status(
+                    job_id,
+                    models.JobStatus(
+                        status=models.JobStatusEnum.error,
+                        last_change=dt.datetime.now(dt.timezone.utc),
+                    ),
+                )
             time.sleep(settings.sync_jobs_period)
         except KeyboardInterrupt:
             break
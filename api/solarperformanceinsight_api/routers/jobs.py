@@ -1,6 +1,19 @@
 """Endpoints for running models"""
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional, Union, Type, Tuple
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    IO,
+    List,
+    Optional,
+    Union,
+    Type,
+    Tuple,
+)
 
 
 from accept_types import AcceptableType  # type: ignore
@@ -15,16 +28,20 @@ from fastapi import (
     File,
     Header,
     HTTPException,
+    Query,
 )
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 import pandas as pd
 from pydantic.types import UUID
+from starlette.concurrency import run_in_threadpool
 
 
 from . import default_get_responses
-from .. import models, utils
+from .. import models, settings, utils
 from ..auth import get_user_id
 from ..storage import StorageInterface
-from ..queuing import QueueManager
+from ..queuing import QueueManager, job_status_listener
 
 
 logger = logging.getLogger(__name__)
@@ -55,6 +72,25 @@ job_links = {
 }
 
 
+not_modified_response: Dict[Union[int, str], Dict[str, Any]] = {
+    304: {"description": "Not modified since the ETag given in If-None-Match"}
+}
+
+
+def _etag_response(content: Any, if_none_match: Optional[str]) -> Response:
+    """Respond with content as JSON and its ETag, or with no content if
+    the ETag is in if_none_match, so polling clients only get changes"""
+    response = JSONResponse(jsonable_encoder(content))
+    etag = '"' + hashlib.sha1(response.body).hexdigest() + '"'
+    if if_none_match is not None:
+        # weak comparison, as for a GET
+        tags = {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return response
+
+
 @router.post(
     "/",
     response_model=models.StoredObjectID,
@@ -65,7 +101,7 @@ job_links = {
     },
     status_code=201,
 )
-async def create_job(
+def create_job(
     response: Response,
     request: Request,
     job_parameters: models.JobParametersType = Body(
@@ -92,19 +128,38 @@ async def check_job(
 
 
 @router.get("/", response_model=List[models.StoredJob], responses=default_get_responses)
-async def list_jobs(
+def list_jobs(
     storage: StorageInterface = Depends(StorageInterface),
 ) -> List[models.StoredJob]:
     with storage.start_transaction() as st:
         return st.list_jobs()
 
 
+@router.get(
+    "/summaries",
+    response_model=List[models.StoredJobSummary],
+    responses={**default_get_responses, **not_modified_response},
+)
+def list_job_summaries(
+    limit: int = Query(100, ge=1, le=1000, description="Most jobs to list"),
+    offset: int = Query(0, ge=0, description="Number of jobs to skip"),
+    if_none_match: Optional[str] = Header(None),
+    storage: StorageInterface = Depends(StorageInterface),
+) -> Response:
+    """List jobs, oldest first, with only the system, time parameters,
+    data object counts, and status of each job. Much faster than listing the
+    full jobs, so use this to list many jobs a page at a time."""
+    with storage.start_transaction() as st:
+        summaries = st.list_job_summaries(limit, offset)
+    return _etag_response(summaries, if_none_match)
+
+
 @router.get(
     "/{job_id}",
     response_model=models.StoredJob,
     responses={**default_get_responses, 200: {"links": job_links}},
 )
-async def get_job(
+def get_job(
     job_id: UUID, storage: StorageInterface = Depends(StorageInterface)
 ) -> models.StoredJob:
     with storage.start_transaction() as st:
@@ -112,26 +167,117 @@ async def get_job(
 
 
 @router.get(
-    "/{job_id}/status", response_model=models.JobStatus, responses=default_get_responses
+    "/{job_id}/status",
+    response_model=models.JobStatus,
+    responses={**default_get_responses, **not_modified_response},
 )
-async def get_job_status(
+def get_job_status(
     job_id: UUID,
+    if_none_match: Optional[str] = Header(None),
     storage: StorageInterface = Depends(StorageInterface),
     qm: QueueManager = Depends(QueueManager),
+) -> Response:
+    status = _current_job_status(job_id, storage, qm)
+    return _etag_response(status, if_none_match)
+
+
+def _current_job_status(
+    job_id: UUID, storage: StorageInterface, qm: QueueManager
 ) -> models.JobStatus:
     with storage.start_transaction() as st:
-        db_status = st.get_job_status(job_id)
-    if db_status.status == "queued":
+        status = st.get_job_status(job_id)
+    if status.status == "queued":
         q_status = qm.job_status(job_id)
         if q_status is not None:
-            return q_status
-    return db_status
+            status = q_status
+    return status
+
+
+class EventStreamResponse(StreamingResponse):
+    media_type = "text/event-stream"
+
+
+async def _job_status_events(
+    job_id: UUID, storage: StorageInterface, qm: QueueManager
+) -> AsyncIterator[str]:
+    """Send the current status of the job and then each change published
+    to redis until the job is complete or has failed. The status is read
+    again whenever no change is published for a while, so the stream also
+    ends if a change was missed or the job was deleted. The stream is
+    closed after settings.job_status_stream_max_seconds, and clients can
+    reconnect to keep following the job."""
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + settings.job_status_stream_max_seconds
+    # subscribe before reading the status so no change is missed
+    queue = job_status_listener.subscribe(job_id)
+    try:
+        status = await run_in_threadpool(_current_job_status, job_id, storage, qm)
+        last = status.json()
+        yield f"data: {last}\n\n"
+        while status.status not in ("complete", "error"):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                msg = await asyncio.wait_for(
+                    queue.get(), min(settings.job_status_stream_keepalive, remaining)
+                )
+            except asyncio.TimeoutError:
+                if loop.time() >= deadline:
+                    break
+                try:
+                    status = await run_in_threadpool(
+                        _current_job_status, job_id, storage, qm
+                    )
+                except HTTPException as err:
+                    if err.status_code == 404:
+                        break
+                    raise
+                if status.json() == last:
+                    yield ": keepalive\n\n"
+                    continue
+            else:
+                status = models.JobStatus.parse_raw(msg)
+            if status.json() != last:
+                last = status.json()
+                yield f"data: {last}\n\n"
+    finally:
+        job_status_listener.unsubscribe(job_id, queue)
+
+
+@router.get(
+    "/{job_id}/status/stream",
+    response_class=EventStreamResponse,
+    responses={
+        **default_get_responses,
+        200: {
+            "description": (
+                "Server-sent events with the JobStatus as data, first the current "
+                "status and then each change until the job is complete, has "
+                "failed, or is deleted. Long streams are closed by the server "
+                "and must be reopened to keep following the job."
+            ),
+        },
+    },
+)
+def stream_job_status(
+    job_id: UUID,
+    storage: StorageInterface = Depends(StorageInterface),
+    qm: QueueManager = Depends(QueueManager),
+) -> EventStreamResponse:
+    # raise a 404 before starting the stream if the job can't be read
+    with storage.start_transaction() as st:
+        st.get_job_status(job_id)
+    return EventStreamResponse(
+        _job_status_events(job_id, storage, qm),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.delete(
     "/{job_id}", status_code=204, responses={**default_get_responses, 204: {}}
 )
-async def delete_job(
+def delete_job(
     job_id: UUID,
     background_tasks: BackgroundTasks,
     storage: StorageInterface = Depends(StorageInterface),
@@ -189,7 +335,7 @@ def _get_return_type(
         },
     },
 )
-async def get_job_data(
+def get_job_data(
     job_id: UUID,
     data_id: UUID,
     storage: StorageInterface = Depends(StorageInterface),
@@ -205,13 +351,16 @@ async def get_job_data(
 
 def _convert_job_data(data, data_format, requested_mimetype, response_class):
     if requested_mimetype == data_format:
+        if data_format == "application/vnd.apache.arrow.file":
+            # clients, like apache-arrow JS, may not read compressed buffers
+            data = utils.decompress_arrow_bytes(data)
         return response_class(data)
     elif (
         data_format == "application/vnd.apache.arrow.file"
         and requested_mimetype == "text/csv"
     ):
         try:
-            df = utils.read_arrow(data)
+            chunks = utils.iter_arrow_csv(data)
         except HTTPException:
             logger.exception("Read arrow failed")
             raise HTTPException(
@@ -221,8 +370,8 @@ def _convert_job_data(data, data_format, requested_mimetype, response_class):
                     "try retrieving as application/vnd.apache.arrow.file and converting"
                 ),
             )
-        csv = df.to_csv(None, index=False)
-        return response_class(csv)
+        # stream the CSV so large results aren't held in memory as a string
+        return StreamingResponse(chunks, media_type=requested_mimetype)
     else:
         raise HTTPException(
             status_code=400,
@@ -235,7 +384,7 @@ def _convert_job_data(data, data_format, requested_mimetype, response_class):
     responses={**default_get_responses, 415: {}},
     response_model=models.DataParsingStats,
 )
-async def post_job_data(
+def post_job_data(
     job_id: UUID,
     data_id: UUID,
     file: UploadFile = File(
@@ -261,33 +410,47 @@ async def post_job_data(
         data_obj = list(filter(lambda x: x.object_id == data_id, job.data_objects))[0]
     except IndexError:
         raise HTTPException(status_code=404, detail="Job data upload denied")
+    try:
+        arrow_bytes, data_stats = _process_job_data(job, data_obj, read_fnc, file.file)
+    finally:
+        file.file.close()
+    with storage.start_transaction() as st:
+        st.add_job_data(
+            job_id,
+            data_id,
+            file.filename,
+            "application/vnd.apache.arrow.file",
+            arrow_bytes,
+        )
+    return data_stats
+
+
+def _process_job_data(
+    job: models.StoredJob,
+    data_obj: models.StoredJobDataMetadata,
+    read_fnc: Callable[[IO], pd.DataFrame],
+    content: IO,
+) -> Tuple[bytes, models.DataParsingStats]:
+    """Read, validate, and adjust uploaded data and convert it to the Arrow
+    bytes to store. Each step replaces the previous frame so that only
+    about two copies of the data are alive at once."""
     expected_columns = data_obj.definition.data_columns
-    df = read_fnc(file.file)
-    await file.close()
+    df = read_fnc(content)
     utils.validate_dataframe(df, expected_columns)
     if isinstance(
         job.definition.parameters, models.CompareMonthlyReferenceActualJobParameters
     ):
-        adjusted_df, data_stats = _adjust_monthly_series(df)
+        df, data_stats = _adjust_monthly_series(df)
     else:
         allow_time_shift = data_obj.definition.type in (
             models.JobDataTypeEnum.reference_weather,
             models.JobDataTypeEnum.reference_performance,
             models.JobDataTypeEnum.reference_performance_dc,
         )
-        adjusted_df, data_stats = _adjust_standard_timeseries(
+        df, data_stats = _adjust_standard_timeseries(
             job, df, expected_columns, allow_time_shift
         )
-    arrow_bytes = utils.dump_arrow_bytes(utils.convert_to_arrow(adjusted_df))
-    with storage.start_transaction() as st:
-        st.add_job_data(
-            job_id,
-            data_id,
-            file.filename,
-            "application/vnd.apache.arrow.file",
-            arrow_bytes,
-        )
-    return data_stats
+    return utils.dump_arrow_frame(df), data_stats
 
 
 def _adjust_monthly_series(
@@ -324,7 +487,7 @@ def _adjust_standard_timeseries(
         job.definition.parameters.time_parameters  # type: ignore
     )
     periods = models.DataPeriods(
-        expected=str(time_params._time_range.freq),  # type: ignore
+        expected=str(time_params._freq),
         uploaded=uploaded_period,
     )
 
@@ -341,13 +504,13 @@ def _adjust_standard_timeseries(
                 "data upload to conform to the job's stated time index."
             ),
         )
-    dft = df[expected_columns].set_index("time")
-    missing_vals = (
-        dft.loc[dft.index.difference(missing_times)]  # type: ignore
-        .isna()
-        .sum(axis=0)
-        .to_dict()
-    )
+    # count without copying the data columns
+    present = ~df["time"].isin(missing_times) if missing_times else slice(None)
+    missing_vals = {
+        col: int(df[col].isna()[present].sum())
+        for col in expected_columns
+        if col != "time"
+    }
     return (
         df,
         models.DataParsingStats(
@@ -365,7 +528,7 @@ def _adjust_standard_timeseries(
 @router.post(
     "/{job_id}/compute", status_code=202, responses={**default_get_responses, 202: {}}
 )
-async def compute_job(
+def compute_job(
     job_id: UUID,
     background_tasks: BackgroundTasks,
     storage: StorageInterface = Depends(StorageInterface),
@@ -374,7 +537,9 @@ async def compute_job(
 ):
     with storage.start_transaction() as st:
         st.queue_job(job_id)
+        status = st.get_job_status(job_id)
     background_tasks.add_task(qm.enqueue_job, job_id, user)
+    background_tasks.add_task(qm.publish_job_status, job_id, status)
 
 
 @router.get(
@@ -382,7 +547,7 @@ async def compute_job(
     responses=default_get_responses,
     response_model=List[models.StoredJobResultMetadata],
 )
-async def list_job_results(
+def list_job_results(
     job_id: UUID,
     storage: StorageInterface = Depends(StorageInterface),
 ):
@@ -414,7 +579,7 @@ async def list_job_results(
         },
     },
 )
-async def get_job_result(
+def get_job_result(
     job_id: UUID,
     result_id: UUID,
     storage: StorageInterface = Depends(StorageInterface),
@@ -14,7 +14,7 @@ router = APIRouter()
 @router.get(
     "/", response_model=List[models.StoredPVSystem], responses=default_get_responses
 )
-async def list_systems(
+def list_systems(
     storage: StorageInterface = Depends(StorageInterface),
 ) -> List[models.StoredPVSystem]:
     """List available PV systems"""
@@ -49,7 +49,7 @@ system_links = {
     },
     status_code=201,
 )
-async def create_system(
+def create_system(
     system: models.PVSystem,
     response: Response,
     request: Request,
@@ -84,7 +84,7 @@ async def check_system(
         200: {"links": system_links},
     },
 )
-async def get_system(
+def get_system(
     system_id: UUID = Path(
         ..., description="ID of system to get", example=models.SYSTEM_ID
     ),
@@ -98,7 +98,7 @@ async def get_system(
 @router.delete(
     "/{system_id}", responses={**default_get_responses, 204: {}}, status_code=204
 )
-async def delete_system(
+def delete_system(
     system_id: UUID = Path(
         ..., description="ID of system to delete", example=models.SYSTEM_ID
     ),
@@ -118,7 +118,7 @@ async def delete_system(
     },
     status_code=201,
 )
-async def update_system(
+def update_system(
     system: models.PVSystem,
     response: Response,
     request: Request,
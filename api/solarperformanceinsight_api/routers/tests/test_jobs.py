@@ -1,3 +1,4 @@
+import asyncio
 import calendar
 import datetime as dt
 from io import BytesIO, StringIO
@@ -5,13 +6,14 @@ import uuid
 
 
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 import numpy as np
 import pandas as pd
 import pytest
 from rq import SimpleWorker
 
 
-from solarperformanceinsight_api import models, storage, compute
+from solarperformanceinsight_api import models, storage, compute, utils
 from solarperformanceinsight_api.routers import jobs
 
 
@@ -26,6 +28,71 @@ def test_list_jobs(client, stored_job):
     assert jobs[0] == stored_job
 
 
+def test_list_job_summaries(client, stored_job):
+    response = client.get("/jobs/summaries")
+    assert response.status_code == 200
+    summaries = [models.StoredJobSummary(**j) for j in response.json()]
+    assert len(summaries) == 5
+    assert summaries[0].object_id == stored_job.object_id
+    assert summaries[0].status == stored_job.status
+    assert (
+        summaries[0].definition.system_id == stored_job.definition.parameters.system_id
+    )
+    assert (
+        summaries[0].definition.time_parameters
+        == stored_job.definition.parameters.time_parameters
+    )
+    assert summaries[0].definition.number_of_data_objects == len(
+        stored_job.data_objects
+    )
+    etag = response.headers["ETag"]
+    response = client.get("/jobs/summaries", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_list_job_summaries_page(client):
+    all_ids = [j["object_id"] for j in client.get("/jobs/summaries").json()]
+    response = client.get("/jobs/summaries", params={"limit": 2, "offset": 1})
+    assert response.status_code == 200
+    assert [j["object_id"] for j in response.json()] == all_ids[1:3]
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": 1001}, {"offset": -1}])
+def test_list_job_summaries_bad_page(client, params):
+    response = client.get("/jobs/summaries", params=params)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "if_none_match,status_code",
+    [
+        (None, 200),
+        ('"abc"', 200),
+        ("{etag}", 304),
+        ('W/{etag}, "abc"', 304),
+        ('"abc", {etag}', 304),
+        ("*", 304),
+    ],
+)
+def test_etag_response(if_none_match, status_code):
+    content = models.JobStatus(
+        status="queued",
+        last_change=dt.datetime(2021, 12, 11, 20, tzinfo=dt.timezone.utc),
+    )
+    etag = jobs._etag_response(content, None).headers["ETag"]
+    if if_none_match is not None:
+        if_none_match = if_none_match.format(etag=etag)
+    response = jobs._etag_response(content, if_none_match)
+    assert response.status_code == status_code
+    assert response.headers["ETag"] == etag
+    if status_code == 200:
+        assert models.JobStatus.parse_raw(response.body) == content
+    else:
+        assert response.body == b""
+
+
 def test_get_job(client, stored_job, job_id):
     response = client.get(f"/jobs/{job_id}")
     assert response.status_code == 200
@@ -37,6 +104,7 @@ def test_get_job(client, stored_job, job_id):
     (
         ("GET", "/jobs/{other}"),
         ("GET", "/jobs/{other}/status"),
+        ("GET", "/jobs/{other}/status/stream"),
         ("GET", "/jobs/{other}/data/{data_id}"),
         ("GET", "/jobs/{jobid}/data/{baddataid}"),
         ("DELETE", "/jobs/{other}"),
@@ -69,6 +137,12 @@ def test_get_job_status(client, job_id, job_status):
     assert models.JobStatus(**response.json()) == job_status
 
 
+def test_get_job_status_not_modified(client, job_id, job_status):
+    etag = client.get(f"/jobs/{job_id}/status").headers["ETag"]
+    response = client.get(f"/jobs/{job_id}/status", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
 def test_get_job_status_running(client, job_id, mocker):
     running = models.JobStatus(
         status="running",
@@ -101,6 +175,132 @@ def test_get_job_status_queued(client, job_id, mocker, mock_redis):
     assert models.JobStatus(**response.json()) == queued
 
 
+@pytest.fixture()
+def status_listener(mock_redis):
+    yield jobs.job_status_listener
+    jobs.job_status_listener.stop()
+
+
+def test_stream_job_status_complete(client, complete_job_id, status_listener):
+    response = client.get(f"/jobs/{complete_job_id}/status/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    # a complete job only has the current status
+    event = response.text
+    assert event.startswith("data: ")
+    assert event.endswith("\n\n")
+    assert models.JobStatus.parse_raw(event[6:]).status == "complete"
+
+
+async def _next_event_on_publish(events, job_id, status):
+    # the listener thread may not have subscribed yet, and repeated
+    # statuses are only sent once
+    nxt = asyncio.ensure_future(events.__anext__())
+    for _ in range(50):
+        jobs.QueueManager().publish_job_status(job_id, status)
+        done, _ = await asyncio.wait([nxt], timeout=0.1)
+        if done:
+            return nxt.result()
+    nxt.cancel()
+    raise AssertionError("No event sent")
+
+
+@pytest.mark.asyncio
+async def test_job_status_events(mocker, job_id, job_status, status_listener):
+    storage = mocker.MagicMock()
+    st = storage.start_transaction.return_value.__enter__.return_value
+    st.get_job_status.return_value = job_status
+    events = jobs._job_status_events(job_id, storage, mocker.MagicMock())
+    assert await events.__anext__() == f"data: {job_status.json()}\n\n"
+
+    running = models.JobStatus(
+        status="running",
+        last_change=dt.datetime(2021, 12, 11, 21, tzinfo=dt.timezone.utc),
+    )
+    assert (
+        await _next_event_on_publish(events, job_id, running)
+        == f"data: {running.json()}\n\n"
+    )
+    complete = models.JobStatus(
+        status="complete",
+        last_change=dt.datetime(2021, 12, 11, 22, tzinfo=dt.timezone.utc),
+    )
+    assert (
+        await _next_event_on_publish(events, job_id, complete)
+        == f"data: {complete.json()}\n\n"
+    )
+    # stream ends after the job finishes
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert job_id not in status_listener._queues
+
+
+@pytest.mark.asyncio
+async def test_job_status_events_keepalive(mocker, job_id, job_status, status_listener):
+    mocker.patch.object(jobs.settings, "job_status_stream_keepalive", 0.01)
+    storage = mocker.MagicMock()
+    st = storage.start_transaction.return_value.__enter__.return_value
+    st.get_job_status.return_value = job_status
+    events = jobs._job_status_events(job_id, storage, mocker.MagicMock())
+    await events.__anext__()
+    assert await events.__anext__() == ": keepalive\n\n"
+    await events.aclose()
+    assert job_id not in status_listener._queues
+
+
+@pytest.mark.asyncio
+async def test_job_status_events_missed_change(
+    mocker, job_id, job_status, status_listener
+):
+    mocker.patch.object(jobs.settings, "job_status_stream_keepalive", 0.01)
+    storage = mocker.MagicMock()
+    st = storage.start_transaction.return_value.__enter__.return_value
+    st.get_job_status.return_value = job_status
+    events = jobs._job_status_events(job_id, storage, mocker.MagicMock())
+    await events.__anext__()
+    # the job finished without a status being published
+    complete = models.JobStatus(
+        status="complete",
+        last_change=dt.datetime(2021, 12, 11, 22, tzinfo=dt.timezone.utc),
+    )
+    st.get_job_status.return_value = complete
+    assert await events.__anext__() == f"data: {complete.json()}\n\n"
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert job_id not in status_listener._queues
+
+
+@pytest.mark.asyncio
+async def test_job_status_events_deleted(mocker, job_id, job_status, status_listener):
+    mocker.patch.object(jobs.settings, "job_status_stream_keepalive", 0.01)
+    storage = mocker.MagicMock()
+    st = storage.start_transaction.return_value.__enter__.return_value
+    st.get_job_status.return_value = job_status
+    events = jobs._job_status_events(job_id, storage, mocker.MagicMock())
+    await events.__anext__()
+    st.get_job_status.side_effect = HTTPException(status_code=404)
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+    assert job_id not in status_listener._queues
+
+
+@pytest.mark.asyncio
+async def test_job_status_events_max_seconds(
+    mocker, job_id, job_status, status_listener
+):
+    mocker.patch.object(jobs.settings, "job_status_stream_max_seconds", 0.05)
+    storage = mocker.MagicMock()
+    st = storage.start_transaction.return_value.__enter__.return_value
+    st.get_job_status.return_value = job_status
+    events = jobs._job_status_events(job_id, storage, mocker.MagicMock())
+    await events.__anext__()
+    # closed long before the next keepalive
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(events.__anext__(), 1)
+    assert job_id not in status_listener._queues
+
+
 def test_delete_job(nocommit_transaction, client, job_id):
     response = client.delete(f"/jobs/{job_id}")
     assert response.status_code == 204
@@ -171,6 +371,58 @@ def test_convert_job_data():
     assert out == b"thisiswrong"
 
 
+def test_convert_job_data_compressed(mocker):
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1h", periods=24),
+            "performance": np.arange(24, dtype="float32"),
+        }
+    )
+    mocker.patch.object(utils.settings, "arrow_compression", "zstd")
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    out = jobs._convert_job_data(
+        data,
+        "application/vnd.apache.arrow.file",
+        "application/vnd.apache.arrow.file",
+        lambda x: x,
+    )
+    assert utils.arrow_compression(out) is None
+    pd.testing.assert_frame_equal(utils.read_arrow(BytesIO(out)), df)
+    csv = jobs._convert_job_data(
+        data, "application/vnd.apache.arrow.file", "text/csv", lambda x: x
+    )
+    pd.testing.assert_frame_equal(
+        pd.read_csv(StringIO(_read_streaming(csv)), parse_dates=["time"]),
+        df,
+        check_dtype=False,
+    )
+
+
+def _read_streaming(response):
+    async def read():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(read())
+
+
+def test_convert_job_data_csv_streaming(mocker):
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=25000),
+            "performance": np.arange(25000, dtype="float32"),
+        }
+    )
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    iter_csv = mocker.spy(utils, "iter_arrow_csv")
+    out = jobs._convert_job_data(
+        data, "application/vnd.apache.arrow.file", "text/csv", jobs.CSVResponse
+    )
+    assert isinstance(out, StreamingResponse)
+    assert out.media_type == "text/csv"
+    assert iter_csv.call_count == 1
+    assert _read_streaming(out) == df.to_csv(None, index=False)
+
+
 def test_convert_job_data_invalid():
     with pytest.raises(HTTPException) as err:
         jobs._convert_job_data(
@@ -190,6 +442,51 @@ def test_convert_job_data_bad_type():
     assert err.value.status_code == 400
 
 
+@pytest.mark.parametrize("fmt", ["csv", "arrow"])
+def test_process_job_data(stored_job, fmt):
+    data_obj = stored_job.data_objects[0]
+    time_range = stored_job.definition.parameters.time_parameters._time_range
+    df = pd.DataFrame(
+        {
+            "time": time_range,
+            "poa_global": 1.0,
+            "poa_direct": 1.0,
+            "poa_diffuse": 1.0,
+            "module_temperature": np.nan,
+        }
+    ).iloc[1:]
+    df.loc[2, "poa_global"] = np.nan
+    if fmt == "csv":
+        content = BytesIO(df.to_csv(index=False).encode())
+        read_fnc = utils.read_csv
+    else:
+        content = BytesIO(utils.dump_arrow_bytes(utils.convert_to_arrow(df)))
+        read_fnc = utils.read_arrow
+    arrow_bytes, stats = jobs._process_job_data(stored_job, data_obj, read_fnc, content)
+    assert stats.number_of_expected_rows == len(time_range)
+    assert stats.number_of_missing_rows == 1
+    assert stats.missing_times == [time_range[0]]
+    assert stats.number_of_missing_values == {
+        "poa_global": 1,
+        "poa_direct": 0,
+        "poa_diffuse": 0,
+        "module_temperature": len(time_range) - 1,
+    }
+    out = utils.read_arrow_bytes(arrow_bytes)
+    pd.testing.assert_index_equal(out.index, time_range.rename("time"))
+    assert out.dtypes.eq("float32").all()
+    assert out.poa_direct.isna().sum() == 1
+
+
+def test_process_job_data_invalid(stored_job):
+    content = BytesIO(b"time,poa_global\n2020-01-01T00:00Z,0\n")
+    with pytest.raises(HTTPException) as err:
+        jobs._process_job_data(
+            stored_job, stored_job.data_objects[0], utils.read_csv, content
+        )
+    assert err.value.status_code == 400
+
+
 @pytest.fixture()
 def new_job(system_id):
     return models.CalculatePerformanceJobParameters(
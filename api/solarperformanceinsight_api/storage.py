@@ -27,11 +27,13 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 
 """
+from collections import OrderedDict
 from contextlib import contextmanager
 import datetime as dt
 from functools import partial
 import json
-from typing import List, Callable, Dict, Any, Tuple, Optional
+import threading
+from typing import List, Callable, Dict, Any, Iterable, Tuple, Optional
 from uuid import UUID
 
 
@@ -115,6 +117,40 @@ engine = create_engine(
 ).pool
 
 
+# parsed job definitions by job id and the user that read the job, with the
+# modified_at of the job when parsed, least recently used first. copies of
+# the cached Jobs are returned so that they can't be modified by a request
+_job_cache: "OrderedDict[Tuple[Any, str], Tuple[Any, models.Job]]" = OrderedDict()
+_job_cache_lock = threading.Lock()
+
+
+def _get_job_definition(
+    job_id: Any, user: str, modified_at: Any, definition: Dict[str, Any]
+) -> models.Job:
+    """Parse a job definition, reusing the Job parsed earlier for the same
+    job and user if the job has not been modified since. A deep copy is
+    faster than validating the definition again."""
+    if settings.job_cache_size <= 0:
+        return models.Job(**definition)
+    key = (job_id, user)
+    with _job_cache_lock:
+        cached = _job_cache.get(key)
+        if cached is not None and cached[0] == modified_at:
+            _job_cache.move_to_end(key)
+            jobmod = cached[1]
+        else:
+            jobmod = None
+    if jobmod is not None:
+        return jobmod.copy(deep=True)
+    jobmod = models.Job(**definition)
+    with _job_cache_lock:
+        _job_cache[key] = (modified_at, jobmod)
+        _job_cache.move_to_end(key)
+        while len(_job_cache) > settings.job_cache_size:
+            _job_cache.popitem(last=False)
+    return jobmod.copy(deep=True)
+
+
 def ensure_user_exists(f: Callable) -> Callable:
     """Decorator that ensures the DB user exists for the current auth0 ID.
     Only necessary on methods that require an existing user like create_*.
@@ -299,6 +335,27 @@ class StorageInterface:
         joblist = self._call_procedure("list_jobs")
         return [self._parse_job(jp) for jp in joblist]
 
+    def _parse_job_summary(self, job: Dict[str, Any]) -> models.StoredJobSummary:
+        job["object_id"] = job.pop("job_id")
+        job["object_type"] = "job"
+        job["status"] = {
+            "status": job.pop("status"),
+            "last_change": job.pop("last_change"),
+        }
+        if isinstance(job["time_parameters"], str):
+            job["time_parameters"] = json.loads(job["time_parameters"])
+        job["definition"] = {
+            k: job[k] for k in models.JobSummary.schema()["properties"].keys()
+        }
+        return models.StoredJobSummary(**job)
+
+    def list_job_summaries(
+        self, limit: int, offset: int = 0
+    ) -> List[models.StoredJobSummary]:
+        """List a page of jobs without parsing their full definitions"""
+        joblist = self._call_procedure("list_job_summaries", limit, offset)
+        return [self._parse_job_summary(jp) for jp in joblist]
+
     def get_job(self, job_id: UUID) -> models.StoredJob:
         job = self._call_procedure_for_single("get_job", job_id)
         return self._parse_job(job)
@@ -333,7 +390,9 @@ class StorageInterface:
         job["status"]["last_change"] = convert_datetime_utc(
             job["status"]["last_change"]
         )
-        jobmod = models.Job(**job["definition"])
+        jobmod = _get_job_definition(
+            job["object_id"], self.user, job["modified_at"], job["definition"]
+        )
         job["definition"] = jobmod
         jdo = []
         for do in job["data_objects"]:
@@ -368,6 +427,27 @@ class StorageInterface:
         meta = self._parse_job_data_meta(out)
         return meta, data
 
+    def get_job_data_bulk(
+        self, job_id: UUID, job_data_ids: List[UUID]
+    ) -> Dict[UUID, Tuple[models.StoredJobDataMetadata, bytes]]:
+        """Get the metadata and data of many job data objects in one call,
+        keyed by the ids in job_data_ids"""
+        ids = {str(data_id): data_id for data_id in job_data_ids}
+        out = self._call_procedure("get_job_data_bulk", job_id, json.dumps(list(ids)))
+        result = {}
+        for o in out:
+            data = o.pop("data")
+            data_id = ids[o["id"]]
+            result[data_id] = (self._parse_job_data_meta(o), data)
+        if len(result) != len(ids):
+            raise HTTPException(status_code=404)
+        return result
+
+    def get_job_data_sizes(self, job_id: UUID) -> Dict[UUID, int]:
+        """Get the size in bytes of the data of each job data object"""
+        out = self._call_procedure("get_job_data_sizes", job_id)
+        return {UUID(o["id"]): o["size"] for o in out}
+
     def queue_job(self, job_id: UUID):
         self._call_procedure("queue_job", job_id)
 
@@ -432,6 +512,17 @@ class StorageInterface:
             object_id=created["job_result_id"], object_type="job_result"
         )
 
+    def add_job_results(
+        self,
+        job_id: UUID,
+        results: Iterable[Tuple[str, str, str, bytes]],
+    ) -> List[models.StoredObjectID]:
+        """Add many results, each a tuple of (schema_path, data_type,
+        data_format, data), to a job. The data is sent as is, in the
+        current transaction, so results may be a generator that only
+        keeps one result in memory at a time."""
+        return [self.add_job_result(job_id, *result) for result in results]
+
     def _set_job_status(self, job_id: UUID, status: str):
         self._final_job_status_set = True
         self._try_job_query("set_job_completion", job_id, status)
@@ -462,6 +553,21 @@ class JobManagementInterface(StorageInterface):
             res = st._call_procedure("list_queued_jobs", with_current_user=False)
         return {r["job_id"]: r["user_id"] for r in res}
 
+    def list_job_changes(self, since: dt.datetime) -> Dict[str, Tuple[str, str]]:
+        """Map the id of each job modified at or after since to its user
+        and status"""
+        with self.start_transaction() as st:
+            res = st._call_procedure("list_job_changes", since, with_current_user=False)
+        return {r["job_id"]: (r["user_id"], r["status"]) for r in res}
+
+    def get_status_of_jobs(self, job_ids: List[str]) -> Dict[str, str]:
+        """Status of each job in job_ids that still exists"""
+        with self.start_transaction() as st:
+            res = st._call_procedure(
+                "get_status_of_jobs", json.dumps(job_ids), with_current_user=False
+            )
+        return {r["job_id"]: r["status"] for r in res}
+
     def report_job_failure(self, job_id: str, message: str) -> str:
         with self.start_transaction() as st:
             res = st._call_procedure_for_single(
@@ -1,3 +1,4 @@
+import asyncio
 from urllib.parse import unquote
 
 
@@ -7,7 +8,9 @@ import pytest
 import schemathesis
 
 
+from solarperformanceinsight_api import main
 from solarperformanceinsight_api.main import app
+from solarperformanceinsight_api.routers import jobs, systems, user
 
 
 pytestmark = pytest.mark.usefixtures("add_example_db_data")
@@ -53,3 +56,23 @@ def test_api_post(case, with_auth, auth_token):
             case.headers.update(upd)
     response = case.call_asgi()
     case.validate_response(response)
+
+
+@pytest.mark.parametrize("router", [jobs.router, systems.router, user.router])
+def test_routes_not_on_event_loop(router):
+    # routes that use the database must be sync so they run in the thread pool,
+    # only the check routes, which just validate the body, may be async
+    for route in router.routes:
+        if route.name.startswith("check_"):
+            continue
+        assert not asyncio.iscoroutinefunction(route.endpoint), route.name
+
+
+def test_set_threadpool(mocker):
+    mocker.patch.object(main.settings, "api_max_threads", 3)
+    loop = asyncio.new_event_loop()
+    try:
+        main.set_threadpool(loop)
+        assert loop._default_executor._max_workers == 3
+    finally:
+        loop.close()
@@ -2,6 +2,7 @@ import calendar
 from copy import deepcopy
 import datetime as dt
 from io import BytesIO
+import os
 from uuid import uuid1
 
 
@@ -13,7 +14,7 @@ from pvlib.modelchain import ModelChain
 import pytest
 
 
-from solarperformanceinsight_api import compute, storage, models, pvmodeling
+from solarperformanceinsight_api import compute, storage, models, pvmodeling, utils
 
 
 pytestmark = pytest.mark.usefixtures("add_example_db_data")
@@ -49,6 +50,23 @@ def test_run_job_job_fail(job_id, auth0_id, mocker, msg, nocommit_transaction):
     assert results[0].definition.type == "error message"
 
 
+def test_run_job_publish_status(job_id, auth0_id, mocker, nocommit_transaction):
+    new = mocker.MagicMock(side_effect=ValueError)
+    mocker.patch.object(compute, "lookup_job_compute_function", return_value=new)
+    pub = mocker.patch.object(compute, "_publish_job_status")
+    compute.run_job(job_id, auth0_id)
+    assert [c[0][0] for c in pub.call_args_list] == [job_id, job_id]
+    assert [c[0][1].status for c in pub.call_args_list] == ["running", "error"]
+
+
+def test_publish_job_status(job_id, job_status, mock_redis):
+    pubsub = mock_redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(f"spi:job_status:{job_id}")
+    compute._publish_job_status(job_id, job_status)
+    message = next(pubsub.listen())
+    assert models.JobStatus.parse_raw(message["data"]) == job_status
+
+
 @pytest.mark.parametrize(
     "njp,exp,tp",
     [
@@ -217,6 +235,94 @@ def test_get_data_month(
     pd.testing.assert_frame_equal(exp.set_index("month"), out)
 
 
+def test_prefetch_data(mocker):
+    mocker.patch.object(compute.settings, "job_data_batch_size", 2)
+    si = mocker.MagicMock()
+    st = si.start_transaction.return_value.__enter__.return_value
+    st.get_job_data_bulk.side_effect = lambda job_id, ids: {
+        i: (f"meta {i}", f"data {i}".encode()) for i in ids
+    }
+    st.get_job_data.return_value = ("meta", b"single")
+    st.get_job_data_sizes.return_value = {}
+    job_id = uuid1()
+    ids = [uuid1() for _ in range(3)]
+    with compute._prefetch_data(job_id, ids, si) as prefetch:
+        assert compute._fetch_data(job_id, ids[1], si, prefetch) == (
+            f"meta {ids[1]}",
+            b"data %s" % str(ids[1]).encode(),
+        )
+        st.get_job_data_bulk.assert_called_once_with(job_id, [ids[1], ids[0]])
+        assert compute._fetch_data(job_id, ids[0], si, prefetch)[0] == f"meta {ids[0]}"
+        assert st.get_job_data_bulk.call_count == 1
+        assert compute._fetch_data(job_id, ids[2], si, prefetch)[0] == f"meta {ids[2]}"
+        assert st.get_job_data_bulk.call_count == 2
+        assert st.get_job_data_bulk.call_args[0][1] == [ids[2]]
+        # already read or never marked are fetched one by one
+        assert compute._fetch_data(job_id, ids[2], si, prefetch) == ("meta", b"single")
+        assert compute._fetch_data(job_id, uuid1(), si, prefetch) == (
+            "meta",
+            b"single",
+        )
+        assert st.get_job_data.call_count == 2
+        # other job
+        assert compute._fetch_data(uuid1(), ids[0], si, prefetch) == (
+            "meta",
+            b"single",
+        )
+
+
+def test_prefetch_data_context(mocker):
+    si = mocker.MagicMock()
+    st = si.start_transaction.return_value.__enter__.return_value
+    meta = mocker.MagicMock()
+    meta.definition.data_format = "application/vnd.apache.arrow.file"
+    st.get_job_data_bulk.side_effect = lambda job_id, ids: {
+        i: (meta, f"data {i}".encode()) for i in ids
+    }
+    st.get_job_data_sizes.return_value = {}
+    st.get_job_data.return_value = (meta, b"single")
+    job_id = uuid1()
+    ids = [uuid1() for _ in range(2)]
+    with compute._prefetch_data(job_id, ids, si):
+        assert compute._get_data_bytes(job_id, ids[0], si) == (
+            b"data %s" % str(ids[0]).encode()
+        )
+        assert st.get_job_data_bulk.call_count == 1
+        assert st.get_job_data.call_count == 0
+    # the prefetch is dropped with the context, so nothing is left for the
+    # next job
+    assert compute._current_prefetch.get() is None
+    assert compute._get_data_bytes(job_id, ids[1], si) == b"single"
+    assert st.get_job_data_bulk.call_count == 1
+    assert st.get_job_data.call_count == 1
+
+
+def test_prefetch_data_batch_bytes(mocker):
+    mocker.patch.object(compute.settings, "job_data_batch_size", 10)
+    mocker.patch.object(compute.settings, "job_data_batch_bytes", 100)
+    si = mocker.MagicMock()
+    st = si.start_transaction.return_value.__enter__.return_value
+    st.get_job_data_bulk.side_effect = lambda job_id, ids: {
+        i: (f"meta {i}", f"data {i}".encode()) for i in ids
+    }
+    job_id = uuid1()
+    ids = [uuid1() for _ in range(5)]
+    st.get_job_data_sizes.return_value = dict(zip(ids, [60, 30, 50, 20, 200]))
+    prefetch = compute._DataPrefetch(job_id, ids, si)
+
+    prefetch.pop(ids[0])
+    # stops short of the byte limit, skipping data that doesn't fit
+    assert st.get_job_data_bulk.call_args[0][1] == [ids[0], ids[1]]
+    prefetch.pop(ids[2])
+    assert st.get_job_data_bulk.call_args[0][1] == [ids[2], ids[3]]
+    # larger than the limit is fetched by itself
+    prefetch.pop(ids[4])
+    assert st.get_job_data_bulk.call_args[0][1] == [ids[4]]
+    assert st.get_job_data_bulk.call_count == 3
+    # sizes only read once for the job
+    assert st.get_job_data_sizes.call_count == 1
+
+
 def test_DBResult_setting():
     df = pd.DataFrame(
         {"a": 0.0},
@@ -346,6 +452,25 @@ def test_generate_job_weather_data_system_multi_array(stored_job, auth0_id, mock
     assert len(genlist[0]) == 2
 
 
+def test_generate_job_weather_data_system_shared(stored_job, auth0_id, mocker):
+    si = storage.StorageInterface(user=auth0_id)
+    inv = stored_job.definition.system_definition.inverters[0]
+    inv.arrays = inv.arrays * 2
+    stored_job.definition.system_definition.inverters = [inv] * 3
+    getdata = mocker.patch.object(
+        compute, "_get_data", return_value=pd.DataFrame({"a": [0]})
+    )
+    ndo = deepcopy(stored_job.data_objects[0])
+    ndo.definition.schema_path = "/"
+    stored_job.definition.parameters.weather_granularity = "system"
+    stored_job.data_objects = [ndo]
+    genlist = list(compute.generate_job_weather_data(stored_job, si))
+    assert getdata.call_count == 1
+    assert len(genlist) == 3
+    # no copies for each inverter
+    assert all(df is getdata.return_value for inv in genlist for df in inv)
+
+
 def test_generate_job_weather_data_inverter(stored_job, auth0_id, mocker):
     si = storage.StorageInterface(user=auth0_id)
 
@@ -751,6 +876,439 @@ def test_compare_modeled_and_actual(mockup_modelchain, auth0_id, nocommit_transa
     assert (ser.loc["ratio"] - 1.0 / 2.0) < 1e-7
 
 
+@pytest.mark.parametrize("executor", ["serial", "thread"])
+def test_run_performance_job_executor(
+    auth0_id, nocommit_transaction, mockup_modelchain, mocker, executor
+):
+    mocker.patch.object(compute.settings, "compute_executor", executor)
+    mocker.patch.object(compute.settings, "compute_max_workers", 2)
+    si = storage.StorageInterface(user=auth0_id)
+    stored_job, save, df = mockup_modelchain
+
+    compute.run_performance_job(stored_job, si)
+    assert compute.process_single_modelchain.call_count == 2
+    assert [c[0][-1] for c in compute.process_single_modelchain.call_args_list] == [
+        0,
+        1,
+    ]
+    reslist = save.call_args[0][1]
+    perf_df = pd.read_feather(BytesIO(reslist[-1].data)).set_index("time")
+    assert perf_df.loc[df.index[0], "performance"] == 2.0
+
+
+@pytest.mark.parametrize(
+    "months,windows",
+    ((1, 12), (2, 6), (5, 3), (12, 1), (24, 1)),
+)
+def test_time_windows(months, windows):
+    time_range = pd.date_range(
+        "2020-01-01T00:00", "2020-12-31T23:00", freq="1h", tz="America/Denver"
+    )
+    out = compute._time_windows(time_range, months)
+    assert len(out) == windows
+    pd.testing.assert_index_equal(out[0].append(out[1:]), time_range)
+    for window in out:
+        assert window.month.nunique() <= months
+
+
+def test_time_windows_across_years():
+    time_range = pd.date_range("2019-11-15T00:00Z", "2020-02-10T00:00Z", freq="1d")
+    out = compute._time_windows(time_range, 2)
+    assert [(w[0].month, w[-1].month) for w in out] == [(11, 12), (1, 2)]
+
+
+@pytest.mark.parametrize("window_months", [1, 5])
+def test_calculate_performance_by_window(stored_job, mocker, window_months):
+    stored_job.definition.system_definition.inverters *= 2
+    time_range = stored_job.definition.parameters.time_parameters._time_range
+    hour = time_range.hour + time_range.minute / 60
+    poa = np.clip(1000 * np.sin((hour - 6) / 12 * np.pi), 0, None)
+    weather = pd.DataFrame(
+        {
+            "poa_global": poa,
+            "poa_direct": 0.8 * poa,
+            "poa_diffuse": 0.2 * poa,
+            "module_temperature": 20 + poa / 50,
+        },
+        index=time_range,
+    )
+    mocker.patch.object(
+        compute,
+        "generate_job_weather_data",
+        side_effect=lambda *args, **kwargs: iter([[weather], [weather * 0.9]]),
+    )
+    weather_dirs = []
+
+    def spool(job, si, directory, **kwargs):
+        weather_dirs.append(directory)
+        return [
+            [
+                utils.ArrowTimeFile(
+                    utils.dump_arrow_frame(
+                        (weather * factor).rename_axis("time").reset_index(),
+                        chunk_rows=500,
+                    ),
+                    os.path.join(directory, str(factor)),
+                )
+            ]
+            for factor in (1, 0.9)
+        ]
+
+    mocker.patch.object(compute, "_spool_job_weather", side_effect=spool)
+    mocker.patch.object(compute.settings, "compute_window_months", None)
+    exp_energy, exp_results = compute._calculate_performance(stored_job, None)
+    mocker.patch.object(compute.settings, "compute_window_months", window_months)
+    window = mocker.spy(compute, "_calculate_performance_by_window")
+    executor = mocker.spy(compute, "_get_executor")
+    energy, results = compute._calculate_performance(stored_job, None)
+    assert window.call_count == 1
+    # one executor is shared by every window
+    assert executor.call_count == 1
+    # weather files are removed after modeling
+    assert len(weather_dirs) == 1
+    assert not os.path.exists(weather_dirs[0])
+    # results are joined from the spooled windows as they are iterated
+    assert not isinstance(results, list)
+    results = list(results)
+
+    pd.testing.assert_series_equal(energy, exp_energy)
+    assert [(r.schema_path, r.type) for r in results] == [
+        (r.schema_path, r.type) for r in exp_results
+    ]
+    for res, exp in zip(results, exp_results):
+        pd.testing.assert_frame_equal(
+            pd.read_feather(BytesIO(res.data)), pd.read_feather(BytesIO(exp.data))
+        )
+
+
+@pytest.mark.parametrize("timing", [True, False])
+def test_save_results_to_db_timing(mocker, timing):
+    mocker.patch.object(compute.settings, "job_timing_result", timing)
+    si = mocker.MagicMock()
+    st = si.start_transaction.return_value.__enter__.return_value
+    written = []
+    st.add_job_results.side_effect = lambda job_id, rows: written.extend(rows)
+    job_id = uuid1()
+    df = pd.DataFrame(
+        {"performance": [1.0]},
+        index=pd.DatetimeIndex([pd.Timestamp("2020-01-01T12:00Z")], name="time"),
+    )
+    with compute.instrumentation.time_job(job_id) as timer:
+        compute.save_results_to_db(
+            job_id,
+            [compute.DBResult(schema_path="/", type="performance data", data=df)],
+            si,
+        )
+    assert st.add_job_results.call_count == 1
+    types = [r[1] for r in written]
+    assert st.set_job_complete.call_count == 1
+    assert timer.stages["save results"]["calls"] == 1
+    if timing:
+        assert types == ["performance data", "timing"]
+        timing_df = pd.read_feather(BytesIO(written[-1][3]))
+        assert list(timing_df.stage) == ["serialize results"]
+    else:
+        assert types == ["performance data"]
+
+
+def test_save_results_to_db_rows(mocker):
+    si = mocker.MagicMock()
+    st = si.start_transaction.return_value.__enter__.return_value
+    written = []
+    st.add_job_results.side_effect = lambda job_id, rows: written.extend(rows)
+    job_id = uuid1()
+    results = (
+        compute.DBResult(
+            schema_path=f"/inverters/{i}", type="performance data", data=b"0" * 6
+        )
+        for i in range(3)
+    )
+    with compute.instrumentation.time_job(job_id) as timer:
+        compute.save_results_to_db(job_id, results, si)
+    st.add_job_results.assert_called_once()
+    assert st.add_job_result.call_count == 0
+    assert written == [
+        (
+            f"/inverters/{i}",
+            "performance data",
+            "application/vnd.apache.arrow.file",
+            b"000000",
+        )
+        for i in range(3)
+    ]
+    assert timer.stages["save results"]["bytes_written"] == 18
+    st.set_job_complete.assert_called_once_with(job_id)
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread"])
+def test_run_performance_job_stages(mocker, stored_job, executor):
+    mocker.patch.object(compute.settings, "compute_executor", executor)
+    save = mocker.patch.object(compute, "save_results_to_db")
+    time_range = stored_job.definition.parameters.time_parameters._time_range[:96]
+    weather = pd.DataFrame(
+        {
+            "poa_global": 500.0,
+            "poa_direct": 400.0,
+            "poa_diffuse": 100.0,
+            "module_temperature": 30.0,
+        },
+        index=time_range,
+    )
+    mocker.patch.object(compute, "generate_job_weather_data", return_value=[[weather]])
+    with compute.instrumentation.time_job(stored_job.object_id) as timer:
+        compute.run_performance_job(stored_job, None)
+    assert save.call_count == 1
+    assert timer.stages["run model"]["calls"] == 1
+    assert timer.stages["run model"]["rows"] == 96
+    assert timer.stages["assemble results"]["calls"] == 2
+    assert timer.stages["serialize results"]["calls"] == len(save.call_args[0][1])
+
+
+def test_get_executor_unknown(mocker):
+    mocker.patch.object(compute.settings, "compute_executor", "gpu")
+    with pytest.raises(ValueError):
+        compute._get_executor()
+
+
+def test_weather_shifter():
+    index = pd.date_range("2020-01-01T00:00Z", freq="10min", periods=6, name="time")
+    system = pd.DataFrame({"ghi": np.arange(6.0), "temp_air": 20.0}, index=index)
+    other = system * 2
+    tshift = dt.timedelta(minutes=5)
+    shift = compute._WeatherShifter(tshift)
+    first = shift([system, system])
+    assert first[0] is first[1]
+    pd.testing.assert_frame_equal(first[0], system.shift(freq=tshift))
+    # shares data with the original frame
+    assert np.shares_memory(first[0]["ghi"].values, system["ghi"].values)
+    assert shift([system]) == [first[0]]
+    mixed = shift([other, system])
+    assert mixed[1] is first[0]
+    pd.testing.assert_frame_equal(mixed[0], other.shift(freq=tshift))
+    # only the frames of the previous call are kept
+    shift([other])
+    assert shift([system])[0] is not first[0]
+    assert shift(0) == 0
+
+
+def test_window_weather(tmp_path):
+    index = pd.date_range("2020-01-01T00:00Z", freq="1h", periods=48, name="time")
+    system_df = pd.DataFrame({"ghi": np.arange(48, dtype="float32")}, index=index)
+    other_df = system_df * 2
+    system = utils.ArrowTimeFile(
+        utils.dump_arrow_frame(system_df.reset_index()), str(tmp_path / "system")
+    )
+    other = utils.ArrowTimeFile(
+        utils.dump_arrow_frame(other_df.reset_index()), str(tmp_path / "other")
+    )
+    with compute.instrumentation.time_job(uuid1()) as timer:
+        out = list(
+            compute._window_weather([[system, system], [system, other]], index[:24])
+        )
+    assert len(out) == 2
+    assert out[0][0] is out[0][1] is out[1][0]
+    assert len(out[0][0]) == 24
+    pd.testing.assert_frame_equal(out[1][1], other_df.iloc[:24], check_freq=False)
+    # each distinct data is decoded once
+    assert timer.stages["decode data"]["calls"] == 2
+    assert timer.stages["decode data"]["rows"] == 48
+
+
+def test_result_spool(tmp_path):
+    index = pd.date_range("2020-01-01T00:00Z", freq="1h", periods=4, name="time")
+    df = pd.DataFrame({"performance": np.arange(4, dtype="float32")}, index=index)
+    spool = compute._ResultSpool(str(tmp_path))
+    for part in (df.iloc[:2], df.iloc[2:]):
+        for path in ("/inverters/0", "/"):
+            spool.add(
+                path,
+                "performance data",
+                utils.dump_arrow_bytes(utils.convert_to_arrow(part.reset_index())),
+            )
+    assert len(list(tmp_path.iterdir())) == 4
+    system = spool.pop("/", "performance data")
+    pd.testing.assert_frame_equal(utils.read_arrow_bytes(system), df, check_freq=False)
+    assert len(list(tmp_path.iterdir())) == 2
+    results = list(spool.results())
+    assert [(r.schema_path, r.type) for r in results] == [
+        ("/inverters/0", "performance data")
+    ]
+    assert results[0].data == system
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_job_weather(stored_job, mocker, tmp_path):
+    data_ids = [uuid1(), uuid1()]
+    mocker.patch.object(
+        compute,
+        "_job_weather_data_ids",
+        return_value=iter([[data_ids[0]], [data_ids[0], data_ids[1]]]),
+    )
+    data = utils.dump_arrow_frame(
+        pd.DataFrame(
+            {
+                "time": pd.date_range("2020-01-01T00:00Z", freq="1h", periods=4),
+                "ghi": np.arange(4.0),
+            }
+        )
+    )
+    fetch = mocker.patch.object(compute, "_get_data_bytes", return_value=data)
+    with compute.instrumentation.time_job(uuid1()) as timer:
+        out = compute._spool_job_weather(stored_job, None, str(tmp_path))
+    assert len(out) == 2
+    # shared data is fetched and saved once
+    assert out[0][0] is out[1][0]
+    assert out[1][1] is not out[0][0]
+    assert fetch.call_count == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(map(str, data_ids))
+    assert timer.stages["spool data"]["bytes_written"] == 2 * len(data)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_run_modelchains_matches_serial(system_def, mocker, executor):
+    mocker.patch.object(compute.settings, "compute_max_workers", 2)
+    system_def.inverters = system_def.inverters * 3
+    chains = pvmodeling.construct_modelchains(system_def)
+    index = pd.date_range(
+        "2020-06-01T00:00", freq="15min", periods=96, tz="America/Phoenix"
+    )
+    weather = pd.DataFrame(
+        {
+            "ghi": np.linspace(0, 1000, 96),
+            "dni": np.linspace(0, 900, 96),
+            "dhi": np.linspace(0, 100, 96),
+        },
+        index=index,
+    )
+    # different weather for each inverter so that all chains are run
+    weather_gen = [
+        [weather * (i + 1)] * len(inv.arrays)
+        for i, inv in enumerate(system_def.inverters)
+    ]
+    tshift = dt.timedelta(minutes=7.5)
+    inverters = system_def.inverters
+
+    mocker.patch.object(compute.settings, "compute_executor", "serial")
+    serial = list(
+        compute._run_modelchains(inverters, chains, weather_gen, "run_model", tshift)
+    )
+    mocker.patch.object(compute.settings, "compute_executor", executor)
+    parallel = list(
+        compute._run_modelchains(inverters, chains, weather_gen, "run_model", tshift)
+    )
+    assert len(serial) == len(parallel) == 3
+    for (sres, ssum), (pres, psum) in zip(serial, parallel):
+        pd.testing.assert_frame_equal(ssum, psum, check_exact=True)
+        assert [(r.schema_path, r.type, r.data) for r in sres] == [
+            (r.schema_path, r.type, r.data) for r in pres
+        ]
+
+
+def test_run_modelchains_duplicate_inverters(system_def, mocker):
+    inv = system_def.inverters[0]
+    renamed = models.Inverter(**{**inv.dict(), "name": "other"})
+    different = models.Inverter(**{**inv.dict(), "aoi_model": "no_loss"})
+    system_def.inverters = [inv, different, renamed, inv]
+    chains = pvmodeling.construct_modelchains(system_def)
+    index = pd.date_range(
+        "2020-06-01T00:00", freq="15min", periods=96, tz="America/Phoenix"
+    )
+    weather = pd.DataFrame(
+        {
+            "ghi": np.linspace(0, 1000, 96),
+            "dni": np.linspace(0, 900, 96),
+            "dhi": np.linspace(0, 100, 96),
+        },
+        index=index,
+    )
+    weather_gen = [[weather.copy()] * len(inv.arrays) for inv in system_def.inverters]
+    spy = mocker.spy(compute, "process_single_modelchain")
+    out = list(
+        compute._run_modelchains(
+            system_def.inverters,
+            chains,
+            weather_gen,
+            "run_model",
+            dt.timedelta(minutes=7.5),
+        )
+    )
+    # only the first and the different inverter are run
+    assert [c[0][-1] for c in spy.call_args_list] == [0, 1]
+    assert len(out) == 4
+    for i, (db_results, summary) in enumerate(out):
+        assert {r.schema_path for r in db_results} == {
+            f"/inverters/{i}",
+            f"/inverters/{i}/arrays/0",
+        }
+    assert out[1][1].performance.sum() != out[0][1].performance.sum()
+    for i in (2, 3):
+        pd.testing.assert_frame_equal(out[0][1], out[i][1], check_exact=True)
+        assert [r.data for r in out[0][0]] == [r.data for r in out[i][0]]
+
+
+def test_run_modelchains_duplicate_inverters_hash_shared_weather(system_def, mocker):
+    system_def.inverters = system_def.inverters * 3
+    chains = pvmodeling.construct_modelchains(system_def)
+    index = pd.date_range(
+        "2020-06-01T00:00", freq="15min", periods=96, tz="America/Phoenix"
+    )
+    weather = pd.DataFrame(
+        {"ghi": np.linspace(0, 1000, 96), "dni": 800.0, "dhi": 100.0},
+        index=index,
+    )
+    hash_frame = mocker.spy(compute, "_hash_frame")
+    spy = mocker.spy(compute, "process_single_modelchain")
+    out = list(
+        compute._run_modelchains(
+            system_def.inverters,
+            chains,
+            [[weather] * len(inv.arrays) for inv in system_def.inverters],
+            "run_model",
+            dt.timedelta(minutes=7.5),
+        )
+    )
+    assert len(out) == 3
+    assert spy.call_count == 1
+    # system weather is hashed once for every inverter
+    assert hash_frame.call_count == 1
+
+
+def test_weather_key():
+    index = pd.date_range("2020-01-01T00:00Z", freq="1h", periods=4)
+    weather = pd.DataFrame({"ghi": [0.0, 1.0, 2.0, 3.0]}, index=index)
+    weather_key = compute._WeatherKey()
+    first = weather_key([weather, weather])
+    assert first[0] == first[1]
+    assert weather_key([weather.copy()]) == first[:1]
+    assert weather_key([weather * 2])[0] != first[0]
+    assert weather_key([weather.rename(columns={"ghi": "dni"})])[0] != first[0]
+    assert weather_key(weather) is None
+    assert weather_key([weather, None]) is None
+
+
+def test_run_modelchains_duplicate_inverters_different_weather(system_def, mocker):
+    system_def.inverters = system_def.inverters * 2
+    chains = pvmodeling.construct_modelchains(system_def)
+    index = pd.date_range(
+        "2020-06-01T00:00", freq="15min", periods=96, tz="America/Phoenix"
+    )
+    weather = pd.DataFrame(
+        {"ghi": np.linspace(0, 1000, 96), "dni": 800.0, "dhi": 100.0},
+        index=index,
+    )
+    spy = mocker.spy(compute, "process_single_modelchain")
+    list(
+        compute._run_modelchains(
+            system_def.inverters,
+            chains,
+            [[weather], [weather * 0.9]],
+            "run_model",
+            dt.timedelta(minutes=7.5),
+        )
+    )
+    assert spy.call_count == 2
+
+
 @pytest.fixture()
 def pvwatts_system():
     sysdict = deepcopy(models.SYSTEM_EXAMPLE)
@@ -1447,6 +2005,58 @@ def test_get_missing_leap_days(inp, exp):
     assert out == exp
 
 
+@pytest.mark.parametrize("dc", [True, False])
+def test_weather_adjustment(dc):
+    nan = np.nan
+    poa_ref = np.array([[0.0, 0.0, 500.0, 1000.0, nan, 800.0]] * 2)
+    poa_actual = np.array(
+        [[0.0, 100.0, 0.0, 900.0, 100.0, 800.0], [0.0, 100.0, 0.0, 1100.0, nan, 0.0]]
+    )
+    t_ref = np.full((2, 6), 25.0)
+    t_actual = np.array([[25.0, 25.0, 35.0, 45.0, 25.0, 25.0]] * 2)
+    gammas = np.array([[-0.004], [-0.003]])
+    ref = np.array([0.0, 0.0, 200.0, 300.0, 100.0, nan])
+    out = compute._weather_adjustment(
+        poa_ref, poa_actual, t_ref, t_actual, gammas, ref, 250.0, dc
+    )
+
+    # 0/0 -> 0, 100/0 -> inf, 0 * inf -> 0
+    factor = 0.985 if dc else 1.0
+    exp = np.array(
+        [
+            0.0,
+            0.0,
+            0.0,
+            min(
+                300.0
+                * ((0.9 * (1 - 0.004 * 20)) + (1.1 * (1 - 0.003 * 20)))
+                / 2
+                * factor,
+                250.0,
+            ),
+            nan,
+            nan,
+        ]
+    )
+    np.testing.assert_allclose(out, exp)
+
+
+def test_weather_adjustment_inf():
+    ref = np.array([100.0, 0.0])
+    out = compute._weather_adjustment(
+        np.zeros((1, 2)),
+        np.ones((1, 2)),
+        np.full((1, 2), 25.0),
+        np.full((1, 2), 25.0),
+        np.array([[-0.004]]),
+        ref,
+        np.inf,
+        False,
+    )
+    assert out[0] == np.inf
+    assert out[1] == 0.0
+
+
 def test_compare_reference_and_actual_leap_day_dropped(
     auth0_id,
     nocommit_transaction,
@@ -1641,6 +2251,105 @@ def test_compare_reference_and_modeled(
     assert 0.5 < ser["ratio"] < 2.0
 
 
+@pytest.mark.parametrize(
+    "data_available,extra_runs",
+    (("weather only", 2), ("weather and AC performance", 0)),
+)
+def test_compare_reference_and_modeled_runs_modeled_once(
+    mockup_reference_modeled,
+    auth0_id,
+    nocommit_transaction,
+    pvwatts_system,
+    mocker,
+    data_available,
+    extra_runs,
+):
+    ref_params = dict(
+        irradiance_type="standard",
+        temperature_type="air",
+        weather_granularity="system",
+        data_available=data_available,
+    )
+    if data_available != "weather only":
+        ref_params["performance_granularity"] = "system"
+    modeled_params = dict(
+        irradiance_type="standard",
+        temperature_type="air",
+        weather_granularity="system",
+    )
+    si = storage.StorageInterface(user=auth0_id)
+    job, save = mockup_reference_modeled(pvwatts_system, ref_params, modeled_params)
+    calc_perf = mocker.spy(compute, "_calculate_performance")
+    run = mocker.spy(compute, "run_modelchain")
+    compute.compare_reference_and_modeled(job, si)
+    assert calc_perf.call_count == 0
+    # one full modeled run for each of the 2 inverters, and full reference
+    # runs if only reference weather is available
+    full_runs = [
+        c
+        for c in run.call_args_list
+        if not isinstance(c[0][0], pvmodeling.IrradianceTemperatureModelChain)
+    ]
+    assert len(full_runs) == 2 + extra_runs
+    assert run.call_count == 4
+    reslist = save.call_args[0][1]
+    assert [r.type for r in reslist if r.schema_path == "/"] == [
+        "monthly summary",
+        "daytime flag",
+        "performance data",
+        "modeled vs weather adjusted reference",
+    ]
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread"])
+def test_compare_reference_and_modeled_identical_inverters(
+    mockup_reference_modeled,
+    auth0_id,
+    nocommit_transaction,
+    pvwatts_system,
+    mocker,
+    executor,
+):
+    mocker.patch.object(compute.settings, "compute_executor", executor)
+    pvwatts_system.inverters = [
+        pvwatts_system.inverters[1],
+        pvwatts_system.inverters[1].copy(update={"name": "copy"}),
+    ]
+    ref_params = dict(
+        irradiance_type="standard",
+        temperature_type="air",
+        weather_granularity="system",
+        data_available="weather and AC performance",
+        performance_granularity="inverter",
+    )
+    modeled_params = dict(
+        irradiance_type="standard",
+        temperature_type="air",
+        weather_granularity="system",
+    )
+    si = storage.StorageInterface(user=auth0_id)
+    job, save = mockup_reference_modeled(pvwatts_system, ref_params, modeled_params)
+    run_chains = mocker.spy(compute, "_run_modelchains")
+    run = mocker.spy(compute, "run_modelchain")
+    compute.compare_reference_and_modeled(job, si)
+    assert run_chains.call_count == 1
+    # the second inverter reuses the modeled run of the first
+    full_runs = [
+        c
+        for c in run.call_args_list
+        if not isinstance(c[0][0], pvmodeling.IrradianceTemperatureModelChain)
+    ]
+    assert len(full_runs) == 1
+    reslist = save.call_args[0][1]
+    performance = {
+        r.schema_path: r.data for r in reslist if r.type == "performance data"
+    }
+    assert performance["/inverters/0"] == performance["/inverters/1"]
+    adjusted = [r.data for r in reslist if r.type == "weather adjusted performance"]
+    assert len(adjusted) == 2
+    assert adjusted[0] == adjusted[1]
+
+
 def test_compare_reference_and_modeled_leap_day_dropped(
     auth0_id,
     nocommit_transaction,
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import socket
+import time
+import uuid
+
+
+import pandas as pd
+import pytest
+
+
+from solarperformanceinsight_api import instrumentation
+
+
+@pytest.fixture()
+def job_id():
+    return uuid.uuid1()
+
+
+def test_stage_no_job():
+    assert instrumentation.current_timer() is None
+    with instrumentation.stage("test no job") as measurement:
+        measurement.rows += 10
+    assert (
+        instrumentation.registry.get_sample_value(
+            "spi_job_stage_rows_total", {"stage": "test no job"}
+        )
+        == 10
+    )
+
+
+def test_time_job(job_id, mocker):
+    log = mocker.spy(instrumentation.logger, "info")
+    with instrumentation.time_job(job_id) as timer:
+        assert instrumentation.current_timer() is timer
+        for _ in range(2):
+            with instrumentation.stage("fetch") as measurement:
+                measurement.rows += 3
+                measurement.bytes_read += 100
+        with instrumentation.stage("save") as measurement:
+            measurement.bytes_written += 50
+    assert instrumentation.current_timer() is None
+    assert log.call_count == 1
+    assert timer.stages["fetch"]["calls"] == 2
+    assert timer.stages["fetch"]["rows"] == 6
+    assert timer.stages["fetch"]["bytes_read"] == 200
+    assert timer.stages["save"]["bytes_written"] == 50
+    assert timer.stages["save"]["peak_rss_mib"] > 0
+
+    frame = timer.to_frame()
+    assert list(frame.index) == ["fetch", "save"]
+    assert frame.index.name == "stage"
+    assert list(frame.columns) == list(instrumentation.JobTimer.columns)
+    assert frame.loc["save", "rows"] == 0
+
+
+def test_stage_nested(job_id):
+    with instrumentation.time_job(job_id) as timer:
+        with instrumentation.stage("outer"):
+            with instrumentation.stage("inner"):
+                time.sleep(0.05)
+    assert timer.stages["inner"]["seconds"] >= 0.05
+    assert timer.stages["outer"]["seconds"] < 0.05
+
+
+def test_stage_error(job_id):
+    with pytest.raises(ValueError):
+        with instrumentation.time_job(job_id) as timer:
+            with instrumentation.stage("fail"):
+                raise ValueError("bad")
+    assert timer.stages["fail"]["calls"] == 1
+
+
+def test_stage_in_thread(job_id):
+    def work():
+        with instrumentation.stage("thread") as measurement:
+            measurement.rows += 1
+
+    with instrumentation.time_job(job_id) as timer:
+        with ThreadPoolExecutor(2) as executor:
+            for _ in range(4):
+                executor.submit(contextvars.copy_context().run, work)
+    assert timer.stages["thread"]["rows"] == 4
+
+
+def test_empty_timer_frame(job_id):
+    frame = instrumentation.JobTimer(job_id).to_frame()
+    assert isinstance(frame, pd.DataFrame)
+    assert len(frame) == 0
+
+
+def test_push_metrics(mocker):
+    push = mocker.patch.object(instrumentation, "push_to_gateway")
+    mocker.patch.object(instrumentation.settings, "metrics_pushgateway", None)
+    instrumentation.push_metrics()
+    assert push.call_count == 0
+    mocker.patch.object(
+        instrumentation.settings, "metrics_pushgateway", "localhost:9091"
+    )
+    instrumentation.push_metrics()
+    push.assert_called_once_with(
+        "localhost:9091",
+        job="spi_compute",
+        registry=instrumentation.registry,
+        grouping_key={"instance": socket.gethostname()},
+    )
+
+
+def test_push_metrics_grouping_key(mocker):
+    push = mocker.patch.object(instrumentation, "push_to_gateway")
+    mocker.patch.object(
+        instrumentation.settings, "metrics_pushgateway", "localhost:9091"
+    )
+    mocker.patch.object(instrumentation.socket, "gethostname", return_value="host")
+    instrumentation.push_metrics()
+    # each job runs in a new fork of the worker, which must push to the
+    # same group
+    mocker.patch("os.getpid", return_value=2)
+    instrumentation.push_metrics()
+    mocker.patch.object(instrumentation.settings, "metrics_instance", "worker-1")
+    instrumentation.push_metrics()
+    assert [c[1]["grouping_key"] for c in push.call_args_list] == [
+        {"instance": "host"},
+        {"instance": "host"},
+        {"instance": "worker-1"},
+    ]
+
+
+def test_push_metrics_fail(mocker):
+    mocker.patch.object(
+        instrumentation, "push_to_gateway", side_effect=OSError("no gateway")
+    )
+    mocker.patch.object(
+        instrumentation.settings, "metrics_pushgateway", "localhost:9091"
+    )
+    log = mocker.spy(instrumentation.logger, "exception")
+    instrumentation.push_metrics()
+    assert log.call_count == 1
@@ -661,6 +661,56 @@ def test_jobtimeindex(start, end, tz, exp):
     pd.testing.assert_index_equal(out._time_range, exp)
 
 
+def test_jobtimeindex_lazy(mocker):
+    models._make_time_range.cache_clear()
+    out = models.JobTimeindex(
+        start="2020-01-01T00:00:00",
+        end="2030-01-01T00:00:00",
+        step="60:00",
+        timezone="America/Denver",
+    )
+    assert models._make_time_range.cache_info().currsize == 0
+    assert out._freq == pd.Timedelta("1h")
+    assert models._make_time_range.cache_info().currsize == 0
+    tr = out._time_range
+    other = models.JobTimeindex(**out.dict())
+    assert other._time_range is tr
+    assert list(out._months) == list(range(1, 13))
+
+
+def test_jobtimeindex_cache_bounded():
+    models._make_time_range.cache_clear()
+    for year in range(2000, 2010):
+        models.JobTimeindex(
+            start=f"{year}-01-01T00:00:00",
+            end=f"{year + 1}-01-01T00:00:00",
+            step="60:00",
+            timezone="America/Denver",
+        )._time_range
+    assert models._make_time_range.cache_info().currsize == 4
+
+
+def test_jobtimeindex_cache_timezones():
+    # same times, but different timezones to infer
+    utc = models.JobTimeindex(
+        start="2020-01-01T07:00:00+00:00",
+        end="2020-01-02T07:00:00+00:00",
+        step="60:00",
+        timezone=None,
+    )
+    mst = models.JobTimeindex(
+        start="2020-01-01T00:00:00-07:00",
+        end="2020-01-02T00:00:00-07:00",
+        step="60:00",
+        timezone=None,
+    )
+    assert utc.timezone == "UTC"
+    assert str(utc._time_range.tz) == "UTC"
+    assert mst.timezone == "UTC-07:00"
+    assert str(mst._time_range.tz) == "UTC-07:00"
+    assert (utc._time_range == mst._time_range).all()
+
+
 @pytest.mark.parametrize(
     "start,end,step,tz",
     [
@@ -854,6 +904,16 @@ def test_array_gamma(system_def):
     arrd = deepcopy(system_def.inverters[0].arrays[0].dict())
     mod = models.PVArray(**arrd)
     assert_allclose(mod.module_parameters._gamma, -5.359e-3, atol=1e-7)
+    assert "_gamma" not in mod.module_parameters.dict()
+    # kept by each model, including copies
+    other = deepcopy(arrd)
+    other["module_parameters"]["gamma_ref"] = 1.1
+    other_mod = models.PVArray(**other)
+    assert other_mod.module_parameters._gamma != mod.module_parameters._gamma
+    assert_allclose(mod.module_parameters._gamma, -5.359e-3, atol=1e-7)
+    copied = mod.copy(deep=True)
+    assert copied == mod
+    assert copied.module_parameters._gamma == mod.module_parameters._gamma
 
     arrd["module_parameters"] = cec
     mod = models.PVArray(**arrd)
@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from inspect import signature
+import pickle
 
 
+import pandas as pd
 from pvlib.location import Location
 from pvlib.modelchain import ModelChain
 from pvlib.pvsystem import PVSystem
@@ -63,3 +67,131 @@ def test_construct_modelchains_single(system_def, single_axis_tracking):
     out = pvmodeling.construct_modelchains(system_def)
     assert len(out) == 1
     assert isinstance(out[0].system, SingleAxisTracker)
+
+
+def test_construct_modelchains_shared_location(system_def):
+    system_def.inverters = system_def.inverters * 2
+    out = pvmodeling.construct_modelchains(system_def)
+    assert isinstance(out[0].location, pvmodeling.CachedLocation)
+    assert out[0].location is out[1].location
+
+
+def test_cached_location(system_def, mocker):
+    spy = mocker.spy(pvmodeling.Location, "get_solarposition")
+    loc = pvmodeling.construct_location(system_def)
+    times = pd.date_range("2020-01-01T00:00", freq="5min", periods=288, tz="MST")
+    first = loc.get_solarposition(times, method="nrel_numpy")
+    assert loc.get_solarposition(times, method="nrel_numpy") is first
+    assert deepcopy(loc).get_solarposition(times, method="nrel_numpy") is first
+    assert spy.call_count == 1
+
+    temp_air = pd.Series(25.0, index=times)
+    other = loc.get_solarposition(times, temperature=temp_air, method="nrel_numpy")
+    assert spy.call_count == 2
+    assert (
+        loc.get_solarposition(times, temperature=temp_air.copy(), method="nrel_numpy")
+        is other
+    )
+    loc.get_solarposition(times[1:], method="nrel_numpy")
+    loc.get_solarposition(times, method="ephemeris")
+    assert spy.call_count == 4
+    pd.testing.assert_frame_equal(
+        first,
+        Location(
+            latitude=system_def.latitude,
+            longitude=system_def.longitude,
+            altitude=system_def.elevation,
+        ).get_solarposition(times, method="nrel_numpy"),
+    )
+
+
+def test_cached_location_bounded(system_def, mocker):
+    spy = mocker.spy(pvmodeling.Location, "get_solarposition")
+    loc = pvmodeling.construct_location(system_def)
+    times = pd.date_range("2020-01-01T00:00", freq="1h", periods=72, tz="MST")
+    windows = [times[:24], times[24:48], times[48:]]
+    first = loc.get_solarposition(windows[0])
+    loc.get_solarposition(windows[1])
+    # most recently used is kept
+    assert loc.get_solarposition(windows[0]) is first
+    loc.get_solarposition(windows[2])
+    assert len(loc._solar_position_cache) == 2
+    assert spy.call_count == 3
+    assert loc.get_solarposition(windows[0]) is first
+    loc.get_solarposition(windows[1])
+    assert spy.call_count == 4
+
+
+def test_cached_location_threads(system_def, mocker):
+    spy = mocker.spy(pvmodeling.Location, "get_solarposition")
+    loc = pvmodeling.construct_location(system_def)
+    times = pd.date_range("2020-01-01T00:00", freq="1h", periods=48, tz="MST")
+    windows = [times[:24], times[24:]] * 20
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        out = list(executor.map(loc.get_solarposition, windows))
+    assert len(loc._solar_position_cache) == 2
+    for i, window in enumerate(windows):
+        pd.testing.assert_index_equal(out[i].index, window)
+    # each window is calculated once while the other threads wait for it
+    assert spy.call_count == 2
+
+
+def test_cached_location_pickle(system_def):
+    loc = pvmodeling.construct_location(system_def)
+    times = pd.date_range("2020-01-01T00:00", freq="1h", periods=24, tz="MST")
+    first = loc.get_solarposition(times)
+    out = pickle.loads(pickle.dumps(loc))
+    assert len(out._solar_position_cache) == 0
+    assert out.latitude == loc.latitude
+    pd.testing.assert_frame_equal(out.get_solarposition(times), first)
+    assert len(loc._solar_position_cache) == 1
+
+
+def test_irradiance_temperature_modelchain(system_def):
+    full = pvmodeling.construct_modelchains(system_def)[0]
+    partial = pvmodeling.construct_modelchains(
+        system_def,
+        modelchain_class=pvmodeling.IrradianceTemperatureModelChain,
+        location=full.location,
+    )[0]
+    assert isinstance(partial, pvmodeling.IrradianceTemperatureModelChain)
+    assert partial.location is full.location
+    times = pd.date_range("2020-06-01T00:00", freq="1h", periods=24, tz="MST")
+    weather = pd.DataFrame(
+        {"ghi": 800.0, "dni": 700.0, "dhi": 100.0, "temp_air": 30.0}, index=times
+    )
+    full.run_model(weather)
+    partial.run_model(weather)
+    assert partial.results.ac is None
+    assert partial.results.dc is None
+    assert full.results.ac is not None
+    pd.testing.assert_series_equal(
+        partial.results.effective_irradiance, full.results.effective_irradiance
+    )
+    pd.testing.assert_series_equal(
+        partial.results.cell_temperature, full.results.cell_temperature
+    )
+    pd.testing.assert_frame_equal(partial.results.total_irrad, full.results.total_irrad)
+
+
+def test_run_modelchain(system_def):
+    chain = pvmodeling.construct_modelchains(system_def)[0]
+    times = pd.date_range("2020-06-01T00:00", freq="1h", periods=24, tz="MST")
+    weather = pd.DataFrame(
+        {"ghi": 800.0, "dni": 700.0, "dhi": 100.0, "temp_air": 30.0}, index=times
+    )
+    first = pvmodeling.run_modelchain(chain, "run_model", weather)
+    assert chain.results.ac is None
+    assert chain.results.solar_position is None
+    second = pvmodeling.run_modelchain(chain, "run_model", weather * 0.5)
+    assert first is not second
+    assert (first.ac > second.ac).any()
+    assert (first.ac >= second.ac).all()
+
+    poa = pd.DataFrame(
+        {"poa_global": 800.0, "poa_direct": 700.0, "poa_diffuse": 100.0},
+        index=times[:12],
+    )
+    third = pvmodeling.run_modelchain(chain, "run_model_from_poa", poa)
+    assert len(third.ac) == 12
+    assert len(first.ac) == 24
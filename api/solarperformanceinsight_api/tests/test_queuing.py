@@ -1,10 +1,15 @@
+import asyncio
+import datetime as dt
+
+
 import pytest
+from redis.exceptions import RedisError
 from rq import Queue, get_current_job, SimpleWorker
 from rq.exceptions import NoSuchJobError
 from rq.job import Job
 
 
-from solarperformanceinsight_api import queuing
+from solarperformanceinsight_api import queuing, models
 
 
 pytestmark = pytest.mark.usefixtures("mock_redis")
@@ -56,6 +61,44 @@ def test_qmanager_delete_job(qm):
         Job.fetch("jobid", connection=qm.redis_conn)
 
 
+def test_qmanager_enqueue_jobs(mocker):
+    qm = queuing.QueueManager()
+    qm.job_func = run
+    qm.enqueue_job("0", "user")
+    fetch = mocker.spy(Job, "fetch")
+    assert qm.enqueue_jobs({str(i): f"user{i}" for i in range(5)}) == 4
+    fetch.assert_not_called()
+    assert qm.q.job_ids == [str(i) for i in range(5)]
+    assert Job.fetch("0", connection=qm.redis_conn).args == ("0", "user")
+    assert Job.fetch("3", connection=qm.redis_conn).args == ("3", "user3")
+    assert qm.enqueue_jobs({}) == 0
+
+
+def test_qmanager_delete_jobs(mocker):
+    qm = queuing.QueueManager()
+    qm.q.enqueue(fail, ValueError, "0 isnt 1", job_id="0")
+    w = SimpleWorker([qm.q], connection=qm.redis_conn)
+    w.work(burst=True)
+    assert qm.q.failed_job_registry.get_job_ids() == ["0"]
+    qm.job_func = run
+    for i in range(1, 5):
+        qm.enqueue_job(str(i), "user")
+    qm.q.started_job_registry.add(Job.fetch("1", connection=qm.redis_conn), -1)
+    stop = mocker.patch.object(queuing, "send_stop_job_command")
+    fetch = mocker.spy(Job, "fetch")
+
+    qm.delete_jobs(["0", "1", "2", "5"])
+    fetch.assert_not_called()
+    stop.assert_called_once_with(qm.redis_conn, "1")
+    assert qm.q.job_ids == ["3", "4"]
+    assert qm.q.failed_job_registry.get_job_ids() == []
+    assert qm.q.started_job_registry.get_job_ids() == []
+    for id_ in ("0", "1", "2"):
+        with pytest.raises(NoSuchJobError):
+            Job.fetch(id_, connection=qm.redis_conn)
+    Job.fetch("3", connection=qm.redis_conn)
+
+
 def test_qmanager_remove_invalid_jobs():
     qm = queuing.QueueManager()
     qm.job_func = run
@@ -84,6 +127,23 @@ def test_qmanager_add_missing_jobs():
     assert set(qm.q.job_ids) == {str(i) for i in range(5)}
 
 
+def test_qmanager_sync_job_changes():
+    qm = queuing.QueueManager()
+    qm.job_func = run
+    for i in range(4):
+        qm.enqueue_job(str(i), "user")
+    changed_jobs = {
+        "0": ("user", "complete"),
+        "1": ("user", "queued"),
+        "4": ("user", "queued"),
+        "5": ("user", "error"),
+    }
+    qm.sync_job_changes(changed_jobs)
+    assert qm.q.job_ids == ["1", "2", "3", "4"]
+    with pytest.raises(NoSuchJobError):
+        Job.fetch("0", connection=qm.redis_conn)
+
+
 def fail(err, msg):
     raise err(msg)
 
@@ -145,7 +205,166 @@ def test_sync_jobs(mocker):
         "solarperformanceinsight_api.queuing._get_job_management_interface",
         return_value=jmi,
     )
+    pubsub = qm.redis_conn.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe("spi:job_status:0")
     queuing.sync_jobs()
     # 0 failed, 2 is missing
     assert set(qm.q.job_ids) == {"1", "3"}
     assert startt.report_job_failure.call_count == 1
+    message = next(pubsub.listen())
+    assert models.JobStatus.parse_raw(message["data"]).status == "error"
+
+
+def test_sync_jobs_incremental(mocker):
+    qm = queuing.QueueManager()
+    qm.q.enqueue(fail, ValueError, "1 isnt 0", job_id="1")
+    w = SimpleWorker([qm.q], connection=qm.redis_conn)
+
+    def sleep(period):
+        if sleep.called:
+            raise KeyboardInterrupt
+        sleep.called = True
+        # job 1 fails after the first, full, cycle
+        w.work(burst=True)
+
+    sleep.called = False
+    mocker.patch("solarperformanceinsight_api.queuing.time.sleep", new=sleep)
+    mocker.patch.object(queuing.settings, "sync_jobs_full_period", 3600)
+
+    jmi = mocker.MagicMock()
+    startt = jmi.start_transaction.return_value.__enter__.return_value
+    startt.list_queued_jobs.return_value = {"1": "user"}
+    startt.list_status_of_jobs.return_value = {"1": "queued", "4": "complete"}
+    startt.list_job_changes.return_value = {
+        "4": ("user", "complete"),
+        "5": ("user", "queued"),
+    }
+    startt.get_status_of_jobs.return_value = {"1": "queued"}
+    mocker.patch(
+        "solarperformanceinsight_api.queuing._get_job_management_interface",
+        return_value=jmi,
+    )
+    pubsub = qm.redis_conn.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe("spi:job_status:1")
+    queuing.sync_jobs()
+    # only the first cycle lists every job
+    assert startt.list_status_of_jobs.call_count == 2
+    assert startt.list_job_changes.call_count == 1
+    assert startt.list_job_changes.call_args[0][0].tzinfo is not None
+    startt.get_status_of_jobs.assert_called_once_with(["1"])
+    startt.report_job_failure.assert_called_once()
+    assert startt.report_job_failure.call_args[0][0] == "1"
+    assert qm.q.job_ids == ["5"]
+    message = next(pubsub.listen())
+    assert models.JobStatus.parse_raw(message["data"]).status == "error"
+
+
+@pytest.fixture()
+def job_status():
+    return models.JobStatus(
+        status="running",
+        last_change=dt.datetime(2021, 4, 8, 12, tzinfo=dt.timezone.utc),
+    )
+
+
+def test_publish_job_status(qm, job_status):
+    pubsub = qm.redis_conn.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe("spi:job_status:jobid")
+    qm.publish_job_status("jobid", job_status)
+    message = next(pubsub.listen())
+    assert models.JobStatus.parse_raw(message["data"]) == job_status
+
+
+def test_publish_job_status_fail(mocker, job_status):
+    conn = mocker.MagicMock()
+    conn.publish.side_effect = RedisError
+    log = mocker.patch.object(queuing.logger, "warning")
+    queuing.publish_job_status(conn, "jobid", job_status)
+    log.assert_called()
+
+
+@pytest.fixture()
+def listener():
+    out = queuing.JobStatusListener()
+    yield out
+    out.stop()
+
+
+async def _publish_until_received(queue, job_id, status):
+    # the listener thread may not have subscribed yet
+    for _ in range(50):
+        queuing.publish_job_status(queuing._get_redis_conn(), job_id, status)
+        try:
+            return await asyncio.wait_for(queue.get(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+    raise AssertionError("Status never received")
+
+
+@pytest.mark.asyncio
+async def test_job_status_listener(listener, job_status):
+    queue = listener.subscribe("jobid")
+    other = listener.subscribe("other")
+    msg = await _publish_until_received(queue, "jobid", job_status)
+    assert models.JobStatus.parse_raw(msg) == job_status
+    assert other.empty()
+
+    listener.unsubscribe("jobid", queue)
+    assert "jobid" not in listener._queues
+    msg = await _publish_until_received(other, "other", job_status)
+    assert models.JobStatus.parse_raw(msg) == job_status
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_job_status_listener_restart(listener, job_status):
+    queue = listener.subscribe("jobid")
+    await _publish_until_received(queue, "jobid", job_status)
+    listener.stop()
+    assert listener._thread is None
+    queue = listener.subscribe("jobid")
+    assert listener._thread.is_alive()
+    msg = await _publish_until_received(queue, "jobid", job_status)
+    assert models.JobStatus.parse_raw(msg) == job_status
+
+
+def test_job_status_listener_drop_dead_subscriber(mocker, listener):
+    log = mocker.patch.object(queuing.logger, "exception")
+    dead_loop = mocker.MagicMock()
+    dead_loop.call_soon_threadsafe.side_effect = RuntimeError("Event loop is closed")
+    live_loop = mocker.MagicMock()
+    dead = (dead_loop, mocker.MagicMock())
+    live = (live_loop, mocker.MagicMock())
+    listener._queues["jobid"].update({dead, live})
+    listener._queues["other"].add(dead)
+    message = {"channel": b"spi:job_status:jobid", "data": b"status"}
+    listener._dispatch(message)
+    log.assert_called_once()
+    assert listener._queues["jobid"] == {live}
+    live_loop.call_soon_threadsafe.assert_called_once_with(
+        live[1].put_nowait, b"status"
+    )
+    listener._dispatch({"channel": b"spi:job_status:other", "data": b"status"})
+    assert "other" not in listener._queues
+    assert live_loop.call_soon_threadsafe.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_job_status_listener_thread_failure(mocker, listener, job_status):
+    log = mocker.patch.object(queuing.logger, "exception")
+    conn = queuing._get_redis_conn()
+    mocker.patch.object(queuing, "_get_redis_conn", side_effect=ValueError("bad"))
+    queue = listener.subscribe("jobid")
+    thread = listener._thread
+    thread.join(5)
+    assert not thread.is_alive()
+    log.assert_called_once()
+    assert listener._thread is None
+
+    # the next subscription starts a new thread
+    mocker.patch.object(queuing, "_get_redis_conn", return_value=conn)
+    listener.unsubscribe("jobid", queue)
+    queue = listener.subscribe("jobid")
+    assert listener._thread.is_alive()
+    msg = await _publish_until_received(queue, "jobid", job_status)
+    assert models.JobStatus.parse_raw(msg) == job_status
@@ -1,4 +1,5 @@
 import datetime as dt
+import json
 import uuid
 
 
@@ -324,6 +325,102 @@ def test_get_job(storage_interface, add_example_db_data, stored_job, job_id):
     assert out == stored_job
 
 
+def test_list_job_summaries(
+    storage_interface, add_example_db_data, stored_job, complete_job_id
+):
+    with storage_interface.start_transaction() as st:
+        out = st.list_job_summaries(100)
+        page = st.list_job_summaries(2, 1)
+    assert len(out) == 5
+    assert out[0].object_id == stored_job.object_id
+    assert out[0].created_at == stored_job.created_at
+    assert out[0].status == stored_job.status
+    assert out[0].definition.system_name == stored_job.definition.system_definition.name
+    assert out[0].definition.compare == stored_job.definition.parameters.compare
+    assert out[0].definition.calculate is None
+    assert out[0].definition.number_of_data_objects == len(stored_job.data_objects)
+    assert out[0].definition.number_of_data_objects_present == len(
+        [do for do in stored_job.data_objects if do.definition.present]
+    )
+    assert str(out[1].object_id) == complete_job_id
+    assert out[1].status.status == "complete"
+    assert page == out[1:3]
+
+
+def test_get_job_cached(storage_interface, add_example_db_data, stored_job, job_id):
+    with storage_interface.start_transaction() as st:
+        first = st.get_job(job_id)
+        second = st.get_job(job_id)
+    assert second == stored_job
+    assert second.definition == first.definition
+    # each request gets its own copy
+    assert second.definition is not first.definition
+
+
+@pytest.fixture()
+def job_cache(mocker):
+    cache = storage.OrderedDict()
+    mocker.patch.object(storage, "_job_cache", cache)
+    mocker.patch.object(storage.settings, "job_cache_size", 2)
+    return cache
+
+
+def test_get_job_definition(job_cache, job_def):
+    definition = json.loads(job_def.json())
+    now = dt.datetime(2021, 4, 1, tzinfo=dt.timezone.utc)
+    first = storage._get_job_definition("a", "user", now, definition)
+    assert first == job_def
+    second = storage._get_job_definition("a", "user", now, definition)
+    assert second == first
+    # returned jobs are copies, so changing one doesn't change the cache
+    assert second is not first
+    second.system_definition.name = "changed"
+    assert storage._get_job_definition("a", "user", now, definition) == first
+    assert (
+        storage._get_job_definition(
+            "a", "user", now, definition
+        ).parameters.time_parameters._time_range
+        == first.parameters.time_parameters._time_range
+    ).all()
+    # reparsed once the job is modified
+    later = storage._get_job_definition("a", "user", now + dt.timedelta(1), definition)
+    assert later == job_def
+    assert list(job_cache) == [("a", "user")]
+    assert job_cache[("a", "user")][0] == now + dt.timedelta(1)
+
+
+def test_get_job_definition_user(job_cache, job_def, mocker):
+    parse = mocker.spy(storage.models, "Job")
+    definition = json.loads(job_def.json())
+    now = dt.datetime(2021, 4, 1, tzinfo=dt.timezone.utc)
+    storage._get_job_definition("a", "user", now, definition)
+    storage._get_job_definition("a", "other", now, definition)
+    storage._get_job_definition("a", "user", now, definition)
+    # cached for each user
+    assert parse.call_count == 2
+    assert list(job_cache) == [("a", "other"), ("a", "user")]
+
+
+def test_get_job_definition_evict(job_cache, job_def, mocker):
+    definition = json.loads(job_def.json())
+    now = dt.datetime(2021, 4, 1, tzinfo=dt.timezone.utc)
+    storage._get_job_definition("a", "user", now, definition)
+    storage._get_job_definition("b", "user", now, definition)
+    # a is now the most recently used, so b is evicted
+    storage._get_job_definition("a", "user", now, definition)
+    storage._get_job_definition("c", "user", now, definition)
+    assert list(job_cache) == [("a", "user"), ("c", "user")]
+
+
+def test_get_job_definition_disabled(job_cache, job_def, mocker):
+    mocker.patch.object(storage.settings, "job_cache_size", 0)
+    definition = json.loads(job_def.json())
+    now = dt.datetime(2021, 4, 1, tzinfo=dt.timezone.utc)
+    first = storage._get_job_definition("a", "user", now, definition)
+    assert storage._get_job_definition("a", "user", now, definition) is not first
+    assert len(job_cache) == 0
+
+
 def test_get_job_dne(storage_interface, add_example_db_data):
     with pytest.raises(HTTPException) as err:
         with storage_interface.start_transaction() as st:
@@ -416,6 +513,41 @@ def test_get_job_data_dne(storage_interface, add_example_db_data, job_id):
     assert err.value.status_code == 404
 
 
+def test_get_job_data_bulk(
+    storage_interface,
+    add_example_db_data,
+    job_data_ids,
+    job_data_meta,
+    job_id,
+    arrow_job_data,
+):
+    with storage_interface.start_transaction() as st:
+        data = st.get_job_data_bulk(job_id, list(job_data_ids))
+        single = st.get_job_data(job_id, job_data_ids[0])
+    assert set(data.keys()) == set(job_data_ids)
+    job_data_meta.definition.data_columns = []
+    assert data[job_data_ids[1]] == (job_data_meta, arrow_job_data)
+    assert data[job_data_ids[0]] == single
+
+
+def test_get_job_data_bulk_dne(
+    storage_interface, add_example_db_data, job_data_ids, job_id
+):
+    with pytest.raises(HTTPException) as err:
+        with storage_interface.start_transaction() as st:
+            st.get_job_data_bulk(job_id, [job_data_ids[0], job_id])
+    assert err.value.status_code == 404
+
+
+def test_get_job_data_sizes(
+    storage_interface, add_example_db_data, job_data_ids, job_id, arrow_job_data
+):
+    with storage_interface.start_transaction() as st:
+        sizes = st.get_job_data_sizes(job_id)
+    assert set(sizes.keys()) == {uuid.UUID(i) for i in job_data_ids}
+    assert sizes[uuid.UUID(job_data_ids[1])] == len(arrow_job_data)
+
+
 def test_add_job_data(storage_interface, add_example_db_data, job_data_ids, job_id):
     now = dt.datetime.utcnow().replace(tzinfo=dt.timezone.utc, microsecond=0)
     with storage_interface.start_transaction() as st:
@@ -607,6 +739,51 @@ def test_add_job_bad_data(storage_interface, add_example_db_data, job_id):
             st.add_job_result(job_id, "/", "performance data" * 100, "text/csv", "")
 
 
+def test_add_job_results(storage_interface, add_example_db_data, job_id):
+    with storage_interface.start_transaction() as st:
+        newids = st.add_job_results(
+            job_id,
+            [
+                ("/", "performance data", "text/csv", b"a"),
+                ("/inverters/0", "performance data", "text/csv", b"b"),
+            ],
+        )
+        st.set_job_complete(job_id)
+
+        job_results = st.list_job_results(job_id)
+        _, data = st.get_job_result(job_id, newids[1].object_id)
+
+    assert len(newids) == 2
+    assert {n.object_id for n in newids} == {r.object_id for r in job_results}
+    assert data == b"b"
+
+
+def test_add_job_results_already_complete(
+    storage_interface, add_example_db_data, complete_job_id
+):
+    with pytest.raises(storage.JobAlreadyComplete):
+        with storage_interface.start_transaction() as st:
+            st.add_job_results(
+                complete_job_id, [("/", "performance data", "text/csv", b"")]
+            )
+
+
+def test_add_job_results_dne(storage_interface, add_example_db_data):
+    with pytest.raises(storage.JobResultFailure):
+        with storage_interface.start_transaction() as st:
+            st.add_job_results(
+                uuid.uuid1(), [("/", "performance data", "text/csv", b"")]
+            )
+
+
+def test_add_job_results_bad_data(storage_interface, add_example_db_data, job_id):
+    with pytest.raises(storage.JobResultFailure):
+        with storage_interface.start_transaction() as st:
+            st.add_job_results(
+                job_id, [("/", "performance data" * 100, "text/csv", b"")]
+            )
+
+
 def test_set_job_complete(storage_interface, add_example_db_data, job_id):
     with storage_interface.start_transaction() as st:
         before = st.get_job_status(job_id)
@@ -698,6 +875,33 @@ def test_list_queued_jobs_none(
     assert job_managment_interface.list_queued_jobs() == {}
 
 
+def test_list_job_changes(
+    job_managment_interface, add_example_db_data, job_id, auth0_id, set_job_queued
+):
+    now = dt.datetime.now(dt.timezone.utc)
+    assert job_managment_interface.list_job_changes(now + dt.timedelta(hours=1)) == {}
+    assert job_managment_interface.list_job_changes(now - dt.timedelta(minutes=1)) == {
+        job_id: (auth0_id, "queued")
+    }
+
+
+def test_list_job_changes_all(job_managment_interface, add_example_db_data):
+    out = job_managment_interface.list_job_changes(
+        dt.datetime(1970, 1, 2, tzinfo=dt.timezone.utc)
+    )
+    assert len(out) == 6
+
+
+def test_get_status_of_jobs(
+    job_managment_interface, add_example_db_data, job_id, complete_job_id
+):
+    out = job_managment_interface.get_status_of_jobs(
+        [job_id, complete_job_id, str(uuid.uuid1())]
+    )
+    assert out == {job_id: "created", complete_job_id: "complete"}
+    assert job_managment_interface.get_status_of_jobs([]) == {}
+
+
 def test_report_job_failure(
     job_managment_interface, add_example_db_data, job_id, root_conn
 ):
@@ -118,6 +118,136 @@ def test_read_arrow(tbl, exp):
     pd.testing.assert_frame_equal(out, exp)
 
 
+@pytest.mark.parametrize(
+    "df,index",
+    (
+        (
+            pd.DataFrame(
+                {
+                    "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=4),
+                    "a": np.array([1, 2, 3, 4], dtype="float32"),
+                    "b": np.array([1, np.nan, 3, 4], dtype="float32"),
+                }
+            ),
+            "time",
+        ),
+        (
+            pd.DataFrame(
+                {
+                    "month": ["January", "February"],
+                    "performance": np.array([1, 2], dtype="float32"),
+                }
+            ),
+            "month",
+        ),
+        (pd.DataFrame({"a": np.array([1, 2], dtype="float32")}), None),
+    ),
+)
+def test_read_arrow_bytes(df, index):
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    out = utils.read_arrow_bytes(data)
+    expected = utils.read_arrow(BytesIO(data))
+    if index is not None:
+        expected = expected.set_index(index)
+    pd.testing.assert_frame_equal(out, expected)
+    assert (out.dtypes[out.dtypes != object] == "float32").all()
+
+
+def test_read_arrow_bytes_no_copy():
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=4),
+            "a": np.array([1, 2, 3, 4], dtype="float32"),
+        }
+    )
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    out = utils.read_arrow_bytes(data)
+    # data still in the buffer
+    assert not out["a"].values.flags.writeable
+    assert isinstance(out.index, pd.DatetimeIndex)
+    assert out.index.name == "time"
+
+
+def test_read_arrow_bytes_no_index():
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=4),
+            "a": np.array([1, 2, 3, 4], dtype="float32"),
+        }
+    )
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    out = utils.read_arrow_bytes(data, index_columns=())
+    pd.testing.assert_frame_equal(out, utils.read_arrow(BytesIO(data)))
+
+
+@pytest.mark.parametrize(
+    "start,end,exp",
+    (
+        ("2020-01-01T00:00Z", "2020-01-01T00:09Z", slice(0, 10)),
+        ("2020-01-01T00:02Z", "2020-01-01T00:06Z", slice(2, 7)),
+        ("2020-01-01T00:03Z", "2020-01-01T00:03Z", slice(3, 4)),
+        ("2020-01-01T00:04Z", "2020-01-01T00:07Z", slice(4, 8)),
+        ("2020-01-01T00:07Z", "2020-01-01T00:12Z", slice(7, 10)),
+        ("2020-01-01T00:02:30Z", "2020-01-01T00:03:30Z", slice(3, 4)),
+        ("2020-01-01T00:10Z", "2020-01-01T00:12Z", slice(0, 0)),
+    ),
+)
+def test_arrow_time_file(tmp_path, start, end, exp):
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=10),
+            "a": np.arange(10, dtype="float32"),
+        }
+    )
+    # multiple record batches
+    data = utils.dump_arrow_frame(df, chunk_rows=4)
+    atf = utils.ArrowTimeFile(data, str(tmp_path / "data"))
+    assert (tmp_path / "data").read_bytes() == data
+    out = atf.read_between(pd.Timestamp(start), pd.Timestamp(end))
+    pd.testing.assert_frame_equal(
+        out, utils.read_arrow_bytes(data).iloc[exp], check_freq=False
+    )
+
+
+def test_arrow_time_file_skips_batches(tmp_path, mocker):
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=12),
+            "a": np.arange(12, dtype="float32"),
+        }
+    )
+    mocker.patch.object(utils.settings, "arrow_compression", "zstd")
+    atf = utils.ArrowTimeFile(
+        utils.dump_arrow_frame(df, chunk_rows=4), str(tmp_path / "data")
+    )
+    times = mocker.spy(utils, "_arrow_times")
+    out = atf.read_between(
+        pd.Timestamp("2020-01-01T00:04Z"), pd.Timestamp("2020-01-01T00:07Z")
+    )
+    assert list(out["a"]) == [4, 5, 6, 7]
+    # the batch is entirely in the times, so the times are not compared
+    assert times.call_count == 0
+    out = atf.read_between(
+        pd.Timestamp("2020-01-01T00:05Z"), pd.Timestamp("2020-01-01T00:20Z")
+    )
+    assert list(out["a"]) == [5, 6, 7, 8, 9, 10, 11]
+    # only the first batch read is filtered
+    assert times.call_count == 1
+
+
+def test_arrow_time_file_invalid(tmp_path):
+    with pytest.raises(HTTPException) as err:
+        utils.ArrowTimeFile(b"notanarrowfile", str(tmp_path / "data"))
+    assert err.value.status_code == 400
+    assert not (tmp_path / "data").exists()
+
+
+def test_read_arrow_bytes_invalid():
+    with pytest.raises(HTTPException) as err:
+        utils.read_arrow_bytes(b"notanarrowfile")
+    assert err.value.status_code == 400
+
+
 @pytest.mark.parametrize(
     "inp,exp",
     (
@@ -761,6 +891,145 @@ def test_dump_arrow_bytes(df):
     pd.testing.assert_frame_equal(df, new)
 
 
+def test_concat_arrow_bytes():
+    df = pd.DataFrame(
+        {"a": np.arange(5.0)},
+        index=pd.date_range("2020-01-01T00:00Z", freq="1h", periods=5, name="time"),
+    ).reset_index()
+    parts = [
+        utils.dump_arrow_bytes(utils.convert_to_arrow(df.iloc[:2])),
+        utils.dump_arrow_bytes(utils.convert_to_arrow(df.iloc[2:])),
+    ]
+    out = feather.read_feather(BytesIO(utils.concat_arrow_bytes(parts)))
+    pd.testing.assert_frame_equal(out, df.astype({"a": "float32"}))
+
+
+def test_concat_arrow_files(tmp_path):
+    df = pd.DataFrame(
+        {"a": np.arange(5.0)},
+        index=pd.date_range("2020-01-01T00:00Z", freq="1h", periods=5, name="time"),
+    ).reset_index()
+    paths = [str(tmp_path / "0"), str(tmp_path / "1")]
+    for path, part in zip(paths, [df.iloc[:2], df.iloc[2:]]):
+        with open(path, "wb") as f:
+            f.write(utils.dump_arrow_bytes(utils.convert_to_arrow(part)))
+    out = utils.concat_arrow_files(paths)
+    assert out == utils.concat_arrow_bytes([open(path, "rb").read() for path in paths])
+    pd.testing.assert_frame_equal(
+        feather.read_feather(BytesIO(out)), df.astype({"a": "float32"})
+    )
+
+
+@pytest.fixture()
+def compressible_df():
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01T00:00Z", freq="1min", periods=1440),
+            "a": np.repeat(np.arange(24, dtype="float32"), 60),
+        }
+    )
+
+
+@pytest.mark.parametrize("codec", ["lz4", "zstd"])
+def test_dump_arrow_bytes_compressed(mocker, compressible_df, codec):
+    tbl = utils.convert_to_arrow(compressible_df)
+    uncompressed = utils.dump_arrow_bytes(tbl)
+    mocker.patch.object(utils.settings, "arrow_compression", codec)
+    out = utils.dump_arrow_bytes(tbl)
+    assert len(out) < len(uncompressed) / 2
+    assert utils.arrow_compression(out) == codec
+    assert utils.arrow_compression(uncompressed) is None
+    expected = utils.read_arrow(BytesIO(uncompressed))
+    pd.testing.assert_frame_equal(utils.read_arrow(BytesIO(out)), expected)
+    pd.testing.assert_frame_equal(
+        utils.read_arrow_bytes(out), expected.set_index("time")
+    )
+    pd.testing.assert_frame_equal(feather.read_feather(BytesIO(out)), expected)
+    # not compressed when asked
+    assert utils.arrow_compression(utils.dump_arrow_bytes(tbl, compress=False)) is None
+
+
+def test_decompress_arrow_bytes(mocker, compressible_df):
+    tbl = utils.convert_to_arrow(compressible_df)
+    uncompressed = utils.dump_arrow_bytes(tbl)
+    assert utils.decompress_arrow_bytes(uncompressed) is uncompressed
+    assert utils.decompress_arrow_bytes(b"notarrow") == b"notarrow"
+    mocker.patch.object(utils.settings, "arrow_compression", "zstd")
+    compressed = utils.dump_arrow_bytes(tbl)
+    out = utils.decompress_arrow_bytes(compressed)
+    assert utils.arrow_compression(out) is None
+    assert len(out) > len(compressed)
+    pd.testing.assert_frame_equal(
+        utils.read_arrow(BytesIO(out)), utils.read_arrow(BytesIO(uncompressed))
+    )
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1440, 5000])
+def test_iter_arrow_csv(compressible_df, chunk_rows):
+    df = compressible_df.copy()
+    df.loc[3, "a"] = np.nan
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    chunks = list(utils.iter_arrow_csv(data, chunk_rows=chunk_rows))
+    assert len(chunks) == -(-len(df) // chunk_rows)
+    assert chunks[0].startswith("time,a\n")
+    assert all(not c.startswith("time") for c in chunks[1:])
+    assert "".join(chunks) == (
+        utils.read_arrow(BytesIO(data)).to_csv(None, index=False)
+    )
+
+
+def test_iter_arrow_csv_empty(compressible_df):
+    data = utils.dump_arrow_bytes(utils.convert_to_arrow(compressible_df.iloc[:0]))
+    assert list(utils.iter_arrow_csv(data)) == ["time,a\n"]
+
+
+def test_iter_arrow_csv_invalid():
+    with pytest.raises(HTTPException) as err:
+        utils.iter_arrow_csv(b"notanarrowfile")
+    assert err.value.status_code == 400
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 100, 2000])
+def test_dump_arrow_frame(mocker, compressible_df, chunk_rows):
+    df = compressible_df.copy()
+    df["b"] = np.arange(len(df))
+    df.loc[3, "a"] = np.nan
+    mocker.patch.object(utils.settings, "arrow_compression", "zstd")
+    out = utils.dump_arrow_frame(df, chunk_rows=chunk_rows)
+    reader = pa.ipc.open_file(pa.py_buffer(out))
+    assert reader.num_record_batches == -(-len(df) // chunk_rows)
+    assert utils.arrow_compression(out) == "zstd"
+    expected = utils.dump_arrow_bytes(utils.convert_to_arrow(df))
+    assert reader.schema.equals(
+        pa.ipc.open_file(pa.py_buffer(expected)).schema, check_metadata=False
+    )
+    pd.testing.assert_frame_equal(
+        utils.read_arrow(BytesIO(out)), utils.read_arrow(BytesIO(expected))
+    )
+
+
+def test_dump_arrow_frame_empty(compressible_df):
+    out = utils.dump_arrow_frame(compressible_df.iloc[:0])
+    assert len(utils.read_arrow(BytesIO(out))) == 0
+
+
+def test_dump_arrow_frame_invalid():
+    df = pd.DataFrame({"a": [1.0, 2.0], "b": [1.0, "x"]})
+    with pytest.raises(HTTPException):
+        utils.dump_arrow_frame(df)
+
+
+def test_concat_arrow_bytes_compressed(mocker, compressible_df):
+    mocker.patch.object(utils.settings, "arrow_compression", "lz4")
+    parts = [
+        utils.dump_arrow_bytes(utils.convert_to_arrow(compressible_df.iloc[:100])),
+        utils.dump_arrow_bytes(utils.convert_to_arrow(compressible_df.iloc[100:])),
+    ]
+    out = utils.concat_arrow_bytes(parts)
+    assert utils.arrow_compression(out) == "lz4"
+    pd.testing.assert_frame_equal(utils.read_arrow(BytesIO(out)), compressible_df)
+
+
 @pytest.mark.parametrize(
     "inp,jti,exp_df,exp_extra,exp_missing",
     [
@@ -1,20 +1,23 @@
 import calendar
 import datetime as dt
 import logging
-from typing import Set, IO, Callable, List, Tuple
+from typing import Set, IO, Callable, Iterator, List, Optional, Tuple
 
 
 from fastapi import HTTPException
+import numpy as np
 import pandas as pd
 from pandas.errors import EmptyDataError, ParserError  # type: ignore
 import pandas.api.types as pdtypes  # type: ignore
 import pyarrow as pa  # type: ignore
 
 
-from . import models
+from . import models, settings
 
 
 logger = logging.getLogger(__name__)
+# schema metadata key noting the codec of compressed Arrow data
+ARROW_COMPRESSION_KEY = b"spi_compression"
 
 
 def read_csv(content: IO) -> pd.DataFrame:
@@ -65,10 +68,132 @@ def read_arrow(content: IO) -> pd.DataFrame:
         table = pa.ipc.open_file(content).read_all()
     except pa.lib.ArrowInvalid as err:
         raise HTTPException(status_code=400, detail=err.args[0])
+    # free the Arrow memory of each column once it has been converted
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    return df
+
+
+def read_arrow_bytes(
+    data: bytes, index_columns: Tuple[str, ...] = ("time", "month")
+) -> pd.DataFrame:
+    """Read bytes in Apache Arrow File format, like data stored in the database,
+    into a DataFrame indexed by the first of index_columns that is present.
+    Unlike read_arrow followed by DataFrame.set_index, the columns are only
+    copied when pandas can't use the Arrow memory, e.g. if there are nulls, so
+    the data of the returned DataFrame may be read-only.
+    """
+    try:
+        table = pa.ipc.open_file(pa.py_buffer(data)).read_all()
+    except pa.lib.ArrowInvalid as err:
+        raise HTTPException(status_code=400, detail=err.args[0])
+    return _arrow_table_to_frame(table, index_columns)
+
+
+_TIME_UNIT_NS = {"s": 10 ** 9, "ms": 10 ** 6, "us": 10 ** 3, "ns": 1}
+
+
+def _arrow_times(column: pa.Array) -> np.ndarray:
+    """Values of an Arrow timestamp array as integers of its unit"""
+    return column.cast(pa.int64()).to_numpy()
+
+
+class ArrowTimeFile:
+    """Arrow File data saved to path, so that it is not held in memory, along
+    with the first and last time of each record batch. The rows with a time
+    between two times can then be read without reading the record batches
+    that are entirely outside of the times, and only the batches at the ends
+    are filtered.
+    """
+
+    def __init__(self, data: bytes, path: str):
+        try:
+            reader = pa.ipc.open_file(pa.py_buffer(data))
+        except pa.lib.ArrowInvalid as err:
+            raise HTTPException(status_code=400, detail=err.args[0])
+        self.path = path
+        self.schema = reader.schema
+        self._time_col = reader.schema.get_field_index("time")
+        self._unit_ns = _TIME_UNIT_NS[reader.schema.field(self._time_col).type.unit]
+        self._batch_times: List[Tuple[int, int]] = []
+        for i in range(reader.num_record_batches):
+            times = _arrow_times(reader.get_batch(i).column(self._time_col))
+            if len(times):
+                self._batch_times.append((times.min(), times.max()))
+            else:
+                # never between any times
+                self._batch_times.append((1, 0))
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def read_between(
+        self,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        index_columns: Tuple[str, ...] = ("time", "month"),
+    ) -> pd.DataFrame:
+        """Read the rows with a time from start to end (inclusive) into a
+        DataFrame like read_arrow_bytes"""
+        # first and last values in the time unit of the data
+        first = -(-pd.Timestamp(start).value // self._unit_ns)
+        last = pd.Timestamp(end).value // self._unit_ns
+        tables = []
+        with pa.OSFile(self.path) as f:
+            reader = pa.ipc.open_file(f)
+            for i, (batch_first, batch_last) in enumerate(self._batch_times):
+                if batch_last < first or batch_first > last:
+                    continue
+                table = pa.Table.from_batches([reader.get_batch(i)])
+                if batch_first < first or batch_last > last:
+                    times = _arrow_times(table.column(self._time_col).chunk(0))
+                    table = table.filter(pa.array((times >= first) & (times <= last)))
+                tables.append(table)
+        if tables:
+            table = pa.concat_tables(tables)
+        else:
+            table = self.schema.empty_table()
+        return _arrow_table_to_frame(table, index_columns)
+
+
+def _arrow_table_to_frame(
+    table: pa.Table, index_columns: Tuple[str, ...]
+) -> pd.DataFrame:
+    index = None
+    for name in index_columns:
+        if name in table.column_names:
+            index = pd.Index(table.column(name).to_pandas(), name=name)
+            table = table.drop([name])
+            break
     df = table.to_pandas(split_blocks=True)
+    if index is not None:
+        df.index = index
     return df
 
 
+def iter_arrow_csv(data: bytes, chunk_rows: int = 10000) -> Iterator[str]:
+    """Convert bytes in Apache Arrow File format to CSV, returned in chunks of
+    at most chunk_rows rows so the full CSV is never held in memory. The
+    data is checked before returning the iterator of chunks."""
+    try:
+        reader = pa.ipc.open_file(pa.py_buffer(data))
+    except pa.lib.ArrowInvalid as err:
+        raise HTTPException(status_code=400, detail=err.args[0])
+    return _csv_chunks(reader, chunk_rows)
+
+
+def _csv_chunks(reader: pa.ipc.RecordBatchFileReader, chunk_rows: int) -> Iterator[str]:
+    header = True
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        for start in range(0, batch.num_rows, chunk_rows):
+            df = batch.slice(start, chunk_rows).to_pandas(split_blocks=True)
+            yield df.to_csv(None, index=False, header=header)
+            header = False
+    if header:
+        # no rows, so only the header
+        yield pd.DataFrame(columns=reader.schema.names).to_csv(None, index=False)
+
+
 def verify_content_type(content_type: str) -> Callable[[IO], pd.DataFrame]:
     """Checks if we can read the content_type and returns the appropriate function for
     reading"""
@@ -177,7 +302,11 @@ def reindex_timeseries(
     """Conforms a dataframe to the expected time index for a job"""
     # some annoying type behaviour
     newdf: pd.DataFrame
-    newdf = df.copy().sort_values("time")
+    # avoid copying uploads that are already sorted, df itself is not modified
+    if df["time"].is_monotonic_increasing:
+        newdf = df.copy(deep=False)
+    else:
+        newdf = df.sort_values("time")
     time_kwargs = dict(ambiguous=True, nonexistent="NaT")
     index = pd.DatetimeIndex(newdf.pop("time")).round(  # type: ignore
         "1s", **time_kwargs.copy()
@@ -248,10 +377,100 @@ def convert_to_arrow(df: pd.DataFrame) -> pa.Table:
     return table
 
 
-def dump_arrow_bytes(table: pa.Table) -> bytes:
-    """Dump an Arrow table out to bytes in the Arrow File/Feather format"""
+def _new_arrow_file(
+    sink: pa.BufferOutputStream, schema: pa.Schema, compress: bool
+) -> pa.ipc.RecordBatchFileWriter:
+    metadata = {
+        k: v for k, v in (schema.metadata or {}).items() if k != ARROW_COMPRESSION_KEY
+    }
+    options = None
+    if compress and settings.arrow_compression is not None:
+        options = pa.ipc.IpcWriteOptions(compression=settings.arrow_compression)
+        metadata[ARROW_COMPRESSION_KEY] = settings.arrow_compression.encode()
+    return pa.ipc.new_file(
+        sink, schema.remove_metadata().with_metadata(metadata), options=options
+    )
+
+
+def dump_arrow_bytes(table: pa.Table, compress: bool = True) -> bytes:
+    """Dump an Arrow table out to bytes in the Arrow File/Feather format.
+    If compress and settings.arrow_compression is set, the buffers are
+    compressed with that codec, which is noted in the schema metadata.
+    Arrow readers decompress the data transparently."""
     sink = pa.BufferOutputStream()
-    writer = pa.ipc.new_file(sink, table.schema)
+    writer = _new_arrow_file(sink, table.schema, compress)
     writer.write(table)
     writer.close()
     return sink.getvalue().to_pybytes()
+
+
+def dump_arrow_frame(df: pd.DataFrame, chunk_rows: int = 50000) -> bytes:
+    """Convert a DataFrame to bytes in the Arrow File format, with the types of
+    convert_to_arrow, converting and writing chunk_rows rows at a time so that
+    a full Arrow copy of a large DataFrame is never held in memory. Each chunk
+    is a record batch, so about a month of minute data, and ArrowTimeFile can
+    skip the batches outside of a time window. The index is not kept."""
+    sink = pa.BufferOutputStream()
+    writer = None
+    try:
+        schema = pa.Table.from_pandas(
+            df.iloc[:1],
+            schema=convert_to_arrow(df.iloc[:1]).schema,
+            preserve_index=False,
+        ).schema
+        for start in range(0, max(len(df), 1), chunk_rows):
+            batch = pa.RecordBatch.from_pandas(
+                df.iloc[start : start + chunk_rows],
+                schema=schema,
+                preserve_index=False,
+            )
+            if writer is None:
+                writer = _new_arrow_file(sink, schema, True)
+            writer.write_batch(batch)
+    except pa.lib.ArrowInvalid as err:
+        logger.error(err.args[0])
+        raise HTTPException(status_code=400, detail=err.args[0])
+    writer.close()  # type: ignore
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_compression(data: bytes) -> Optional[str]:
+    """The codec that Arrow File bytes were compressed with by
+    dump_arrow_bytes, if any"""
+    schema = pa.ipc.open_file(pa.py_buffer(data)).schema
+    codec = (schema.metadata or {}).get(ARROW_COMPRESSION_KEY)
+    return codec.decode() if codec is not None else None
+
+
+def decompress_arrow_bytes(data: bytes) -> bytes:
+    """Rewrite compressed Arrow File bytes without compression for clients
+    that can't read compressed buffers. Other data is returned as is."""
+    try:
+        if arrow_compression(data) is None:
+            return data
+    except pa.lib.ArrowInvalid:
+        return data
+    table = pa.ipc.open_file(pa.py_buffer(data)).read_all()
+    return dump_arrow_bytes(table, compress=False)
+
+
+def concat_arrow_bytes(parts: List[bytes]) -> bytes:
+    """Join Arrow Files with the same schema into a single Arrow File"""
+    tables = [pa.ipc.open_file(pa.py_buffer(part)).read_all() for part in parts]
+    return dump_arrow_bytes(pa.concat_tables(tables))
+
+
+def concat_arrow_files(paths: List[str]) -> bytes:
+    """Like concat_arrow_bytes for Arrow Files saved at paths, but only one
+    record batch is read into memory at a time"""
+    sink = pa.BufferOutputStream()
+    writer = None
+    for path in paths:
+        with pa.OSFile(path) as f:
+            reader = pa.ipc.open_file(f)
+            if writer is None:
+                writer = _new_arrow_file(sink, reader.schema, True)
+            for i in range(reader.num_record_batches):
+                writer.write_batch(reader.get_batch(i))
+    writer.close()  # type: ignore
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,26 @@
+-- migrate:up
+create definer = 'select_objects'@'localhost'
+  procedure get_job_data_bulk (auth0id varchar(32), jobid char(36), dataids json)
+    comment 'Read the data for a list of job data ids of a single job'
+    reads sql data sql security definer
+  begin
+    declare binjobid binary(16) default (uuid_to_bin(jobid, 1));
+    declare allowed boolean default (check_users_job(auth0id, jobid));
+
+    if allowed then
+      select bin_to_uuid(id, 1) as id, bin_to_uuid(job_id, 1) as job_id,
+      schema_path, type, filename, data, present, format as data_format, created_at, modified_at
+      from job_data where job_id = binjobid and id in (
+        select uuid_to_bin(jv.id, 1) from json_table(dataids, '$[*]' columns (
+          id char(36) path '$' error on empty error on error)) as jv);
+    else
+      signal sqlstate '42000' set message_text = 'Job data retrieval denied',
+        mysql_errno = 1142;
+    end if;
+  end;
+grant execute on procedure `get_job_data_bulk` to 'select_objects'@'localhost';
+grant execute on procedure `get_job_data_bulk` to 'apiuser'@'%';
+
+
+-- migrate:down
+drop procedure get_job_data_bulk;
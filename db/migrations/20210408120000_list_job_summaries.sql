@@ -0,0 +1,41 @@
+-- migrate:up
+create definer = 'select_objects'@'localhost'
+  procedure list_job_summaries (auth0id varchar(32), lim int, off int)
+    comment 'Get a page of job summaries without the full definitions or data objects'
+    reads sql data sql security definer
+  begin
+    declare userid binary(16) default (get_user_binid(auth0id));
+
+    -- status and last_change as computed by job_status_func and
+    -- job_status_transition, but from one count of the job data per job
+    select bin_to_uuid(jobs.id, 1) as job_id, bin_to_uuid(jobs.user_id, 1) as user_id,
+           bin_to_uuid(jobs.system_id, 1) as system_id,
+           jobs.definition->>'$.system_definition.name' as system_name,
+           jobs.definition->>'$.parameters.calculate' as calculate,
+           jobs.definition->>'$.parameters.compare' as compare,
+           jobs.definition->'$.parameters.time_parameters' as time_parameters,
+           ifnull(jd.total, 0) as number_of_data_objects,
+           ifnull(jd.present, 0) as number_of_data_objects_present,
+           jobs.created_at, jobs.modified_at,
+           if(jobs.status = 'created',
+              if(jd.total > 0 and jd.present = jd.total, 'prepared', 'incomplete'),
+              jobs.status) as status,
+           if(jobs.status = 'created', ifnull(jd.last_change, jobs.created_at),
+              jobs.modified_at) as last_change
+      from jobs left join (
+        select job_id, count(*) as total, cast(sum(present) as unsigned) as present,
+               max(modified_at) as last_change
+          from job_data where job_id in (select id from jobs where user_id = userid)
+          group by job_id
+      ) as jd on jd.job_id = jobs.id
+      where jobs.user_id = userid
+      order by jobs.id
+      limit lim offset off;
+  end;
+
+grant execute on procedure `list_job_summaries` to 'select_objects'@'localhost';
+grant execute on procedure `list_job_summaries` to 'apiuser'@'%';
+
+
+-- migrate:down
+drop procedure list_job_summaries;
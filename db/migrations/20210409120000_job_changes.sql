@@ -0,0 +1,35 @@
+-- migrate:up
+alter table jobs add key jobs_modified_at_key (modified_at);
+
+create definer = 'select_objects'@'localhost'
+  procedure list_job_changes (since timestamp)
+    comment 'List the jobs modified at or after a time'
+    reads sql data sql security definer
+  begin
+    select bin_to_uuid(jobs.id, 1) as job_id, users.auth0_id as user_id, jobs.status
+      from jobs join users on jobs.user_id = users.id
+     where jobs.modified_at >= since;
+  end;
+
+grant execute on procedure `list_job_changes` to 'select_objects'@'localhost';
+grant execute on procedure `list_job_changes` to 'qmanager'@'%';
+
+
+create definer = 'select_objects'@'localhost'
+  procedure get_status_of_jobs (jobids json)
+    comment 'List the status of each job in a list of job ids'
+    reads sql data sql security definer
+  begin
+    select bin_to_uuid(id, 1) as job_id, status from jobs where id in (
+      select uuid_to_bin(jv.id, 1) from json_table(jobids, '$[*]' columns (
+        id char(36) path '$' error on empty error on error)) as jv);
+  end;
+
+grant execute on procedure `get_status_of_jobs` to 'select_objects'@'localhost';
+grant execute on procedure `get_status_of_jobs` to 'qmanager'@'%';
+
+
+-- migrate:down
+drop procedure get_status_of_jobs;
+drop procedure list_job_changes;
+alter table jobs drop key jobs_modified_at_key;
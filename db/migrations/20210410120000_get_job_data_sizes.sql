@@ -0,0 +1,29 @@
+-- migrate:up
+-- stored when the data is written so the sizes can be read without reading
+-- the data
+alter table job_data add column data_size bigint unsigned
+  as (coalesce(octet_length(data), 0)) stored after data;
+
+create definer = 'select_objects'@'localhost'
+  procedure get_job_data_sizes (auth0id varchar(32), jobid char(36))
+    comment 'Get the size in bytes of the data of each job data object of a job'
+    reads sql data sql security definer
+  begin
+    declare binjobid binary(16) default (uuid_to_bin(jobid, 1));
+    declare allowed boolean default (check_users_job(auth0id, jobid));
+
+    if allowed then
+      select bin_to_uuid(id, 1) as id, data_size as size
+      from job_data where job_id = binjobid;
+    else
+      signal sqlstate '42000' set message_text = 'Job data retrieval denied',
+        mysql_errno = 1142;
+    end if;
+  end;
+grant execute on procedure `get_job_data_sizes` to 'select_objects'@'localhost';
+grant execute on procedure `get_job_data_sizes` to 'apiuser'@'%';
+
+
+-- migrate:down
+drop procedure get_job_data_sizes;
+alter table job_data drop column data_size;
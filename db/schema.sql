@@ -24,6 +24,7 @@ CREATE TABLE `job_data` (
   `format` varchar(64) DEFAULT NULL,
   `filename` varchar(128) DEFAULT NULL,
   `data` longblob,
+  `data_size` bigint unsigned GENERATED ALWAYS AS (coalesce(octet_length(`data`),0)) STORED,
   `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `modified_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
@@ -69,6 +70,7 @@ CREATE TABLE `jobs` (
   `modified_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`),
   KEY `jobs_user_id_key` (`user_id`),
+  KEY `jobs_modified_at_key` (`modified_at`),
   CONSTRAINT `jobs_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE ON UPDATE RESTRICT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci ROW_FORMAT=COMPRESSED;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -744,6 +746,67 @@ DELIMITER ;
 /*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
 /*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
 DELIMITER ;;
+CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `get_job_data_bulk`(auth0id varchar(32), jobid char(36), dataids json)
+    READS SQL DATA
+    COMMENT 'Read the data for a list of job data ids of a single job'
+begin
+    declare binjobid binary(16) default (uuid_to_bin(jobid, 1));
+    declare allowed boolean default (check_users_job(auth0id, jobid));
+
+    if allowed then
+      select bin_to_uuid(id, 1) as id, bin_to_uuid(job_id, 1) as job_id,
+      schema_path, type, filename, data, present, format as data_format, created_at, modified_at
+      from job_data where job_id = binjobid and id in (
+        select uuid_to_bin(jv.id, 1) from json_table(dataids, '$[*]' columns (
+          id char(36) path '$' error on empty error on error)) as jv);
+    else
+      signal sqlstate '42000' set message_text = 'Job data retrieval denied',
+        mysql_errno = 1142;
+    end if;
+  end ;;
+DELIMITER ;
+/*!50003 SET sql_mode              = @saved_sql_mode */ ;
+/*!50003 SET character_set_client  = @saved_cs_client */ ;
+/*!50003 SET character_set_results = @saved_cs_results */ ;
+/*!50003 SET collation_connection  = @saved_col_connection */ ;
+/*!50003 SET @saved_cs_client      = @@character_set_client */ ;
+/*!50003 SET @saved_cs_results     = @@character_set_results */ ;
+/*!50003 SET @saved_col_connection = @@collation_connection */ ;
+/*!50003 SET character_set_client  = utf8mb4 */ ;
+/*!50003 SET character_set_results = utf8mb4 */ ;
+/*!50003 SET collation_connection  = utf8mb4_general_ci */ ;
+/*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
+/*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
+DELIMITER ;;
+CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `get_job_data_sizes`(auth0id varchar(32), jobid char(36))
+    READS SQL DATA
+    COMMENT 'Get the size in bytes of the data of each job data object of a job'
+begin
+    declare binjobid binary(16) default (uuid_to_bin(jobid, 1));
+    declare allowed boolean default (check_users_job(auth0id, jobid));
+
+    if allowed then
+      select bin_to_uuid(id, 1) as id, data_size as size
+      from job_data where job_id = binjobid;
+    else
+      signal sqlstate '42000' set message_text = 'Job data retrieval denied',
+        mysql_errno = 1142;
+    end if;
+  end ;;
+DELIMITER ;
+/*!50003 SET sql_mode              = @saved_sql_mode */ ;
+/*!50003 SET character_set_client  = @saved_cs_client */ ;
+/*!50003 SET character_set_results = @saved_cs_results */ ;
+/*!50003 SET collation_connection  = @saved_col_connection */ ;
+/*!50003 SET @saved_cs_client      = @@character_set_client */ ;
+/*!50003 SET @saved_cs_results     = @@character_set_results */ ;
+/*!50003 SET @saved_col_connection = @@collation_connection */ ;
+/*!50003 SET character_set_client  = utf8mb4 */ ;
+/*!50003 SET character_set_results = utf8mb4 */ ;
+/*!50003 SET collation_connection  = utf8mb4_general_ci */ ;
+/*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
+/*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
+DELIMITER ;;
 CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `get_job_result`(auth0id varchar(32), jobid char(36), resultid char(36))
     READS SQL DATA
     COMMENT 'Read the data for a single job result id'
@@ -832,6 +895,28 @@ DELIMITER ;
 /*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
 /*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
 DELIMITER ;;
+CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `get_status_of_jobs`(jobids json)
+    READS SQL DATA
+    COMMENT 'List the status of each job in a list of job ids'
+begin
+    select bin_to_uuid(id, 1) as job_id, status from jobs where id in (
+      select uuid_to_bin(jv.id, 1) from json_table(jobids, '$[*]' columns (
+        id char(36) path '$' error on empty error on error)) as jv);
+  end ;;
+DELIMITER ;
+/*!50003 SET sql_mode              = @saved_sql_mode */ ;
+/*!50003 SET character_set_client  = @saved_cs_client */ ;
+/*!50003 SET character_set_results = @saved_cs_results */ ;
+/*!50003 SET collation_connection  = @saved_col_connection */ ;
+/*!50003 SET @saved_cs_client      = @@character_set_client */ ;
+/*!50003 SET @saved_cs_results     = @@character_set_results */ ;
+/*!50003 SET @saved_col_connection = @@collation_connection */ ;
+/*!50003 SET character_set_client  = utf8mb4 */ ;
+/*!50003 SET character_set_results = utf8mb4 */ ;
+/*!50003 SET collation_connection  = utf8mb4_general_ci */ ;
+/*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
+/*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
+DELIMITER ;;
 CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `get_system`(auth0id varchar(32), systemid char(36))
     READS SQL DATA
     COMMENT 'Get the definition for a system'
@@ -886,6 +971,74 @@ DELIMITER ;
 /*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
 /*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
 DELIMITER ;;
+CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `list_job_changes`(since timestamp)
+    READS SQL DATA
+    COMMENT 'List the jobs modified at or after a time'
+begin
+    select bin_to_uuid(jobs.id, 1) as job_id, users.auth0_id as user_id, jobs.status
+      from jobs join users on jobs.user_id = users.id
+     where jobs.modified_at >= since;
+  end ;;
+DELIMITER ;
+/*!50003 SET sql_mode              = @saved_sql_mode */ ;
+/*!50003 SET character_set_client  = @saved_cs_client */ ;
+/*!50003 SET character_set_results = @saved_cs_results */ ;
+/*!50003 SET collation_connection  = @saved_col_connection */ ;
+/*!50003 SET @saved_cs_client      = @@character_set_client */ ;
+/*!50003 SET @saved_cs_results     = @@character_set_results */ ;
+/*!50003 SET @saved_col_connection = @@collation_connection */ ;
+/*!50003 SET character_set_client  = utf8mb4 */ ;
+/*!50003 SET character_set_results = utf8mb4 */ ;
+/*!50003 SET collation_connection  = utf8mb4_general_ci */ ;
+/*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
+/*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
+DELIMITER ;;
+CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `list_job_summaries`(auth0id varchar(32), lim int, off int)
+    READS SQL DATA
+    COMMENT 'Get a page of job summaries without the full definitions or data objects'
+begin
+    declare userid binary(16) default (get_user_binid(auth0id));
+
+    -- status and last_change as computed by job_status_func and
+    -- job_status_transition, but from one count of the job data per job
+    select bin_to_uuid(jobs.id, 1) as job_id, bin_to_uuid(jobs.user_id, 1) as user_id,
+           bin_to_uuid(jobs.system_id, 1) as system_id,
+           jobs.definition->>'$.system_definition.name' as system_name,
+           jobs.definition->>'$.parameters.calculate' as calculate,
+           jobs.definition->>'$.parameters.compare' as compare,
+           jobs.definition->'$.parameters.time_parameters' as time_parameters,
+           ifnull(jd.total, 0) as number_of_data_objects,
+           ifnull(jd.present, 0) as number_of_data_objects_present,
+           jobs.created_at, jobs.modified_at,
+           if(jobs.status = 'created',
+              if(jd.total > 0 and jd.present = jd.total, 'prepared', 'incomplete'),
+              jobs.status) as status,
+           if(jobs.status = 'created', ifnull(jd.last_change, jobs.created_at),
+              jobs.modified_at) as last_change
+      from jobs left join (
+        select job_id, count(*) as total, cast(sum(present) as unsigned) as present,
+               max(modified_at) as last_change
+          from job_data where job_id in (select id from jobs where user_id = userid)
+          group by job_id
+      ) as jd on jd.job_id = jobs.id
+      where jobs.user_id = userid
+      order by jobs.id
+      limit lim offset off;
+  end ;;
+DELIMITER ;
+/*!50003 SET sql_mode              = @saved_sql_mode */ ;
+/*!50003 SET character_set_client  = @saved_cs_client */ ;
+/*!50003 SET character_set_results = @saved_cs_results */ ;
+/*!50003 SET collation_connection  = @saved_col_connection */ ;
+/*!50003 SET @saved_cs_client      = @@character_set_client */ ;
+/*!50003 SET @saved_cs_results     = @@character_set_results */ ;
+/*!50003 SET @saved_col_connection = @@collation_connection */ ;
+/*!50003 SET character_set_client  = utf8mb4 */ ;
+/*!50003 SET character_set_results = utf8mb4 */ ;
+/*!50003 SET collation_connection  = utf8mb4_general_ci */ ;
+/*!50003 SET @saved_sql_mode       = @@sql_mode */ ;
+/*!50003 SET sql_mode              = 'ONLY_FULL_GROUP_BY,STRICT_TRANS_TABLES,NO_ZERO_IN_DATE,NO_ZERO_DATE,ERROR_FOR_DIVISION_BY_ZERO,NO_ENGINE_SUBSTITUTION' */ ;
+DELIMITER ;;
 CREATE DEFINER=`select_objects`@`localhost` PROCEDURE `list_jobs`(auth0id varchar(32))
     READS SQL DATA
     COMMENT 'Get metadata for all jobs'
@@ -1695,5 +1848,9 @@ INSERT INTO `schema_migrations` (version) VALUES
   ('20210223174423'),
   ('20210223230007'),
   ('20210310162457'),
-  ('20210326144800');
+  ('20210326144800'),
+  ('20210406153000'),
+  ('20210408120000'),
+  ('20210409120000'),
+  ('20210410120000');
 UNLOCK TABLES;
@@ -233,6 +233,103 @@ def test_list_jobs_bad(cursor, bad_user):
     assert not len(cursor.fetchall())
 
 
+def test_list_job_summaries(dictcursor, auth0_id, job_id, other_job_id):
+    dictcursor.execute("call list_job_summaries(%s, 100, 0)", auth0_id)
+    res = dictcursor.fetchall()
+    assert len(res) == 2
+    assert set(res[0].keys()) == {
+        "job_id",
+        "user_id",
+        "system_id",
+        "system_name",
+        "calculate",
+        "compare",
+        "time_parameters",
+        "number_of_data_objects",
+        "number_of_data_objects_present",
+        "created_at",
+        "modified_at",
+        "status",
+        "last_change",
+    }
+    byid = {r["job_id"]: r for r in res}
+    assert byid[job_id]["number_of_data_objects"] == 4
+    assert byid[job_id]["number_of_data_objects_present"] == 0
+    assert byid[other_job_id]["number_of_data_objects"] == 1
+    assert byid[job_id]["system_name"] is None
+    for r in res:
+        dictcursor.execute("call get_job_status(%s, %s)", (auth0_id, r["job_id"]))
+        status = dictcursor.fetchone()
+        assert r["status"] == status["status"] == "incomplete"
+        assert r["last_change"] == status["last_change"]
+
+
+def test_list_job_summaries_status(dictcursor, auth0_id, job_id):
+    dictcursor.execute(
+        "update job_data set present = 1, modified_at = '2030-10-10T00:00' "
+        "where job_id = uuid_to_bin(%s, 1)",
+        job_id,
+    )
+    dictcursor.execute("call list_job_summaries(%s, 100, 0)", auth0_id)
+    res = {r["job_id"]: r for r in dictcursor.fetchall()}[job_id]
+    assert res["number_of_data_objects_present"] == 4
+    assert res["status"] == "prepared"
+    assert res["last_change"] == dt.datetime(2030, 10, 10)
+
+    dictcursor.execute(
+        "update jobs set status = 'complete' where id = uuid_to_bin(%s, 1)", job_id
+    )
+    dictcursor.execute("call list_job_summaries(%s, 100, 0)", auth0_id)
+    res = {r["job_id"]: r for r in dictcursor.fetchall()}[job_id]
+    assert res["status"] == "complete"
+    assert res["last_change"] == res["modified_at"]
+
+
+def test_list_job_summaries_definition(
+    dictcursor, auth0_id, user_id, system_id, otherid
+):
+    defn = {
+        "system_definition": {"name": "The System"},
+        "parameters": {
+            "compare": "expected and actual performance",
+            "time_parameters": {"start": "2020-01-01T00:00:00+00:00", "step": 900.0},
+        },
+    }
+    dictcursor.executemany(
+        "insert into jobs (user_id, system_id, definition) values "
+        "(uuid_to_bin(%s, 1), uuid_to_bin(%s, 1), %s)",
+        (
+            (user_id, system_id, json.dumps(defn)),
+            (otherid, system_id, json.dumps(defn)),
+        ),
+    )
+    dictcursor.execute("call list_job_summaries(%s, 100, 0)", auth0_id)
+    res = dictcursor.fetchall()
+    assert len(res) == 3
+    assert res[2]["system_name"] == "The System"
+    assert res[2]["compare"] == "expected and actual performance"
+    assert res[2]["calculate"] is None
+    assert (
+        json.loads(res[2]["time_parameters"]) == defn["parameters"]["time_parameters"]
+    )
+    assert res[2]["number_of_data_objects"] == 0
+    assert res[2]["status"] == "incomplete"
+
+
+def test_list_job_summaries_page(dictcursor, auth0_id):
+    dictcursor.execute("call list_job_summaries(%s, 100, 0)", auth0_id)
+    ids = [r["job_id"] for r in dictcursor.fetchall()]
+    dictcursor.execute("call list_job_summaries(%s, 1, 1)", auth0_id)
+    assert [r["job_id"] for r in dictcursor.fetchall()] == ids[1:2]
+    dictcursor.execute("call list_job_summaries(%s, 1, 2)", auth0_id)
+    assert not len(dictcursor.fetchall())
+
+
+def test_list_job_summaries_bad(cursor, bad_user):
+    cursor.execute("call list_job_summaries(%s, 100, 0)", bad_user)
+    assert not len(cursor.fetchall())
+
+
 def test_create_job(dictcursor, auth0_id, system_id, user_id):
     dataobjs = json.dumps(
         [
@@ -341,6 +438,88 @@ def test_get_job_data_id_mismatch(cursor, auth0_id, job_id, other_job_data_id):
     assert err.value.args[0] == 1142
 
 
+def test_get_job_data_bulk(dictcursor, auth0_id, job_data_ids, job_id):
+    dictcursor.execute(
+        "update job_data set filename='newname', data='data' where id = uuid_to_bin(%s, 1)",
+        job_data_ids[0],
+    )
+    dictcursor.execute(
+        "call get_job_data_bulk(%s, %s, %s)",
+        (auth0_id, job_id, json.dumps(list(job_data_ids[:2]))),
+    )
+    res = {r["id"]: r for r in dictcursor.fetchall()}
+    assert set(res.keys()) == set(job_data_ids[:2])
+    assert res[job_data_ids[0]]["job_id"] == job_id
+    assert res[job_data_ids[0]]["schema_path"] == "data0"
+    assert res[job_data_ids[0]]["filename"] == "newname"
+    assert res[job_data_ids[0]]["data"] == b"data"
+
+
+def test_get_job_data_bulk_other_job(
+    dictcursor, auth0_id, job_data_ids, job_id, other_job_data_id
+):
+    dictcursor.execute(
+        "call get_job_data_bulk(%s, %s, %s)",
+        (auth0_id, job_id, json.dumps([job_data_ids[0], other_job_data_id])),
+    )
+    res = dictcursor.fetchall()
+    assert [r["id"] for r in res] == [job_data_ids[0]]
+
+
+def test_get_job_data_bulk_baduser(cursor, bad_user, job_data_ids, job_id):
+    with pytest.raises(OperationalError) as err:
+        cursor.execute(
+            "call get_job_data_bulk(%s, %s, %s)",
+            (bad_user, job_id, json.dumps(list(job_data_ids))),
+        )
+    assert err.value.args[0] == 1142
+
+
+def test_get_job_data_sizes(dictcursor, auth0_id, job_data_ids, job_id):
+    dictcursor.execute(
+        "update job_data set data='data' where id = uuid_to_bin(%s, 1)",
+        job_data_ids[0],
+    )
+    dictcursor.execute(
+        "update job_data set data=null where id = uuid_to_bin(%s, 1)",
+        job_data_ids[1],
+    )
+    dictcursor.execute("call get_job_data_sizes(%s, %s)", (auth0_id, job_id))
+    res = {r["id"]: r["size"] for r in dictcursor.fetchall()}
+    assert set(res.keys()) == set(job_data_ids)
+    assert res[job_data_ids[0]] == 4
+    assert res[job_data_ids[1]] == 0
+
+
+def test_get_job_data_sizes_add_job_data(dictcursor, auth0_id, job_data_ids, job_id):
+    # the size is stored when the data is added
+    dictcursor.execute(
+        "call add_job_data(%s, %s, %s, %s, %s, %s)",
+        (
+            auth0_id,
+            job_id,
+            job_data_ids[0],
+            "newfilename",
+            "application/vnd.apache.arrow.file",
+            b"\x00nonsense",
+        ),
+    )
+    dictcursor.execute("call get_job_data_sizes(%s, %s)", (auth0_id, job_id))
+    res = {r["id"]: r["size"] for r in dictcursor.fetchall()}
+    assert res[job_data_ids[0]] == 9
+    dictcursor.execute(
+        "select data_size from job_data where id = uuid_to_bin(%s, 1)",
+        job_data_ids[0],
+    )
+    assert dictcursor.fetchone()["data_size"] == 9
+
+
+def test_get_job_data_sizes_baduser(cursor, bad_user, job_id):
+    with pytest.raises(OperationalError) as err:
+        cursor.execute("call get_job_data_sizes(%s, %s)", (bad_user, job_id))
+    assert err.value.args[0] == 1142
+
+
 def test_add_job_data(dictcursor, auth0_id, job_data_ids, job_id):
     dictcursor.execute(
         "call add_job_data(%s, %s, %s, %s, %s, %s)",
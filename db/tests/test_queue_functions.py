@@ -19,6 +19,37 @@ def test_list_queued_jobs(dictcursor, job_id, other_job_id, auth0_id):
     assert out == [{"job_id": other_job_id, "user_id": auth0_id}]
 
 
+def test_list_job_changes(dictcursor, job_id, other_job_id, auth0_id):
+    dictcursor.execute("update jobs set modified_at = '2021-01-01 00:00:00'")
+    dictcursor.execute("call list_job_changes('2021-01-02 00:00:00')")
+    assert dictcursor.fetchall() == []
+    dictcursor.execute(
+        "update jobs set status = 'queued' where id = uuid_to_bin(%s, 1)", other_job_id
+    )
+    dictcursor.execute("call list_job_changes('2021-01-02 00:00:00')")
+    out = dictcursor.fetchall()
+    assert out == [{"job_id": other_job_id, "user_id": auth0_id, "status": "queued"}]
+
+
+def test_list_job_changes_all(dictcursor, job_id, other_job_id):
+    dictcursor.execute("call list_job_changes('1970-01-01 00:00:01')")
+    out = dictcursor.fetchall()
+    assert {o["job_id"] for o in out} == {job_id, other_job_id}
+
+
+def test_get_status_of_jobs(dictcursor, job_id, other_job_id, otherid):
+    dictcursor.execute(
+        "update jobs set status = 'error' where id = uuid_to_bin(%s, 1)", other_job_id
+    )
+    dictcursor.execute(
+        "call get_status_of_jobs(%s)", f'["{other_job_id}", "{otherid}"]'
+    )
+    out = dictcursor.fetchall()
+    assert out == [{"job_id": other_job_id, "status": "error"}]
+    dictcursor.execute("call get_status_of_jobs('[]')")
+    assert dictcursor.fetchall() == []
+
+
 def test_report_job_failure(dictcursor, job_id):
     msg = '{"error":{"detail": "it failed"}}'
     dictcursor.execute("call report_job_failure(%s, %s)", (job_id, msg))